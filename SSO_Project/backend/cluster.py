@@ -3,12 +3,30 @@ from sklearn.cluster import KMeans
 import umap
 import numpy as np
 
-def cluster_embeddings(embeddings, n_clusters=8):
+from Screeshot.utils.clustering_strategies import make_strategy
+
+def cluster_embeddings(embeddings, n_clusters=8, strategy="kmeans", threshold=0.35, chunk_size=10000):
+    """
+    strategy: "kmeans" (full KMeans), or one of the streaming strategies shared
+    with the Screeshot engine: "greedy", "greedy_ann", "minibatch_kmeans",
+    "density", "auto" (picked by dataset size). Streaming strategies fit on
+    chunk_size rows at a time; label -1 marks density-clustering noise.
+    """
     if len(embeddings) == 0:
         return []
-    kmeans = KMeans(n_clusters=min(n_clusters, len(embeddings)), random_state=42)
-    labels = kmeans.fit_predict(embeddings)
-    return labels
+    if strategy == "kmeans":
+        kmeans = KMeans(n_clusters=min(n_clusters, len(embeddings)), random_state=42)
+        labels = kmeans.fit_predict(embeddings)
+        return labels
+    clusterer = make_strategy(strategy, len(embeddings), threshold=threshold, n_clusters=n_clusters)
+    return clusterer.fit_predict(np.asarray(embeddings, dtype=np.float32), chunk_size=chunk_size)
+
+def fit_clusterer(chunks, strategy="minibatch_kmeans", n_items=None, n_clusters=None, threshold=0.35):
+    """Fit a streaming strategy on an iterable of embedding chunks; label new data with .predict()"""
+    clusterer = make_strategy(strategy, n_items or 0, threshold=threshold, n_clusters=n_clusters)
+    for chunk in chunks:
+        clusterer.partial_fit(np.asarray(chunk, dtype=np.float32))
+    return clusterer
 
 def reduce_embeddings(embeddings, n_components=2):
     if len(embeddings)==0:
@@ -1,10 +1,16 @@
 # SSO_Project/backend/db.py
 """
-JSON-backed storage for the prototype.
-- File: SSO_Project/backend/storage.json
-- One entry per image with optional OCR text, tags, and metadata.
+SQLite-backed storage for the prototype.
+- File: SSO_Project/backend/storage.sqlite3 (override with SSO_DB)
+- One row per image with optional OCR text, tags, and metadata.
+- WAL mode: readers never block the writer, and several uvicorn workers
+  can share the file; writes are serialized by SQLite itself.
+- An existing storage.json is imported once, the first time the database
+  is opened (or explicitly: python -m SSO_Project.backend.db import <file>).
+- Text search goes through an FTS5 index over text, tags and file name,
+  kept in sync by triggers; without FTS5 it falls back to a table scan.
 
-Schema:
+Entries keep the shape of the old JSON file:
 {
   "id": int,
   "file_path": "SSO_Project/uploads/xxx.png",
@@ -18,82 +24,336 @@ Schema:
       "uploaded_at": "..."
   },
   "created_at": "...",
-  "updated_at": "..."
+  "updated_at": "..."   # only once updated
 }
 """
 
 import os
+import re
+import sys
 import json
-from threading import Lock
+import sqlite3
+import threading
+from contextlib import contextmanager
 from datetime import datetime
+from typing import Any, Dict, List, Optional
 
 STORAGE_DIR = os.path.dirname(os.path.abspath(__file__))  # .../SSO_Project/backend
-STORAGE_FILE = os.path.join(STORAGE_DIR, "storage.json")
+STORAGE_FILE = os.path.join(STORAGE_DIR, "storage.json")   # legacy JSON store, imported once
+DB_FILE = os.getenv("SSO_DB", os.path.join(STORAGE_DIR, "storage.sqlite3"))
 UPLOADS_DIR = os.path.join(os.path.dirname(STORAGE_DIR), "uploads")
 os.makedirs(UPLOADS_DIR, exist_ok=True)
 
-_lock = Lock()
+# Milliseconds a writer waits for another process's transaction
+BUSY_TIMEOUT_MS = 30000
 
-def _read_all():
-    with _lock:
-        if not os.path.exists(STORAGE_FILE):
-            return []
-        try:
-            with open(STORAGE_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                return data if isinstance(data, list) else []
-        except Exception:
-            return []
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS screenshots (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    file_path   TEXT NOT NULL,
+    file_name   TEXT NOT NULL,
+    text        TEXT NOT NULL DEFAULT '',
+    tags        TEXT NOT NULL DEFAULT '[]',
+    metadata    TEXT NOT NULL DEFAULT '{}',
+    created_at  TEXT NOT NULL,
+    updated_at  TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS screenshots_file_path ON screenshots(file_path);
+CREATE TABLE IF NOT EXISTS screenshot_tags (
+    screenshot_id INTEGER NOT NULL REFERENCES screenshots(id) ON DELETE CASCADE,
+    tag           TEXT NOT NULL,
+    PRIMARY KEY (tag, screenshot_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS screenshot_tags_screenshot ON screenshot_tags(screenshot_id);
+CREATE TABLE IF NOT EXISTS imports (
+    source      TEXT PRIMARY KEY,
+    imported_at TEXT NOT NULL,
+    entries     INTEGER NOT NULL
+);
+"""
 
-def _write_all(data):
-    with _lock:
-        with open(STORAGE_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+# Full-text index over the searchable columns; external content, so the
+# text is not stored twice. Prefix indexes make short "abc*" queries cheap.
+_FTS_SCHEMA = [
+    """CREATE VIRTUAL TABLE screenshots_fts USING fts5(
+        text, tags, file_name,
+        content='screenshots', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS screenshots_fts_insert AFTER INSERT ON screenshots BEGIN
+        INSERT INTO screenshots_fts (rowid, text, tags, file_name)
+        VALUES (new.id, new.text, new.tags, new.file_name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS screenshots_fts_delete AFTER DELETE ON screenshots BEGIN
+        INSERT INTO screenshots_fts (screenshots_fts, rowid, text, tags, file_name)
+        VALUES ('delete', old.id, old.text, old.tags, old.file_name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS screenshots_fts_update AFTER UPDATE OF text, tags, file_name ON screenshots BEGIN
+        INSERT INTO screenshots_fts (screenshots_fts, rowid, text, tags, file_name)
+        VALUES ('delete', old.id, old.text, old.tags, old.file_name);
+        INSERT INTO screenshots_fts (rowid, text, tags, file_name)
+        VALUES (new.id, new.text, new.tags, new.file_name);
+    END""",
+    # Index rows that existed before the index did
+    "INSERT INTO screenshots_fts (screenshots_fts) VALUES ('rebuild')",
+]
 
-def add_or_update_screenshot(file_path: str, file_name: str, text: str, tags: list, metadata: dict):
-    data = _read_all()
-    tags = [t.strip().lower() for t in (tags or []) if (t and str(t).strip())]
-
-    # update if exists
-    for entry in data:
-        if entry.get("file_path") == file_path:
-            entry["text"] = text or entry.get("text", "")
-            entry["tags"] = tags
-            entry["metadata"] = metadata or entry.get("metadata", {})
-            entry["updated_at"] = datetime.utcnow().isoformat()
-            _write_all(data)
-            return entry
-
-    # new entry
-    new_id = max([e.get("id", 0) for e in data], default=0) + 1
+# bm25 weights of text, tags and file_name: a tag hit says more than a word in the OCR text
+_BM25_WEIGHTS = (1.0, 3.0, 2.0)
+
+# Keeps the stored text/metadata when the new value is empty, like the JSON store did
+_UPSERT = """
+INSERT INTO screenshots (file_path, file_name, text, tags, metadata, created_at)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(file_path) DO UPDATE SET
+    text = CASE WHEN excluded.text != '' THEN excluded.text ELSE screenshots.text END,
+    tags = excluded.tags,
+    metadata = CASE WHEN excluded.metadata != '{}' THEN excluded.metadata ELSE screenshots.metadata END,
+    updated_at = excluded.created_at
+RETURNING *
+"""
+
+_local = threading.local()
+_fts_available: Optional[bool] = None
+
+def _connect() -> sqlite3.Connection:
+    """This thread's connection; a forked worker opens its own"""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.pid == os.getpid() and _local.path == DB_FILE:
+        return conn
+
+    conn = sqlite3.connect(DB_FILE, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")  # durable at checkpoints; safe with WAL
+    conn.execute("PRAGMA foreign_keys = ON")
+    _local.conn, _local.pid, _local.path = conn, os.getpid(), DB_FILE
+
+    # executescript() would commit on its own; run the statements in one transaction
+    with _transaction(conn):
+        for statement in _SCHEMA.split(";"):
+            if statement.strip():
+                conn.execute(statement)
+        _create_fts(conn)
+    if os.path.exists(STORAGE_FILE):
+        import_json(STORAGE_FILE)
+    return conn
+
+def _create_fts(conn: sqlite3.Connection) -> None:
+    """Create the full-text index and its triggers unless they exist or FTS5 is missing"""
+    global _fts_available
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'screenshots_fts'").fetchone():
+        _fts_available = True
+        return
+    conn.execute("SAVEPOINT fts")
+    try:
+        for statement in _FTS_SCHEMA:
+            conn.execute(statement)
+    except sqlite3.OperationalError:
+        # SQLite built without FTS5: search scans the table instead
+        conn.execute("ROLLBACK TO fts")
+        _fts_available = False
+    else:
+        _fts_available = True
+    conn.execute("RELEASE fts")
+
+@contextmanager
+def _transaction(conn: Optional[sqlite3.Connection] = None):
+    """
+    BEGIN IMMEDIATE ... COMMIT: takes the write lock up front, so two
+    processes never both read and then fail to upgrade to a write.
+    """
+    conn = conn or _connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+def _entry(row: sqlite3.Row) -> Dict[str, Any]:
     entry = {
-        "id": new_id,
-        "file_path": file_path,
-        "file_name": file_name,
-        "text": text or "",
-        "tags": tags,
-        "metadata": metadata or {},
-        "created_at": datetime.utcnow().isoformat()
+        "id": row["id"],
+        "file_path": row["file_path"],
+        "file_name": row["file_name"],
+        "text": row["text"],
+        "tags": json.loads(row["tags"]),
+        "metadata": json.loads(row["metadata"]),
+        "created_at": row["created_at"],
     }
-    data.append(entry)
-    _write_all(data)
+    if row["updated_at"]:
+        entry["updated_at"] = row["updated_at"]
     return entry
 
+def _normalize_tags(tags) -> List[str]:
+    return [t.strip().lower() for t in (tags or []) if (t and str(t).strip())]
+
+def _upsert_many(conn: sqlite3.Connection, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    now = datetime.utcnow().isoformat()
+    rows = []
+    for item in items:
+        tags = _normalize_tags(item.get("tags"))
+        rows.append(conn.execute(_UPSERT, (
+            item["file_path"], item["file_name"], item.get("text") or "",
+            json.dumps(tags, ensure_ascii=False),
+            json.dumps(item.get("metadata") or {}, ensure_ascii=False), now,
+        )).fetchone())
+
+    # A file_path listed twice comes back with the same id; its last row is what is stored
+    latest = {row["id"]: row for row in rows}
+    conn.executemany("DELETE FROM screenshot_tags WHERE screenshot_id = ?", [(id_,) for id_ in latest])
+    conn.executemany(
+        "INSERT OR IGNORE INTO screenshot_tags (screenshot_id, tag) VALUES (?, ?)",
+        [(id_, tag) for id_, row in latest.items() for tag in json.loads(row["tags"])],
+    )
+    return [_entry(latest[row["id"]]) for row in rows]
+
+def add_or_update_screenshot(file_path: str, file_name: str, text: str, tags: list, metadata: dict):
+    return add_or_update_screenshots([{
+        "file_path": file_path, "file_name": file_name, "text": text, "tags": tags, "metadata": metadata,
+    }])[0]
+
+def add_or_update_screenshots(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Upsert a whole batch in one transaction, i.e. one commit however many items
+
+    Args:
+        items: Dicts with file_path, file_name and optional text, tags and metadata,
+            same rules as add_or_update_screenshot; a file_path listed twice ends
+            up with its last values
+
+    Returns:
+        List of the stored entries, with ids, in the order of items
+    """
+    if not items:
+        return []
+    with _transaction() as conn:
+        return _upsert_many(conn, items)
+
 def get_all_screenshots():
-    return _read_all()
+    rows = _connect().execute("SELECT * FROM screenshots ORDER BY id").fetchall()
+    return [_entry(row) for row in rows]
 
 def find_by_tag(tag: str):
     tag = tag.strip().lower()
-    return [e for e in _read_all() if tag in e.get("tags", [])]
+    rows = _connect().execute(
+        "SELECT s.* FROM screenshots s JOIN screenshot_tags t ON t.screenshot_id = s.id "
+        "WHERE t.tag = ? ORDER BY s.id", (tag,)
+    ).fetchall()
+    return [_entry(row) for row in rows]
+
+def _match_query(q: str) -> str:
+    """FTS5 query matching every word of q as a prefix, e.g. 'link rec' -> '"link"* "rec"*'"""
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", q.lower()))
 
-def find_by_text_search(q: str):
+def find_by_text_search(q: str, limit: Optional[int] = None, offset: int = 0):
+    """
+    Entries whose text, tags or file name contain every word of q as a word prefix,
+    best match first (bm25); each entry gets a "score", higher is better
+
+    Args:
+        q: Search words, e.g. "linked recruit"
+        limit: Most entries returned (all when None)
+        offset: Entries skipped, for paging
+    """
+    conn = _connect()
+    if not _fts_available:
+        return _scan_text_search(conn, q, limit, offset)
+    match = _match_query(q)
+    if not match:
+        return []
+    rows = conn.execute(
+        "SELECT s.*, bm25(screenshots_fts, ?, ?, ?) AS rank FROM screenshots_fts "
+        "JOIN screenshots s ON s.id = screenshots_fts.rowid "
+        "WHERE screenshots_fts MATCH ? ORDER BY rank LIMIT ? OFFSET ?",
+        (*_BM25_WEIGHTS, match, -1 if limit is None else limit, offset),
+    ).fetchall()
+    return [dict(_entry(row), score=round(-row["rank"], 4)) for row in rows]
+
+def count_text_search(q: str) -> int:
+    """Number of entries find_by_text_search(q) would return without a limit"""
+    conn = _connect()
+    if not _fts_available:
+        return len(_scan_text_search(conn, q, None, 0))
+    match = _match_query(q)
+    if not match:
+        return 0
+    return conn.execute("SELECT count(*) FROM screenshots_fts WHERE screenshots_fts MATCH ?", (match,)).fetchone()[0]
+
+def _scan_text_search(conn: sqlite3.Connection, q: str, limit: Optional[int], offset: int):
+    """Case-insensitive substring match over text, tags and file name, newest id last"""
     q = q.strip().lower()
     if not q:
         return []
-    res = []
-    for e in _read_all():
-        text = (e.get("text") or "").lower()
-        tags = " ".join(e.get("tags", [])).lower()
-        if q in text or q in tags or q in (e.get("file_name","").lower()):
-            res.append(e)
-    return res
+    pattern = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    rows = conn.execute(
+        "SELECT * FROM screenshots WHERE lower(text) LIKE ?1 ESCAPE '\\' "
+        "OR lower(file_name) LIKE ?1 ESCAPE '\\' "
+        "OR EXISTS (SELECT 1 FROM screenshot_tags t WHERE t.screenshot_id = screenshots.id "
+        "AND t.tag LIKE ?1 ESCAPE '\\') ORDER BY id LIMIT ?2 OFFSET ?3",
+        (pattern, -1 if limit is None else limit, offset),
+    ).fetchall()
+    return [_entry(row) for row in rows]
+
+def import_json(path: str = STORAGE_FILE, force: bool = False) -> int:
+    """
+    Copy the entries of a storage.json file into the database, once
+
+    Ids and timestamps are kept; entries whose file_path is already stored
+    are left alone. A file that was imported before is skipped unless force.
+
+    Returns:
+        int: Entries imported
+    """
+    source = os.path.abspath(path)
+    conn = _connect()
+    if not force and conn.execute("SELECT 1 FROM imports WHERE source = ?", (source,)).fetchone():
+        return 0
+    try:
+        with open(source, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    if not isinstance(data, list):
+        return 0
+
+    with _transaction(conn):
+        # Checked again under the write lock: another worker may have just imported it
+        if not force and conn.execute("SELECT 1 FROM imports WHERE source = ?", (source,)).fetchone():
+            return 0
+        imported = 0
+        for e in data:
+            if not e.get("file_path"):
+                continue
+            taken = e.get("id") and conn.execute("SELECT 1 FROM screenshots WHERE id = ?", (e["id"],)).fetchone()
+            tags = _normalize_tags(e.get("tags"))
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO screenshots "
+                "(id, file_path, file_name, text, tags, metadata, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (None if taken else e.get("id"), e["file_path"],
+                 e.get("file_name") or os.path.basename(e["file_path"]), e.get("text") or "",
+                 json.dumps(tags, ensure_ascii=False), json.dumps(e.get("metadata") or {}, ensure_ascii=False),
+                 e.get("created_at") or datetime.utcnow().isoformat(), e.get("updated_at")),
+            )
+            if cur.rowcount:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO screenshot_tags (screenshot_id, tag) VALUES (?, ?)",
+                    [(cur.lastrowid, tag) for tag in tags],
+                )
+                imported += 1
+        conn.execute(
+            "INSERT OR REPLACE INTO imports (source, imported_at, entries) VALUES (?, ?, ?)",
+            (source, datetime.utcnow().isoformat(), imported),
+        )
+    return imported
+
+if __name__ == "__main__":
+    # python -m SSO_Project.backend.db import path/to/storage.json
+    if len(sys.argv) == 3 and sys.argv[1] == "import":
+        print(f"Imported {import_json(sys.argv[2], force=True)} entries into {DB_FILE}")
+    else:
+        print("usage: python -m SSO_Project.backend.db import <storage.json>")
+        sys.exit(2)
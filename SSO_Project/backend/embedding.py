@@ -1,9 +1,10 @@
 # backend/embeddings.py
-from sentence_transformers import SentenceTransformer
 import numpy as np
 import os
 import faiss
 
+from Screeshot.utils.model_registry import registry as model_registry
+
 MODEL_NAME = os.getenv("SSO_EMBED_MODEL", "all-MiniLM-L6-v2")
 _model = None
 _index = None
@@ -11,9 +12,10 @@ _index_path = os.getenv("SSO_INDEX_PATH", "embeddings.index")
 _embeddings_dim = None
 
 def load_model():
+    # Shared with any other module using the same model in this process
     global _model, _embeddings_dim
     if _model is None:
-        _model = SentenceTransformer(MODEL_NAME)
+        _model = model_registry.get("sentence-transformer", MODEL_NAME)
         _embeddings_dim = _model.get_sentence_embedding_dimension()
     return _model
 
@@ -5,20 +5,22 @@ Looks "deployed" for demos:
 - GET  /                      : health message
 - POST /cluster/by_keywords/  : keywords + multiple images -> assign each image to closest keyword
 - GET  /list/                 : list stored assignments
-- GET  /search/?q=...         : simple search over filename/tags/text
+- GET  /search/?q=...         : ranked full-text search over filename/tags/text (limit/offset)
+- GET  /models/               : model load times and memory
+- GET  /export/?keyword=...   : ZIP of the stored images by keyword, streamed
 
 Uploads are saved to:     SSO_Project/uploads/
 Clustered copies go to:   SSO_Project/results/<keyword>/
-Assignments persisted in: SSO_Project/backend/storage.json
+Assignments persisted in: SSO_Project/backend/storage.sqlite3 (SSO_DB)
 """
 
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 
 from fastapi import FastAPI, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from PIL import Image
 from io import BytesIO
@@ -27,6 +29,10 @@ import numpy as np
 from sentence_transformers import SentenceTransformer
 
 from SSO_Project.backend import db as storage  # <- package-absolute import
+from Screeshot.utils.embedding_store import EmbeddingStore
+from Screeshot.utils.model_registry import registry as model_registry
+from Screeshot.utils.near_duplicates import DuplicateIndex, dhash
+from Screeshot.utils.zip_stream import iter_zip
 
 # ---------- Paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))                # .../SSO_Project/backend
@@ -36,6 +42,9 @@ RESULTS_DIR = os.path.join(PROJECT_ROOT, "results")
 os.makedirs(UPLOADS_DIR, exist_ok=True)
 os.makedirs(RESULTS_DIR, exist_ok=True)
 
+# Storage of image embeddings during a request: float32 | float16 | int8
+EMBED_DTYPE = os.getenv("SSO_EMBED_DTYPE", "float32")
+
 # ---------- App
 app = FastAPI(title="SSO Keyword Clustering API")
 
@@ -50,13 +59,16 @@ app.add_middleware(
 # Serve clustered results as static files (so links/images work)
 app.mount("/results", StaticFiles(directory=RESULTS_DIR), name="results")
 
-# ---------- Model (lazy-load)
-_model: SentenceTransformer | None = None
+# ---------- Model (lazy-load, shared through the process-wide registry)
+CLIP_MODEL = "clip-ViT-B-32"
+
 def get_model() -> SentenceTransformer:
-    global _model
-    if _model is None:
-        _model = SentenceTransformer("clip-ViT-B-32")  # CPU ok; later: _model.to("cuda")
-    return _model
+    return model_registry.get("sentence-transformer", CLIP_MODEL)  # CPU ok; later: .to("cuda")
+
+@app.on_event("startup")
+def warmup_models():
+    # Load CLIP in the background so the first request does not absorb it
+    model_registry.warmup([("sentence-transformer", CLIP_MODEL)])
 
 # ---------- Utils
 def _normalize_keywords(raw: str) -> list[str]:
@@ -76,13 +88,28 @@ def _open_pil(path: str) -> Image.Image:
     with open(path, "rb") as f:
         return Image.open(BytesIO(f.read())).convert("RGB")
 
-def _assign_to_best_keyword(
-    img_emb: np.ndarray, kw_embs: np.ndarray, keywords: list[str]
-) -> tuple[str, float, int]:
-    # cosine sims since vectors are normalized -> dot product
-    sims = kw_embs @ img_emb  # (K,)
-    best_idx = int(np.argmax(sims))
-    return keywords[best_idx], float(sims[best_idx]), best_idx
+# ---------- Near-duplicates
+# Perceptual hashes of stored screenshots, loaded from storage on first use
+_duplicate_index: Optional[DuplicateIndex] = None
+_archive: Dict[str, Dict[str, Any]] = {}
+
+def _get_duplicate_index() -> DuplicateIndex:
+    global _duplicate_index
+    if _duplicate_index is None:
+        _duplicate_index = DuplicateIndex()
+        for entry in storage.get_all_screenshots():
+            meta = entry.get("metadata") or {}
+            if meta.get("dhash") and not meta.get("duplicate_of"):
+                _remember_representative(entry["file_path"], int(meta["dhash"], 16), meta)
+    return _duplicate_index
+
+def _remember_representative(path: str, hash_value: int, meta: Dict[str, Any]) -> None:
+    _duplicate_index.add(hash_value, path)
+    _archive[path] = {
+        "keyword": meta.get("assigned_keyword"),
+        "score": meta.get("score"),
+        "keywords": sorted(meta.get("keywords") or []),
+    }
 
 def _ensure_bucket_dir(keyword: str) -> str:
     bucket_dir = os.path.join(RESULTS_DIR, keyword)
@@ -102,9 +129,10 @@ async def cluster_by_keywords(
     """
     - Parse keywords
     - Save uploaded files
-    - Encode keywords (text) and images with CLIP
+    - Group near-duplicate images (perceptual hash, this batch + archive)
+    - Encode keywords (text) and one image per group with CLIP
     - Assign each image to the closest keyword by cosine similarity
-    - Save a copy under results/<keyword>/, persist assignment in storage.json
+    - Save a copy under results/<keyword>/, persist assignment in the database
     - Return grouped mapping + scores
     """
     try:
@@ -119,41 +147,82 @@ async def cluster_by_keywords(
             saved_paths.append(saved)
             original_names.append(os.path.basename(saved))
 
+        hashes: Dict[str, int] = {}
+        for path in saved_paths:
+            try:
+                hashes[path] = dhash(path)
+            except Exception:
+                pass  # Unreadable here too; encoding below reports it
+        # Archived representatives are reused only if they were scored against the same keywords;
+        # an image whose archived near-duplicates are all stale becomes a representative itself
+        def reusable(rep: str) -> bool:
+            return rep in hashes or _archive.get(rep, {}).get("keywords") == sorted(kw_list)
+
+        representative_of = _get_duplicate_index().group(hashes, accept=reusable)
+        duplicate_of = {path: rep for path, rep in representative_of.items() if rep != path}
+        to_encode = [p for p in saved_paths if p not in duplicate_of]
+
         model = get_model()
         kw_embs = model.encode(kw_list, convert_to_numpy=True, normalize_embeddings=True)
-        pil_images = [_open_pil(p) for p in saved_paths]
-        img_embs = model.encode(pil_images, convert_to_numpy=True, normalize_embeddings=True)
+        img_store = EmbeddingStore(kw_embs.shape[1], EMBED_DTYPE, capacity=max(len(to_encode), 1))
+        if to_encode:
+            pil_images = [_open_pil(p) for p in to_encode]
+            img_store.add(model.encode(pil_images, convert_to_numpy=True, normalize_embeddings=True))
+
+        # (K, N) cosine sims computed on the stored (possibly quantized) vectors
+        sims = img_store.similarity(kw_embs)
+        best_idxs = np.argmax(sims, axis=0)
+        results: Dict[str, tuple[str, float]] = {
+            path: (kw_list[best_idxs[i]], float(sims[best_idxs[i], i])) for i, path in enumerate(to_encode)
+        }
 
         grouped: Dict[str, list[Dict[str, Any]]] = {k: [] for k in kw_list}
-        assignments: list[Dict[str, Any]] = []
+        records: list[Dict[str, Any]] = []
 
-        for path, fname, emb in zip(saved_paths, original_names, img_embs):
-            best_kw, score, _ = _assign_to_best_keyword(emb, kw_embs, kw_list)
+        for path, fname in zip(saved_paths, original_names):
+            rep = duplicate_of.get(path)
+            if rep is None:
+                best_kw, score = results[path]
+            elif rep in results:
+                best_kw, score = results[rep]
+            else:
+                best_kw, score = _archive[rep]["keyword"], _archive[rep]["score"]
 
             bucket_dir = _ensure_bucket_dir(best_kw)
             bucket_path = os.path.join(bucket_dir, fname)
             if not os.path.exists(bucket_path):
                 _open_pil(path).save(bucket_path)
 
-            entry = storage.add_or_update_screenshot(
-                file_path=path,
-                file_name=fname,
-                text="",                          # OCR integration later
-                tags=[best_kw],                   # auto tag
-                metadata={
+            records.append({
+                "file_path": path,
+                "file_name": fname,
+                "text": "",                       # OCR integration later
+                "tags": [best_kw],                # auto tag
+                "metadata": {
                     "assigned_keyword": best_kw,
                     "score": score,
                     "bucket_path": bucket_path,
                     "uploaded_at": datetime.utcnow().isoformat(),
+                    "keywords": kw_list,
+                    "dhash": f"{hashes[path]:x}" if path in hashes else None,
+                    "duplicate_of": rep,
                 },
-            )
-            assignments.append(entry)
-            grouped[best_kw].append({
-                "file_name": fname,
-                "file_path": path,
-                "bucket_path": bucket_path,
-                "keyword": best_kw,
-                "score": score,
+            })
+            if path in hashes and rep is None:
+                _archive[path] = {"keyword": best_kw, "score": score, "keywords": sorted(kw_list)}
+
+        # One transaction for the whole request
+        assignments = storage.add_or_update_screenshots(records)
+        for entry in assignments:
+            meta = entry["metadata"]
+            grouped[meta["assigned_keyword"]].append({
+                "id": entry["id"],
+                "file_name": entry["file_name"],
+                "file_path": entry["file_path"],
+                "bucket_path": meta["bucket_path"],
+                "keyword": meta["assigned_keyword"],
+                "score": meta["score"],
+                "duplicate_of": meta["duplicate_of"],
             })
 
         return {
@@ -161,20 +230,52 @@ async def cluster_by_keywords(
             "keywords": kw_list,
             "grouped": grouped,
             "assignments_count": len(assignments),
+            "duplicates_count": len(duplicate_of),
         }
 
     except Exception as e:
         return JSONResponse({"status": "error", "detail": str(e)}, status_code=500)
 
+@app.get("/models/")
+def models():
+    """Load state, load time and memory of every model in this process"""
+    return model_registry.stats()
+
 @app.get("/list/")
 def list_all():
     items = storage.get_all_screenshots()
     return {"count": len(items), "items": items}
 
 @app.get("/search/")
-def search(q: str):
-    items = storage.find_by_text_search(q) if q and q.strip() else []
-    return {"count": len(items), "items": items}
+def search(q: str, limit: int = 50, offset: int = 0):
+    """Ranked full-text search; every word of q matches as a prefix"""
+    if not (q and q.strip()):
+        return {"count": 0, "total": 0, "items": []}
+    limit, offset = max(1, min(limit, 500)), max(offset, 0)
+    items = storage.find_by_text_search(q, limit=limit, offset=offset)
+    return {"count": len(items), "total": storage.count_text_search(q), "items": items}
+
+@app.get("/export/")
+def export(keyword: Optional[str] = None):
+    """
+    ZIP of the stored images as <keyword>/<file>, built while it downloads.
+    Read straight from the uploads; images are stored, not recompressed.
+    """
+    items = storage.find_by_tag(keyword) if keyword else storage.get_all_screenshots()
+    members = [
+        # Upload names are unique, original names need not be
+        (f"{(item.get('metadata') or {}).get('assigned_keyword') or 'unassigned'}/{os.path.basename(item['file_path'])}",
+         item["file_path"])
+        for item in items
+        if os.path.exists(item["file_path"])
+    ]
+    name = f"sso_export_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.zip"
+    return StreamingResponse(
+        iter_zip(members),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{name}"'},
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("SSO_Project.backend.main:app", host="127.0.0.1", port=8000, reload=True)
@@ -1,40 +1,50 @@
 # SSO_Project/backend/ocr.py
 """
-Reserved for later OCR integration (pytesseract).
+Reserved for later OCR integration.
 Currently not used by the keyword-clustering endpoint.
+
+The engine comes from the shared OCR engine layer; pick it per deployment
+with SSO_OCR_POLICY: tesseract (default) | easyocr | cascade | fastest | most_accurate
+and the languages with SSO_OCR_LANGUAGES, e.g. "en,de,hi"
 """
 
-from PIL import Image, ImageOps, ImageFilter
-import pytesseract
 import io
+import os
+
+from PIL import Image
+
+from Screeshot.utils.ocr_cache import shared_cache
+from Screeshot.utils.ocr_engines import TesseractEngine, make_engine
+
+OCR_POLICY = os.getenv("SSO_OCR_POLICY", "tesseract")
+OCR_LANGUAGES = tuple(os.getenv("SSO_OCR_LANGUAGES", "en").split(","))
+ENGINE = make_engine(OCR_POLICY, languages=OCR_LANGUAGES)
+
+# Tesseract settings used for preprocess_pil_image, whatever the policy
+TESSERACT = ENGINE if isinstance(ENGINE, TesseractEngine) else TesseractEngine(OCR_LANGUAGES)
 
 def preprocess_pil_image(pil_img: Image.Image) -> Image.Image:
-    pil = pil_img.convert("RGB")
-    gray = ImageOps.grayscale(pil)
-    try:
-        gray = ImageOps.autocontrast(gray, cutoff=2)
-    except Exception:
-        pass
-    try:
-        gray = gray.filter(ImageFilter.SHARPEN)
-    except Exception:
-        pass
+    gray, _, _ = TESSERACT.prepare(pil_img)
     return gray
 
 def extract_text_from_pil(pil_image: Image.Image) -> str:
     try:
-        pre = preprocess_pil_image(pil_image)
-        text = pytesseract.image_to_string(pre)
-        return text.strip()
-    except Exception:
-        try:
-            return pytesseract.image_to_string(pil_image).strip()
-        except Exception as e2:
-            return f"OCR_Error: {str(e2)}"
+        return "\n".join(ENGINE.recognize(pil_image).texts).strip()
+    except Exception as e:
+        return f"OCR_Error: {str(e)}"
 
 def extract_text_from_bytes(image_bytes: bytes) -> str:
+    # Results are cached by image content; OCR_CACHE_PATH points both apps at one file
     try:
-        pil = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-        return extract_text_from_pil(pil)
+        cache = shared_cache()
+        content = cache.content_hash(image_bytes)
+        cached = cache.get(content, ENGINE.name, ENGINE.params)
+        if cached is not None:
+            return "\n".join(cached["texts"]).strip()
+
+        result = ENGINE.recognize(io.BytesIO(image_bytes))
+        cache.put(content, ENGINE.name, ENGINE.params, result.text(),
+                  result.texts, result.boxes, result.confidences)
+        return "\n".join(result.texts).strip()
     except Exception as e:
         return f"OCR_Error: {str(e)}"
@@ -1,9 +1,14 @@
 import streamlit as st
 from PIL import Image
 from utils.ocr_helper import OCRProcessor
+from utils.ocr_engines import (POLICIES, DEFAULT_POLICY, TESSERACT_LANGUAGES, EasyOCREngine, TesseractEngine,
+                               make_engine, profile_engines)
 from utils.smart_clustering import EnhancedClusteringEngine
+from utils.model_registry import registry as model_registry
+from utils.reader_pool import reader_pool
+from utils.near_duplicates import DuplicateIndex
+from utils.pipeline import ExtractionPipeline
 import json
-import time
 
 # Must be first
 st.set_page_config(
@@ -379,10 +384,27 @@ else:
     </style>
     """, unsafe_allow_html=True)
 
+# Start loading the models in the background; no-op once they are loaded or loading
+model_registry.warmup([
+    ('sentence-transformer', 'all-MiniLM-L6-v2'),
+])
+reader_pool.warmup(('en',))
+
 # Initialize processors
 if 'ocr_processor' not in st.session_state:
     st.session_state.ocr_processor = OCRProcessor()
 
+if 'ocr_policy' not in st.session_state:
+    st.session_state.ocr_policy = DEFAULT_POLICY
+
+# EasyOCR codes; readers for other scripts load only when an image needs them
+if 'ocr_languages' not in st.session_state:
+    st.session_state.ocr_languages = ['en']
+
+# Engine micro-benchmark, run once per session on a sample of the uploads
+if 'ocr_profile' not in st.session_state:
+    st.session_state.ocr_profile = None
+
 if 'clustering_engine' not in st.session_state:
     st.session_state.clustering_engine = EnhancedClusteringEngine()
 
@@ -392,9 +414,30 @@ if 'extracted_data' not in st.session_state:
 if 'organized_results' not in st.session_state:
     st.session_state.organized_results = None
 
+if 'last_organized_results' not in st.session_state:
+    st.session_state.last_organized_results = None
+
+if 'organized_names' not in st.session_state:
+    st.session_state.organized_names = frozenset()
+
+# Perceptual hashes of every screenshot OCR'd this session, and their texts
+if 'duplicate_index' not in st.session_state:
+    st.session_state.duplicate_index = DuplicateIndex()
+
+if 'representative_texts' not in st.session_state:
+    st.session_state.representative_texts = {}
+
 if 'processing_step' not in st.session_state:
     st.session_state.processing_step = 0
 
+# Background extraction of the current batch; lives across reruns
+if 'pipeline' not in st.session_state:
+    st.session_state.pipeline = None
+
+# Success message to show once on the next run
+if 'celebrate' not in st.session_state:
+    st.session_state.celebrate = None
+
 # Animated header
 mode_icon = "🌙" if st.session_state.dark_mode else "☀️"
 st.markdown(f"""
@@ -478,6 +521,51 @@ with st.sidebar:
         
         sensitivity_text = "🔥 Strict" if threshold > 0.5 else "⚖️ Balanced" if threshold > 0.3 else "🎯 Lenient"
         st.markdown(f"**Current:** {sensitivity_text}")
+        
+        sentence_matching = st.checkbox(
+            "⚡ Sentence-level matching",
+            value=False,
+            help="Embed each sentence once and reuse it for every category (faster when categories change)"
+        )
+        st.session_state.clustering_engine.tag_scoring = 'sentence' if sentence_matching else 'focused'
+        
+        st.session_state.ocr_policy = st.selectbox(
+            "🔤 OCR engine",
+            POLICIES,
+            index=POLICIES.index(st.session_state.ocr_policy),
+            help="cascade runs Tesseract first and EasyOCR only when Tesseract is unsure; "
+                 "fastest picks an engine after profiling a few of your screenshots; "
+                 "most_accurate prefers EasyOCR when it is installed"
+        )
+        
+        st.session_state.ocr_languages = st.multiselect(
+            "🌐 OCR languages",
+            list(TESSERACT_LANGUAGES),
+            default=st.session_state.ocr_languages,
+            help="Each screenshot is only read with the languages of the script it is written in"
+        ) or ['en']
+        
+        if st.session_state.ocr_profile:
+            st.markdown("**OCR engine profile**")
+            for engine_name, engine_stats in st.session_state.ocr_profile.items():
+                if engine_stats.get('available'):
+                    st.caption(f"{engine_name}: {engine_stats['ms_per_image']:.0f} ms/image, "
+                               f"confidence {engine_stats['mean_confidence']:.2f}")
+                else:
+                    st.caption(f"{engine_name}: not available")
+    
+    with st.expander("🧠 Model Status"):
+        for model_label, model_stats in {**model_registry.stats(), **reader_pool.stats()}.items():
+            if model_stats.get('evicted'):
+                st.markdown(f"💤 **{model_label}** — unloaded to save memory")
+            elif model_stats.get('loaded'):
+                st.markdown(f"✅ **{model_label}** — {model_stats['load_seconds']:.1f}s")
+                if model_stats.get('parameter_mb'):
+                    st.caption(f"{model_stats['parameter_mb']:.0f} MB of weights")
+            elif model_stats.get('error'):
+                st.markdown(f"❌ **{model_label}** — {model_stats['error']}")
+            else:
+                st.markdown(f"⏳ **{model_label}** — loading...")
 
 # Main content
 if user_tags:
@@ -496,6 +584,12 @@ uploaded_files = st.file_uploader(
     help="Supports PNG, JPG, JPEG formats"
 )
 
+# Results refer to the uploads they were organized from; drop them once one is removed
+if st.session_state.organized_results and \
+        not st.session_state.organized_names <= {uploaded_file.name for uploaded_file in uploaded_files or ()}:
+    st.session_state.organized_results = None
+    st.session_state.processing_step = min(st.session_state.processing_step, 1)
+
 if uploaded_files:
     st.markdown(f"""
     <div class="success-boom">
@@ -511,11 +605,62 @@ if uploaded_files:
                 st.image(image, use_container_width=True)
                 st.caption(f[:20])
 
+PIPELINE_STAGES = {
+    'hash': "🧬 Finding duplicates",
+    'ocr': "🔍 Reading text",
+    'embed': "🧠 Embedding",
+}
+
+
+@st.fragment(run_every=1.0)
+def show_pipeline_progress():
+    """Live per-stage progress of the background pipeline, refreshed every second"""
+    progress = st.session_state.pipeline.progress()
+    stages = progress['stages']
+    
+    st.markdown("""
+    <div class="loading-container">
+        <div class="loader"></div>
+        <h3 style="color: #667eea;">🤖 AI IS READING YOUR SCREENSHOTS...</h3>
+        <p>Organize what is ready at any time; extraction keeps going</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    for stage, label in PIPELINE_STAGES.items():
+        done, total = stages[stage]['done'], stages[stage]['total']
+        st.progress(done / total if total else 1.0, text=f"{label}: {done}/{total}")
+    if progress['last']:
+        st.caption(f"⚡ Processed: `{progress['last']}` • {progress['seconds']:.1f}s")
+    if progress['error']:
+        st.error(progress['error'])
+    
+    # Refresh the whole page when the first results can be organized and when done
+    if not progress['running'] or (stages['ocr']['done'] and not st.session_state.extracted_data):
+        st.rerun()
+
 # Processing section
 if uploaded_files and user_tags:
     st.markdown("---")
     st.markdown("### 🚀 AI Processing Pipeline")
     
+    # Pick up whatever the background pipeline has finished since the last run
+    files_by_name = {uploaded_file.name: uploaded_file for uploaded_file in uploaded_files}
+    pipeline = st.session_state.pipeline
+    extracting = pipeline is not None and pipeline.running
+    if pipeline is not None:
+        st.session_state.extracted_data = {
+            name: {**record, 'file': files_by_name[name]}
+            for name, record in pipeline.results().items() if name in files_by_name
+        }
+        if not extracting:
+            progress = pipeline.progress()
+            if progress['error']:
+                st.error(f"⚠️ {progress['error']}")
+            if st.session_state.processing_step == 0:
+                st.session_state.processing_step = 1
+                if progress['error'] is None and not progress['cancelled']:
+                    st.session_state.celebrate = "🎉 TEXT EXTRACTION COMPLETE!"
+    
     # Step indicators
     col1, col2, col3 = st.columns(3)
     
@@ -555,89 +700,65 @@ if uploaded_files and user_tags:
     col_btn1, col_btn2, col_btn3 = st.columns(3)
     
     with col_btn1:
-        if st.button("🔍 EXTRACT TEXT", type="primary", use_container_width=True):
-            # Animated processing
-            st.markdown("""
-            <div class="loading-container">
-                <div class="loader"></div>
-                <h3 style="color: #667eea;">🤖 AI IS READING YOUR SCREENSHOTS...</h3>
-                <p>Please wait while we extract text using OCR technology</p>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            st.session_state.extracted_data = {}
-            st.session_state.organized_results = None
-            
-            progress_bar = st.progress(0)
+        if extracting:
+            if st.button("⏹️ STOP EXTRACTION", type="primary", use_container_width=True):
+                pipeline.cancel()
+                st.rerun()
+        elif st.button("🔍 EXTRACT TEXT", type="primary", use_container_width=True):
             status_text = st.empty()
             
-            for idx, uploaded_file in enumerate(uploaded_files):
-                status_text.markdown(f"**⚡ Processing:** `{uploaded_file.name}`")
-                
-                uploaded_file.seek(0)
-                extracted_text = st.session_state.ocr_processor.extract_text(uploaded_file)
-                
-                st.session_state.extracted_data[uploaded_file.name] = {
-                    'text': extracted_text,
-                    'file': uploaded_file
-                }
-                
-                progress = (idx + 1) / len(uploaded_files)
-                progress_bar.progress(progress)
-                time.sleep(0.1)  # Smooth animation
+            policy = st.session_state.ocr_policy
+            # Without reference texts a profile measures speed only, so only 'fastest' uses one
+            if policy == 'fastest' and st.session_state.ocr_profile is None:
+                status_text.markdown("**🔬 Profiling OCR engines on a few of your screenshots...**")
+                sample = [uploaded_file.getvalue() for uploaded_file in uploaded_files[:3]]
+                st.session_state.ocr_profile = profile_engines([EasyOCREngine(), TesseractEngine()], sample)
+            engine = make_engine(policy, languages=st.session_state.ocr_languages,
+                                 profile=st.session_state.ocr_profile)
+            if (engine.name, engine.params) != (st.session_state.ocr_processor.engine.name,
+                                                st.session_state.ocr_processor.engine.params):
+                st.session_state.ocr_processor.close()  # Its workers run the old engine
+                st.session_state.ocr_processor = OCRProcessor(engine=engine)
             
-            st.session_state.processing_step = 1
-            
-            progress_bar.empty()
-            status_text.empty()
-            
-            st.markdown("""
-            <div class="success-boom">
-                🎉 TEXT EXTRACTION COMPLETE!
-            </div>
-            """, unsafe_allow_html=True)
+            st.session_state.extracted_data = {}
+            st.session_state.organized_results = None
+            st.session_state.processing_step = 0
             
-            st.balloons()
-            time.sleep(1)
+            # OCR, near-duplicate lookup and embedding run in the background;
+            # the page polls its progress and stays usable meanwhile
+            st.session_state.pipeline = ExtractionPipeline(
+                st.session_state.ocr_processor,
+                st.session_state.clustering_engine,
+                st.session_state.duplicate_index,
+                st.session_state.representative_texts
+            )
+            st.session_state.pipeline.start(
+                [(name, uploaded_file.getvalue()) for name, uploaded_file in files_by_name.items()],
+                user_tags
+            )
             st.rerun()
     
     with col_btn2:
         if st.session_state.extracted_data:
-            if st.button("🤖 ORGANIZE NOW", type="secondary", use_container_width=True):
-                # Animated AI processing
-                st.markdown("""
-                <div class="loading-container">
-                    <div class="loader"></div>
-                    <h3 style="color: #764ba2;">🧠 AI IS ANALYZING & ORGANIZING...</h3>
-                    <p>Advanced machine learning algorithms at work</p>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                progress_bar = st.progress(0)
-                
-                # Simulate AI thinking with progress
-                for i in range(100):
-                    progress_bar.progress(i / 100)
-                    time.sleep(0.02)
-                
-                results = st.session_state.clustering_engine.organize_screenshots(
-                    st.session_state.extracted_data,
-                    user_tags
-                )
+            label = "🤖 ORGANIZE NOW"
+            if extracting:
+                label = f"🤖 ORGANIZE {len(st.session_state.extracted_data)}/{len(files_by_name)} NOW"
+            
+            if st.button(label, type="secondary", use_container_width=True):
+                with st.spinner("🧠 AI is analyzing & organizing..."):
+                    # Reuse the last run so only new files and changed categories are recomputed
+                    # Only the records shown on the page, i.e. of files still uploaded
+                    results = st.session_state.pipeline.organize(
+                        user_tags,
+                        previous=st.session_state.last_organized_results,
+                        names=st.session_state.extracted_data
+                    )
                 
                 st.session_state.organized_results = results
-                st.session_state.processing_step = 2
-                
-                progress_bar.empty()
-                
-                st.markdown("""
-                <div class="success-boom">
-                    🚀 ORGANIZATION COMPLETE!
-                </div>
-                """, unsafe_allow_html=True)
-                
-                st.balloons()
-                time.sleep(1)
+                st.session_state.organized_names = frozenset(st.session_state.extracted_data)
+                st.session_state.last_organized_results = results
+                st.session_state.processing_step = max(st.session_state.processing_step, 2)
+                st.session_state.celebrate = "🚀 ORGANIZATION COMPLETE!"
                 st.rerun()
         else:
             st.button("🤖 ORGANIZE NOW", disabled=True, use_container_width=True)
@@ -646,7 +767,7 @@ if uploaded_files and user_tags:
         if st.session_state.organized_results:
             results = st.session_state.organized_results
             report = {
-                'total_files': len(st.session_state.extracted_data),
+                'total_files': len(results['scores']),
                 'matched': results['matched'],
                 'clustered': results['clustered'],
                 'types': results['types']
@@ -664,6 +785,18 @@ if uploaded_files and user_tags:
         else:
             st.button("📥 EXPORT RESULTS", disabled=True, use_container_width=True)
 
+    if extracting:
+        show_pipeline_progress()
+    
+    if st.session_state.celebrate:
+        st.markdown(f"""
+        <div class="success-boom">
+            {st.session_state.celebrate}
+        </div>
+        """, unsafe_allow_html=True)
+        st.balloons()
+        st.session_state.celebrate = None
+
 # Results display
 if st.session_state.organized_results:
     st.markdown("---")
@@ -677,7 +810,8 @@ if st.session_state.organized_results:
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        total_files = len(st.session_state.extracted_data)
+        # Organized files; extraction may still be adding more
+        total_files = len(results['scores'])
         st.metric("📁 TOTAL", total_files)
     
     with col2:
@@ -0,0 +1,274 @@
+"""
+Benchmark for EnhancedClusteringEngine
+
+Generates a synthetic OCR corpus and times each stage of
+organize_screenshots separately, reporting throughput, peak RSS and
+encoder call counts as JSON.
+
+Run from the Screeshot directory:
+
+    python -m benchmarks.bench_clustering --images 2000 --tags 8
+    python -m benchmarks.bench_clustering --encoder minilm --output bench.json
+    python -m benchmarks.bench_clustering --baseline bench.json --tolerance 0.25
+
+The default stub encoder is deterministic and needs no model download, so
+results are comparable across machines and runs.
+"""
+
+import argparse
+import hashlib
+import json
+import platform
+import random
+import sys
+import time
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from utils.smart_clustering import EnhancedClusteringEngine
+
+FILLER_WORDS = (
+    "please update the latest version share view more see all today yesterday click here "
+    "account settings home search notifications welcome back thanks great new open close "
+    "details report week month status done pending review team project page"
+).split()
+
+TAG_POOL = [
+    "LinkedIn profiles", "Job postings", "Candidate resumes", "Interview schedules",
+    "Invoices", "Contracts", "Reports", "Presentations", "Code snippets",
+    "Meeting notes", "Design mockups", "Funny memes", "Email threads", "Receipts",
+    "Travel bookings", "Bank statements",
+]
+
+DEFAULT_TYPE_MIX = "social_media=0.15,recruitment=0.15,code=0.1,receipts=0.1,emails=0.1,meetings=0.1,design=0.05,memes=0.05,none=0.15,empty=0.05"
+
+
+class StubEncoder:
+    """
+    Deterministic offline stand-in for SentenceTransformer
+
+    Each word hashes to a fixed random unit vector and a text embeds to the
+    normalized sum of its words, so related texts still land close together.
+    """
+
+    def __init__(self, dim=384):
+        self.dim = dim
+        self._word_vectors = {}
+        self.calls = 0
+        self.texts = 0
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, normalize_embeddings=False, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        self.calls += 1
+        self.texts += len(texts)
+
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in text.lower().split():
+                out[i] += self._word_vector(word)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        out /= norms
+        return out[0] if single else out
+
+    def _word_vector(self, word):
+        vector = self._word_vectors.get(word)
+        if vector is None:
+            seed = int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little')
+            vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+            self._word_vectors[word] = vector
+        return vector
+
+
+class CountingEncoder:
+    """Wrap a real model so its encode calls are counted like the stub's"""
+
+    def __init__(self, model):
+        self.model = model
+        self.calls = 0
+        self.texts = 0
+
+    def get_sentence_embedding_dimension(self):
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, sentences, *args, **kwargs):
+        self.calls += 1
+        self.texts += 1 if isinstance(sentences, str) else len(sentences)
+        return self.model.encode(sentences, *args, **kwargs)
+
+
+def parse_type_mix(spec):
+    mix = {}
+    for part in spec.split(','):
+        name, weight = part.split('=')
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def make_corpus(n_images, type_mix, patterns, tags, seed=0):
+    """
+    Synthetic OCR texts: a few sentences of filler words, seeded with the
+    chosen type's patterns and, sometimes, words from one of the tags
+    """
+    rng = random.Random(seed)
+    names, weights = zip(*type_mix.items())
+    tag_words = [tag.lower().split() for tag in tags]
+    corpus = {}
+
+    for i in range(n_images):
+        kind = rng.choices(names, weights)[0]
+        if kind == 'empty':
+            text = "[No text detected]"
+        else:
+            sentences = []
+            for _ in range(rng.randint(1, 6)):
+                words = [rng.choice(FILLER_WORDS) for _ in range(rng.randint(4, 14))]
+                if kind in patterns and rng.random() < 0.7:
+                    words.insert(rng.randrange(len(words)), rng.choice(patterns[kind]))
+                if tag_words and rng.random() < 0.3:
+                    words.insert(rng.randrange(len(words)), rng.choice(rng.choice(tag_words)))
+                sentences.append(' '.join(words))
+            text = '. '.join(sentences)
+        corpus[f"screenshot_{i:06d}.png"] = {'text': text, 'file': None}
+
+    return corpus
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_stage(name, n_items, encoder, fn):
+    calls, texts = encoder.calls, encoder.texts
+    start = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - start
+    return name, {
+        'seconds': round(seconds, 6),
+        'items_per_second': round(n_items / seconds, 2) if seconds > 0 else None,
+        'model_calls': encoder.calls - calls,
+        'texts_encoded': encoder.texts - texts,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_benchmark(args):
+    if args.encoder == 'stub':
+        encoder = StubEncoder()
+    else:
+        from sentence_transformers import SentenceTransformer
+        encoder = CountingEncoder(SentenceTransformer(args.model_name))
+
+    def make_engine():
+        # Fresh engine with a memory-only cache so every stage starts cold
+        engine = EnhancedClusteringEngine(args.model_name, cache_dir=None, model=encoder)
+        engine.cluster_method = args.cluster_method
+        engine.tag_scoring = args.tag_scoring
+        return engine
+
+    engine = make_engine()
+    tags = TAG_POOL[:args.tags]
+    corpus = make_corpus(args.images, parse_type_mix(args.type_mix), engine.screenshot_patterns, tags, args.seed)
+    texts = [data['text'] for data in corpus.values()]
+
+    # Unmatched set for the clustering stage, as organize_screenshots would pass it
+    matches = make_engine().match_to_tags_batch(texts, tags)
+    unmatched = {fn: text for fn, text, (tag, _) in zip(corpus, texts, matches) if tag is None}
+
+    stages = dict([
+        run_stage('embedding', len(texts), encoder, lambda: make_engine().generate_embeddings(texts)),
+        run_stage('detect_screenshot_type', len(texts), encoder,
+                  lambda: [engine.detect_screenshot_type(t) for t in texts]),
+        run_stage('match_to_tags', len(texts), encoder, lambda: make_engine().match_to_tags_batch(texts, tags)),
+        run_stage('smart_cluster_unmatched', len(unmatched), encoder,
+                  lambda: make_engine().smart_cluster_unmatched(unmatched)),
+        run_stage('organize_screenshots', len(texts), encoder,
+                  lambda: make_engine().organize_screenshots(corpus, tags)),
+    ])
+
+    return {
+        'config': {
+            'images': args.images,
+            'tags': args.tags,
+            'type_mix': args.type_mix,
+            'encoder': args.encoder,
+            'model_name': args.model_name,
+            'cluster_method': args.cluster_method,
+            'tag_scoring': args.tag_scoring,
+            'seed': args.seed,
+            'unmatched': len(unmatched),
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+        },
+        'stages': stages,
+    }
+
+
+def compare_to_baseline(report, baseline, tolerance):
+    """Per-stage time ratios against a stored report; a stage regresses when slower by more than tolerance"""
+    comparison = {}
+    for stage, result in report['stages'].items():
+        before = baseline.get('stages', {}).get(stage)
+        if not before or not before['seconds']:
+            continue
+        ratio = result['seconds'] / before['seconds']
+        comparison[stage] = {
+            'ratio': round(ratio, 3),
+            'model_calls_delta': result['model_calls'] - before['model_calls'],
+            'regressed': ratio > 1 + tolerance or result['model_calls'] > before['model_calls'],
+        }
+    return comparison
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=2000)
+    parser.add_argument('--tags', type=int, default=8, help=f"Number of categories (max {len(TAG_POOL)})")
+    parser.add_argument('--type-mix', default=DEFAULT_TYPE_MIX,
+                        help="Comma-separated type=weight; 'none' is untyped text, 'empty' has no text")
+    parser.add_argument('--encoder', choices=['stub', 'minilm'], default='stub')
+    parser.add_argument('--model-name', default='all-MiniLM-L6-v2')
+    parser.add_argument('--cluster-method', default='greedy')
+    parser.add_argument('--tag-scoring', choices=['focused', 'sentence'], default='focused')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout")
+    parser.add_argument('--baseline', help="JSON report to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown per stage (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args)
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            report['baseline'] = compare_to_baseline(report, json.load(f), args.tolerance)
+        if any(stage['regressed'] for stage in report['baseline'].values()):
+            exit_code = 1
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
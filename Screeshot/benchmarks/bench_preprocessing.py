@@ -0,0 +1,186 @@
+"""
+Latency vs. accuracy of the OCR preprocessing presets
+
+Renders synthetic screenshots with known text (or reads real ones with a
+ground-truth file), runs each ImagePreprocessor preset followed by OCR,
+and reports preprocessing time, OCR time, prepared image size and
+character accuracy as JSON.
+
+Run from the Screeshot directory:
+
+    python -m benchmarks.bench_preprocessing --engine easyocr
+    python -m benchmarks.bench_preprocessing --engine tesseract --resolutions 1920x1080,3840x2160
+    python -m benchmarks.bench_preprocessing --images shots/ --truth shots/truth.json
+    python -m benchmarks.bench_preprocessing --engine none   # preprocessing cost only
+
+Character accuracy is 1 - edit_distance / len(truth) on whitespace-
+normalized, lowercased text, floored at 0.
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from utils.image_preprocessing import ImagePreprocessor, PRESETS
+from utils.ocr_engines import character_accuracy
+
+from .bench_clustering import FILLER_WORDS
+
+FONT_CANDIDATES = (
+    "DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/Library/Fonts/Arial.ttf",
+    "C:\\Windows\\Fonts\\arial.ttf",
+)
+
+
+def load_font(size):
+    for candidate in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def render_screenshot(width, height, rng, text_height=None, transparent=False):
+    """
+    A synthetic app screenshot: a margin, a panel and lines of filler text
+
+    Returns:
+        tuple: (PNG bytes, ground-truth text)
+    """
+    text_height = text_height or max(12, height // 60)
+    font = load_font(text_height)
+    background = (0, 0, 0, 0) if transparent else (236, 239, 244, 255)
+    image = Image.new('RGBA', (width, height), background)
+    draw = ImageDraw.Draw(image)
+
+    margin = width // 12
+    draw.rectangle((margin, margin, width - margin, height - margin), fill=(255, 255, 255, 255))
+
+    lines = []
+    y = margin + text_height
+    while y + text_height * 2 < height - margin and len(lines) < 40:
+        words = [rng.choice(FILLER_WORDS) for _ in range(rng.randint(3, 9))]
+        line = ' '.join(words)
+        draw.text((margin + text_height, y), line, fill=(33, 33, 33, 255), font=font)
+        lines.append(line)
+        y += int(text_height * 1.8)
+
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG')
+    return buffer.getvalue(), ' '.join(lines)
+
+
+def make_engine(name, languages):
+    """Function mapping a prepared PIL image to text, or None for --engine none"""
+    if name == 'none':
+        return None
+    if name == 'easyocr':
+        from utils.reader_pool import reader_pool
+        reader = reader_pool.get(languages, gpu=False)
+        return lambda image: ' '.join(text for _, text, _ in reader.readtext(np.array(image)))
+    if name == 'tesseract':
+        import pytesseract
+        return pytesseract.image_to_string
+    raise ValueError(f"Unknown OCR engine: {name}")
+
+
+def load_samples(args):
+    """List of (name, image bytes, ground truth)"""
+    if args.images:
+        with open(args.truth, 'r', encoding='utf-8') as f:
+            truth = json.load(f)
+        samples = []
+        for name in sorted(truth):
+            with open(os.path.join(args.images, name), 'rb') as f:
+                samples.append((name, f.read(), truth[name]))
+        return samples
+
+    rng = random.Random(args.seed)
+    samples = []
+    for resolution in args.resolutions.split(','):
+        width, height = (int(v) for v in resolution.lower().split('x'))
+        for i in range(args.per_resolution):
+            data, text = render_screenshot(width, height, rng, transparent=(i % 2 == 1))
+            samples.append((f"{resolution}_{i}.png", data, text))
+    return samples
+
+
+def run_benchmark(args):
+    engine = make_engine(args.engine, args.languages.split(','))
+    samples = load_samples(args)
+    presets = args.presets.split(',')
+    results = {}
+
+    for preset in presets:
+        preprocessor = ImagePreprocessor.from_preset(preset)
+        prep_seconds, ocr_seconds, pixels, accuracies = [], [], [], []
+
+        for name, data, truth in samples:
+            start = time.perf_counter()
+            image, _, _ = preprocessor.process(io.BytesIO(data))
+            prep_seconds.append(time.perf_counter() - start)
+            pixels.append(image.width * image.height)
+
+            if engine is not None:
+                start = time.perf_counter()
+                text = engine(image)
+                ocr_seconds.append(time.perf_counter() - start)
+                accuracies.append(character_accuracy(text, truth))
+
+        results[preset] = {
+            'settings': PRESETS[preset],
+            'preprocess_ms': round(1000 * float(np.mean(prep_seconds)), 2),
+            'ocr_ms': round(1000 * float(np.mean(ocr_seconds)), 2) if ocr_seconds else None,
+            'total_ms': round(1000 * float(np.mean(prep_seconds) + np.mean(ocr_seconds)), 2) if ocr_seconds else None,
+            'mean_megapixels': round(float(np.mean(pixels)) / 1e6, 3),
+            'char_accuracy': round(float(np.mean(accuracies)), 4) if accuracies else None,
+        }
+
+    return {
+        'config': {
+            'engine': args.engine,
+            'samples': len(samples),
+            'source': args.images or args.resolutions,
+            'seed': args.seed,
+        },
+        'presets': results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--engine', choices=['easyocr', 'tesseract', 'none'], default='easyocr')
+    parser.add_argument('--languages', default='en', help="Comma-separated EasyOCR language codes")
+    parser.add_argument('--presets', default=','.join(PRESETS))
+    parser.add_argument('--resolutions', default='1280x720,1920x1080,3840x2160')
+    parser.add_argument('--per-resolution', type=int, default=4)
+    parser.add_argument('--images', help="Directory of real screenshots (needs --truth)")
+    parser.add_argument('--truth', help="JSON of {file name: expected text}")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    if args.images and not args.truth:
+        parser.error("--images needs --truth")
+
+    output = json.dumps(run_benchmark(args), indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""
+False-negative rate of the text-presence pre-filter
+
+Every screenshot under the positives directory (by default the bundled
+organized/ samples) contains text, so each one the detector calls
+textless is a false negative: its text would be lost. Negatives are
+synthetic textless images (gradients, smooth photos, textures, plain UI
+shapes) plus any images in --negatives; the share of them called
+textless is how much OCR the pre-filter saves.
+
+Run from the Screeshot directory:
+
+    python -m benchmarks.eval_text_presence
+    python -m benchmarks.eval_text_presence --negatives ~/Pictures/photos --min-glyphs 16
+
+Exits with status 1 when the false-negative rate is above --max-fn-rate,
+so it can guard threshold changes.
+"""
+
+import argparse
+import glob
+import io
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+
+from utils.text_presence import TextPresenceDetector
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.bmp')
+
+
+def list_images(directory):
+    paths = glob.glob(os.path.join(directory, '**', '*'), recursive=True)
+    return sorted(p for p in paths if p.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def synthetic_negatives(seed, width=1280, height=800):
+    """Textless images as {name: PNG bytes}"""
+    rng = np.random.default_rng(seed)
+    shapes = random.Random(seed)
+    images = {
+        'gradient': Image.fromarray(np.tile(np.linspace(0, 255, width, dtype=np.uint8), (height, 1))),
+    }
+    for i in range(3):
+        smooth = Image.fromarray(rng.integers(0, 255, (12, 18, 3), dtype=np.uint8)).resize((width, height), Image.BICUBIC)
+        texture = Image.fromarray(rng.integers(0, 255, (height, width, 3), dtype=np.uint8))
+        images[f'smooth_{i}'] = smooth
+        images[f'texture_{i}'] = Image.blend(smooth, texture.filter(ImageFilter.GaussianBlur(1.5 + i)), 0.5)
+
+    ui = Image.new('RGB', (width, height), (240, 240, 240))
+    draw = ImageDraw.Draw(ui)
+    for _ in range(15):
+        x, y = shapes.randint(0, width - 100), shapes.randint(0, height - 100)
+        draw.rounded_rectangle((x, y, x + shapes.randint(40, 300), y + shapes.randint(30, 200)), radius=12,
+                               fill=tuple(shapes.randint(0, 255) for _ in range(3)))
+    for _ in range(10):
+        x, y, size = shapes.randint(0, width - 100), shapes.randint(0, height - 100), shapes.randint(10, 80)
+        draw.ellipse((x, y, x + size, y + size), fill=(30, 30, 200))
+    images['ui_shapes'] = ui
+
+    encoded = {}
+    for name, image in images.items():
+        buffer = io.BytesIO()
+        image.save(buffer, 'PNG')
+        encoded[name] = buffer.getvalue()
+    return encoded
+
+
+def evaluate(detector, samples):
+    """Per-image (score, detect ms) for a list of (name, path or bytes)"""
+    rows = []
+    for name, source in samples:
+        image = io.BytesIO(source) if isinstance(source, bytes) else source
+        start = time.perf_counter()
+        score = detector.score(image)
+        rows.append({'name': name, 'score': round(score, 1),
+                     'has_text': score >= detector.min_glyphs,
+                     'ms': round(1000 * (time.perf_counter() - start), 1)})
+    return rows
+
+
+def summarize(rows, expect_text):
+    wrong = [row['name'] for row in rows if row['has_text'] != expect_text]
+    return {
+        'images': len(rows),
+        'called_textless': sum(not row['has_text'] for row in rows),
+        'error_rate': round(len(wrong) / len(rows), 4) if rows else None,
+        'errors': wrong,
+        'min_score': min((row['score'] for row in rows), default=None),
+        'mean_ms': round(float(np.mean([row['ms'] for row in rows])), 1) if rows else None,
+    }
+
+
+def run_evaluation(args):
+    detector = TextPresenceDetector(min_glyphs=args.min_glyphs)
+
+    positives = [(os.path.relpath(path, args.positives), path) for path in list_images(args.positives)]
+    negatives = list(synthetic_negatives(args.seed).items())
+    if args.negatives:
+        negatives += [(os.path.relpath(path, args.negatives), path) for path in list_images(args.negatives)]
+
+    positive_rows = evaluate(detector, positives)
+    negative_rows = evaluate(detector, negatives)
+    positive_summary = summarize(positive_rows, expect_text=True)
+    negative_summary = summarize(negative_rows, expect_text=False)
+
+    return {
+        'config': {
+            'min_glyphs': args.min_glyphs,
+            'positives': args.positives,
+            'negatives': args.negatives,
+            'seed': args.seed,
+        },
+        # Text images the pre-filter would drop
+        'false_negative_rate': positive_summary['error_rate'],
+        # Textless images whose OCR is skipped
+        'skip_rate': round(negative_summary['called_textless'] / len(negative_rows), 4) if negative_rows else None,
+        'positives': positive_summary,
+        'negatives': negative_summary,
+        'images': {'positives': positive_rows, 'negatives': negative_rows},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--positives', default='organized', help="Directory of screenshots that all contain text")
+    parser.add_argument('--negatives', help="Directory of extra textless images")
+    parser.add_argument('--min-glyphs', type=int, default=TextPresenceDetector().min_glyphs)
+    parser.add_argument('--max-fn-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = run_evaluation(args)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if report['false_negative_rate'] is None:
+        print(f"No images found under {args.positives}", file=sys.stderr)
+        return 1
+    return 0 if report['false_negative_rate'] <= args.max_fn_rate else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
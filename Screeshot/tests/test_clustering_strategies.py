@@ -0,0 +1,33 @@
+"""
+Strategy choice of make_strategy('auto', ...)
+
+Run from the Screeshot directory:
+
+    python -m pytest tests
+"""
+
+import pytest
+
+from utils import leader_clustering
+from utils.clustering_strategies import (
+    ANN_MAX_ITEMS, GREEDY_MAX_ITEMS, DensityStrategy, GreedyStrategy, MiniBatchKMeansStrategy, make_strategy,
+)
+
+
+@pytest.mark.parametrize('faiss', [object(), None], ids=['faiss', 'no-faiss'])
+def test_auto_is_exact_greedy_for_small_sets(monkeypatch, faiss):
+    monkeypatch.setattr(leader_clustering, 'faiss', faiss)
+    strategy = make_strategy('auto', GREEDY_MAX_ITEMS)
+    assert isinstance(strategy, GreedyStrategy) and not strategy.approximate
+
+
+def test_auto_switches_to_ann_with_faiss(monkeypatch):
+    monkeypatch.setattr(leader_clustering, 'faiss', object())
+    strategy = make_strategy('auto', GREEDY_MAX_ITEMS + 1)
+    assert isinstance(strategy, GreedyStrategy) and strategy.approximate
+    assert isinstance(make_strategy('auto', ANN_MAX_ITEMS + 1), MiniBatchKMeansStrategy)
+
+
+def test_auto_without_faiss_uses_density(monkeypatch):
+    monkeypatch.setattr(leader_clustering, 'faiss', None)
+    assert isinstance(make_strategy('auto', GREEDY_MAX_ITEMS + 1), DensityStrategy)
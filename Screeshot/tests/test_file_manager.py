@@ -0,0 +1,45 @@
+"""
+ZIP exports of FileManager
+
+Run from the Screeshot directory:
+
+    python -m pytest tests
+"""
+
+import os
+import zipfile
+
+from utils import file_manager
+from utils.file_manager import FileManager
+
+
+class FrozenDatetime:
+    """datetime stand-in whose now() never moves, so every call is in the same second"""
+
+    @staticmethod
+    def now():
+        from datetime import datetime
+        return datetime(2025, 10, 1, 18, 46, 32)
+
+
+def test_zips_in_the_same_second_do_not_collide(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(file_manager, 'datetime', FrozenDatetime)
+    manager = FileManager(link_modes=('copy',))
+
+    extracted = {'a.png': {'text': 'a', 'file': b'first'}}
+    results = {'matched': {'Work': ['a.png']}, 'clustered': {}}
+    exported = manager.export_zip(extracted, results)
+
+    organized_dir = manager.organize_files(
+        {'b.png': {'text': 'b', 'file': b'second'}},
+        {'matched': {}, 'clustered': {'Group_1': ['b.png']}},
+    )
+    created = manager.create_zip(organized_dir)
+
+    assert exported != created
+    assert os.path.basename(exported).startswith('organized_screenshots_20251001_184632')
+    with zipfile.ZipFile(exported) as zf:
+        assert zf.namelist() == ['Work/a.png']
+    with zipfile.ZipFile(created) as zf:
+        assert zf.namelist() == ['Group_1/b.png']
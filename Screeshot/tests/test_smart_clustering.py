@@ -0,0 +1,66 @@
+"""
+Incremental organize_screenshots must give the same groups as a full run
+
+Run from the Screeshot directory:
+
+    python -m pytest tests
+"""
+
+import pytest
+
+from benchmarks.bench_clustering import StubEncoder
+from utils import clustering_strategies
+from utils.smart_clustering import EnhancedClusteringEngine
+
+TAGS = ["Invoices", "Travel bookings"]
+
+# No screenshot-type keywords, so every image goes to the similarity groups
+TOPICS = [
+    "quarterly garden harvest tomatoes basil",
+    "mountain hiking trail summit weather",
+    "guitar chords practice song lyrics",
+    "chess opening gambit knight bishop",
+]
+
+
+def make_data(n_images):
+    return {
+        f"img_{i:03d}.png": {'text': f"{TOPICS[i % len(TOPICS)]} note{i}"}
+        for i in range(n_images)
+    }
+
+
+def make_engine(cluster_method):
+    engine = EnhancedClusteringEngine(cache_dir=None, model=StubEncoder(dim=64))
+    engine.cluster_method = cluster_method
+    return engine
+
+
+def organize_twice(first_method, second_method, first_images, second_images):
+    """Incremental second call after switching methods, and a full run of it"""
+    engine = make_engine(first_method)
+    previous = engine.organize_screenshots(make_data(first_images), TAGS)
+    engine.cluster_method = second_method
+    incremental = engine.organize_screenshots(make_data(second_images), TAGS, previous=previous)
+    full = make_engine(second_method).organize_screenshots(make_data(second_images), TAGS)
+    return incremental, full
+
+
+def test_greedy_incremental_matches_full_run():
+    incremental, full = organize_twice('greedy', 'greedy', 24, 40)
+    assert incremental['clustered'] == full['clustered']
+    assert incremental['state'].leaders is not None
+
+
+@pytest.mark.parametrize('method', ['density', 'minibatch_kmeans', 'greedy_ann'])
+def test_switching_method_reclusters(method):
+    incremental, full = organize_twice('greedy', method, 24, 40)
+    assert incremental['clustered'] == full['clustered']
+    assert incremental['state'].leaders is None
+
+
+def test_auto_leaves_greedy_when_the_set_grows(monkeypatch):
+    monkeypatch.setattr(clustering_strategies, 'GREEDY_MAX_ITEMS', 30)
+    incremental, full = organize_twice('auto', 'auto', 24, 40)
+    assert incremental['clustered'] == full['clustered']
+    assert incremental['state'].leaders is None
@@ -0,0 +1,211 @@
+import errno
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import time
+
+from .ocr_cache import file_hash
+
+# Ways of placing a stored file at another path, cheapest first. A reflink
+# is a copy-on-write clone (Btrfs, XFS, APFS...): as cheap as a hardlink but
+# an independent file. Hardlinks share the blob's inode, so blobs are kept
+# read-only. Symlinks work across filesystems; copy always works.
+LINK_MODES = ('reflink', 'hardlink', 'symlink', 'copy')
+
+# ioctl that clones a whole file on Linux
+FICLONE = 0x40049409
+
+
+def _read(file_obj):
+    if isinstance(file_obj, (bytes, bytearray)):
+        return bytes(file_obj)
+    if hasattr(file_obj, 'getvalue'):
+        return file_obj.getvalue()
+    if hasattr(file_obj, 'read'):
+        file_obj.seek(0)
+        return file_obj.read()
+    with open(file_obj, 'rb') as f:
+        return f.read()
+
+
+def _make_writable(path):
+    os.chmod(path, os.lstat(path).st_mode | stat.S_IWRITE)
+
+
+def remove_file(path):
+    """
+    os.unlink that also deletes read-only files
+
+    Windows refuses to delete a read-only file, and a hardlink to a blob
+    shares the blob's read-only mode.
+    """
+    try:
+        os.unlink(path)
+    except PermissionError:
+        if os.path.islink(path):
+            raise
+        _make_writable(path)
+        os.unlink(path)
+
+
+def _retry_writable(func, path, _):
+    # rmtree error handler: clear the read-only bit and retry once
+    if os.path.islink(path):
+        raise
+    _make_writable(path)
+    func(path)
+
+
+def remove_tree(path):
+    """shutil.rmtree that also deletes read-only files, see remove_file"""
+    if sys.version_info >= (3, 12):
+        shutil.rmtree(path, onexc=_retry_writable)
+    else:
+        shutil.rmtree(path, onerror=_retry_writable)
+
+
+def _reflink(source, target):
+    import fcntl
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.unlink(target)
+            raise
+
+
+class BlobStore:
+    """
+    Content-addressed file store
+
+    Each distinct file is written once, as <root>/<first 2 hex>/<hash><ext>;
+    organized folders are then materialized as links to those blobs, so
+    organizing the same screenshots again costs no extra disk and almost
+    no time.
+    """
+
+    def __init__(self, root, link_modes=LINK_MODES):
+        """
+        Args:
+            root: Directory of the blobs
+            link_modes: Materialization methods to try, in order (see LINK_MODES)
+        """
+        self.root = root
+        self.link_modes = tuple(link_modes)
+        # (blob device, target device) -> index of the first mode that worked
+        self._working_mode = {}
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, digest, ext=''):
+        return os.path.join(self.root, digest[:2], digest + ext.lower())
+
+    def put(self, file_obj, ext=''):
+        """
+        Store a file unless an identical one is already stored
+
+        Args:
+            file_obj: Bytes, an uploaded file object or a path
+            ext: Extension kept on the blob, e.g. '.png', so links open in image viewers
+
+        Returns:
+            tuple: (blob path, True when it was newly written)
+        """
+        data = _read(file_obj)
+        path = self.path(file_hash(data), ext)
+        if os.path.exists(path):
+            # Fresh mtime keeps the blob out of collect() until it is linked
+            os.utime(path)
+            return path, False
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.chmod(tmp_path, 0o444)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return path, True
+
+    def materialize(self, blob_path, target):
+        """
+        Make target show the blob's content, with the cheapest mode that works
+
+        Returns:
+            str: The mode used, one of link_modes
+        """
+        if os.path.lexists(target):
+            remove_file(target)
+
+        devices = (os.stat(blob_path).st_dev, os.stat(os.path.dirname(target) or '.').st_dev)
+        first = self._working_mode.get(devices, 0)
+        for index in range(first, len(self.link_modes)):
+            mode = self.link_modes[index]
+            try:
+                self._link(mode, blob_path, target)
+            except (OSError, ImportError, NotImplementedError) as e:
+                if mode == 'copy' or (isinstance(e, OSError) and e.errno == errno.ENOSPC):
+                    raise
+                continue
+            # Later files between the same filesystems skip the modes that failed
+            self._working_mode[devices] = index
+            return mode
+        raise OSError(f"Could not materialize {target} with any of {self.link_modes}")
+
+    def _link(self, mode, blob_path, target):
+        if mode == 'reflink':
+            _reflink(blob_path, target)
+        elif mode == 'hardlink':
+            os.link(blob_path, target)
+        elif mode == 'symlink':
+            os.symlink(os.path.relpath(os.path.abspath(blob_path), os.path.dirname(os.path.abspath(target))), target)
+        elif mode == 'copy':
+            shutil.copyfile(blob_path, target)
+        else:
+            raise ValueError(f"Unknown link mode: {mode}")
+
+    def __iter__(self):
+        """Paths of all stored blobs"""
+        for entry in os.scandir(self.root):
+            if entry.is_dir():
+                for blob in os.scandir(entry.path):
+                    if blob.is_file() and not blob.name.endswith('.tmp'):
+                        yield blob.path
+
+    def total_bytes(self):
+        return sum(os.path.getsize(path) for path in self)
+
+    def collect(self, keep=(), min_age=60):
+        """
+        Delete blobs that nothing points at any more
+
+        A blob is unreferenced when it has no other hardlink and is not in
+        keep; reflinked and copied files do not depend on their blob.
+
+        Args:
+            keep: Blob paths still in use, e.g. the targets of symlinks
+            min_age: Blobs stored or reused more recently, in seconds, are
+                kept, so a run that is linking them cannot lose them
+
+        Returns:
+            int: Bytes freed
+        """
+        keep = {os.path.realpath(path) for path in keep}
+        cutoff = time.time() - min_age
+        freed = 0
+        for path in list(self):
+            try:
+                st = os.stat(path)
+                if st.st_nlink > 1 or st.st_mtime > cutoff or os.path.realpath(path) in keep:
+                    continue
+                remove_file(path)
+            except FileNotFoundError:
+                continue
+            freed += st.st_size
+        return freed
@@ -0,0 +1,276 @@
+import numpy as np
+
+from . import leader_clustering
+from .leader_clustering import normalize_rows, leader_cluster, leader_cluster_ann
+
+# Dataset sizes at which make_strategy('auto', ...) moves to the next strategy.
+# With faiss, greedy_ann takes over from greedy up to ANN_MAX_ITEMS and keeps
+# its leader semantics; without it, density-based clustering does.
+GREEDY_MAX_ITEMS = 20000
+ANN_MAX_ITEMS = 100000
+DENSITY_MAX_ITEMS = 100000
+
+
+def _chunks(embeddings, chunk_size):
+    for start in range(0, len(embeddings), chunk_size):
+        yield embeddings[start:start + chunk_size]
+
+
+def _renumber(labels):
+    """Relabel clusters 0.. in order of first appearance, keeping -1 (noise) as is"""
+    labels = np.asarray(labels, dtype=np.int64)
+    mapping = {}
+    out = np.empty_like(labels)
+    for i, label in enumerate(labels):
+        if label < 0:
+            out[i] = -1
+        else:
+            out[i] = mapping.setdefault(label, len(mapping))
+    return out
+
+
+def suggest_n_clusters(n_items):
+    """Rule-of-thumb cluster count for k-means style strategies"""
+    return int(np.clip(round(np.sqrt(n_items / 2)), 2, 500))
+
+
+class ClusteringStrategy:
+    """
+    Common interface of the clustering backends
+
+    Embeddings can be passed whole to fit_predict, or streamed with
+    partial_fit and labelled afterwards with predict. Labels are ints
+    numbered from 0; -1 means the item was left unclustered (noise).
+    """
+    name = None
+
+    def partial_fit(self, chunk):
+        raise NotImplementedError
+
+    def predict(self, chunk):
+        raise NotImplementedError
+
+    def fit_predict(self, embeddings, chunk_size=10000):
+        for chunk in _chunks(embeddings, chunk_size):
+            self.partial_fit(chunk)
+        labels = np.concatenate([self.predict(chunk) for chunk in _chunks(embeddings, chunk_size)])
+        return _renumber(labels)
+
+
+class GreedyStrategy(ClusteringStrategy):
+    """
+    Threshold-based leader clustering (the engine's original grouping)
+
+    Streaming is exact: each chunk's items first join the earliest leader
+    they match, then the rest are leader-clustered among themselves, which
+    is what one pass over the whole sequence would do.
+    """
+    name = 'greedy'
+
+    def __init__(self, threshold=0.35, approximate=False, leaders=None, leader_block=4096):
+        """
+        Args:
+            threshold: Cosine similarity needed to join a group
+            approximate: Use the nearest-neighbour graph (leader_cluster_ann) in fit_predict
+            leaders: Normalized leader vectors from an earlier run to continue from
+            leader_block: Leaders compared per matrix product when assigning a chunk
+        """
+        self.threshold = threshold
+        self.approximate = approximate
+        self.leader_block = leader_block
+        self.leaders = leaders
+
+    def partial_fit(self, chunk):
+        """Cluster a chunk after everything seen so far; returns its labels"""
+        vectors = normalize_rows(chunk)
+        labels = self.predict(vectors)
+        n_leaders = 0 if self.leaders is None else len(self.leaders)
+
+        rest = np.flatnonzero(labels < 0)
+        if len(rest):
+            rest_labels = leader_cluster(vectors[rest], self.threshold)
+            labels[rest] = rest_labels + n_leaders
+            _, first = np.unique(rest_labels, return_index=True)
+            new_leaders = vectors[rest][first]
+            self.leaders = new_leaders if self.leaders is None else np.vstack([self.leaders, new_leaders])
+
+        return labels
+
+    def predict(self, chunk):
+        """Label of the earliest leader each item matches, -1 when none does"""
+        vectors = normalize_rows(chunk)
+        labels = np.full(len(vectors), -1, dtype=np.int64)
+        if self.leaders is None:
+            return labels
+
+        for start in range(0, len(self.leaders), self.leader_block):
+            open_rows = np.flatnonzero(labels < 0)
+            if len(open_rows) == 0:
+                break
+            block = self.leaders[start:start + self.leader_block]
+            claimed = (vectors[open_rows] @ block.T) >= self.threshold
+            has_group = claimed.any(axis=1)
+            labels[open_rows[has_group]] = claimed[has_group].argmax(axis=1) + start
+
+        return labels
+
+    def fit_predict(self, embeddings, chunk_size=10000):
+        if self.approximate:
+            self.leaders = None  # Groups from the graph are not reusable for streaming
+            return leader_cluster_ann(embeddings, self.threshold)
+        return np.concatenate([self.partial_fit(chunk) for chunk in _chunks(embeddings, chunk_size)])
+
+
+class MiniBatchKMeansStrategy(ClusteringStrategy):
+    """Streaming k-means on normalized embeddings (MiniBatchKMeans.partial_fit)"""
+    name = 'minibatch_kmeans'
+
+    def __init__(self, n_clusters=None, n_items=None, random_state=42):
+        """
+        Args:
+            n_clusters: Number of clusters, derived from n_items when None
+            n_items: Expected dataset size, used only to pick n_clusters
+        """
+        self.n_clusters = n_clusters or suggest_n_clusters(n_items or 1000)
+        self.random_state = random_state
+        self.model = None
+
+    def partial_fit(self, chunk):
+        from sklearn.cluster import MiniBatchKMeans
+
+        vectors = normalize_rows(chunk)
+        if self.model is None:
+            self.n_clusters = min(self.n_clusters, len(vectors))
+            self.model = MiniBatchKMeans(n_clusters=self.n_clusters, random_state=self.random_state, n_init=3)
+        self.model.partial_fit(vectors)
+        return self
+
+    def predict(self, chunk):
+        return self.model.predict(normalize_rows(chunk)).astype(np.int64)
+
+
+class DensityStrategy(ClusteringStrategy):
+    """
+    Density-based clustering (HDBSCAN) in a PCA-reduced space
+
+    PCA is fitted incrementally on chunks and HDBSCAN on a bounded random
+    sample; every item then takes the label of its nearest sampled
+    neighbour, so memory stays flat as the archive grows.
+    """
+    name = 'density'
+
+    def __init__(self, n_components=32, min_cluster_size=5, max_fit_samples=20000, random_state=42):
+        self.n_components = n_components
+        self.min_cluster_size = min_cluster_size
+        self.max_fit_samples = max_fit_samples
+        self.random_state = random_state
+        self.rng = np.random.default_rng(random_state)
+
+        self.pca = None
+        self.sample = None       # Reservoir of normalized vectors used to fit HDBSCAN
+        self.filled = 0
+        self.seen = 0
+        self.neighbors = None
+        self.sample_labels = None
+
+    def partial_fit(self, chunk):
+        from sklearn.decomposition import IncrementalPCA
+
+        vectors = normalize_rows(chunk)
+        if self.pca is None:
+            n_components = min(self.n_components, vectors.shape[1], len(vectors))
+            self.pca = IncrementalPCA(n_components=n_components)
+        if len(vectors) >= self.pca.n_components:
+            self.pca.partial_fit(vectors)
+        self._add_to_reservoir(vectors)
+        self.neighbors = None  # Refit lazily on the next predict
+        return self
+
+    def predict(self, chunk):
+        if self.neighbors is None:
+            self._fit_density()
+        if self.sample_labels is None:
+            return np.zeros(len(chunk), dtype=np.int64)
+        _, nearest = self.neighbors.kneighbors(self._reduce(normalize_rows(chunk)))
+        return self.sample_labels[nearest[:, 0]]
+
+    def _reduce(self, vectors):
+        if self.pca is not None and hasattr(self.pca, 'components_'):
+            return self.pca.transform(vectors)
+        return vectors
+
+    def _add_to_reservoir(self, vectors):
+        # Reservoir sampling keeps a uniform sample of everything seen so far
+        if self.sample is None:
+            self.sample = np.empty((self.max_fit_samples, vectors.shape[1]), dtype=np.float32)
+
+        free = min(self.max_fit_samples - self.filled, len(vectors))
+        self.sample[self.filled:self.filled + free] = vectors[:free]
+        self.filled += free
+        self.seen += free
+
+        rest = vectors[free:]
+        if len(rest):
+            positions = self.seen + np.arange(1, len(rest) + 1)
+            slots = self.rng.integers(0, positions)
+            keep = slots < self.max_fit_samples
+            self.sample[slots[keep]] = rest[keep]
+            self.seen += len(rest)
+
+    def _fit_density(self):
+        from sklearn.neighbors import NearestNeighbors
+        try:
+            from sklearn.cluster import HDBSCAN
+            clusterer = HDBSCAN(min_cluster_size=self.min_cluster_size, copy=True)
+        except ImportError:  # scikit-learn < 1.3
+            from sklearn.cluster import DBSCAN
+            clusterer = DBSCAN(eps=0.5, min_samples=self.min_cluster_size)
+
+        if self.filled == 0:
+            return
+        reduced = self._reduce(self.sample[:self.filled])
+        if len(reduced) <= self.min_cluster_size:
+            self.sample_labels = np.zeros(len(reduced), dtype=np.int64)
+        else:
+            self.sample_labels = clusterer.fit_predict(reduced).astype(np.int64)
+        self.neighbors = NearestNeighbors(n_neighbors=1).fit(reduced)
+
+
+STRATEGIES = {
+    'greedy': GreedyStrategy,
+    'minibatch_kmeans': MiniBatchKMeansStrategy,
+    'density': DensityStrategy,
+}
+
+
+def make_strategy(name, n_items, threshold=0.35, n_clusters=None):
+    """
+    Build a clustering strategy
+
+    Args:
+        name: 'greedy', 'greedy_ann', 'minibatch_kmeans', 'density' or 'auto'
+        n_items: Size of the dataset to cluster; 'auto' picks greedy for small
+            sets, greedy_ann (when faiss is installed) or else density for
+            medium ones, and streaming k-means for archives
+        threshold: Similarity threshold of the greedy strategies
+        n_clusters: Cluster count for k-means, derived from n_items when None
+    """
+    if name == 'auto':
+        if n_items <= GREEDY_MAX_ITEMS:
+            name = 'greedy'
+        elif leader_clustering.faiss is not None and n_items <= ANN_MAX_ITEMS:
+            name = 'greedy_ann'
+        elif n_items <= DENSITY_MAX_ITEMS:
+            name = 'density'
+        else:
+            name = 'minibatch_kmeans'
+
+    if name == 'greedy':
+        return GreedyStrategy(threshold)
+    if name == 'greedy_ann':
+        return GreedyStrategy(threshold, approximate=True)
+    if name == 'minibatch_kmeans':
+        return MiniBatchKMeansStrategy(n_clusters=n_clusters, n_items=n_items)
+    if name == 'density':
+        return DensityStrategy()
+    raise ValueError(f"Unknown clustering strategy: {name}")
@@ -0,0 +1,202 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are serialized
+    fcntl = None
+
+# One lock per cache directory so engines in the same process append safely
+_dir_locks = {}
+_dir_locks_guard = threading.Lock()
+
+
+def _lock_for(directory):
+    with _dir_locks_guard:
+        if directory not in _dir_locks:
+            _dir_locks[directory] = threading.Lock()
+        return _dir_locks[directory]
+
+
+class _DirectoryLock:
+    """Thread lock of the directory plus an flock on its .lock file, held across processes"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._file = None
+
+    def __enter__(self):
+        _lock_for(self.directory).acquire()
+        if fcntl is not None:
+            self._file = open(os.path.join(self.directory, ".lock"), 'a')
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        _lock_for(self.directory).release()
+
+
+def normalize_text(text):
+    """Normalize text before hashing so trivial whitespace/unicode differences share a key"""
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+def make_key(model_name, text):
+    """Content-addressed cache key for (model, text)"""
+    payload = f"{model_name}\0{normalize_text(text)}".encode('utf-8')
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache
+
+    - Memory tier: LRU of vectors bounded by max_memory_bytes
+    - Disk tier: append-only float32 matrix (read through np.memmap) plus a
+      JSON index of key -> row offset, so embeddings survive app restarts
+    """
+
+    def __init__(self, model_name, dim, cache_dir="embedding_cache", max_memory_bytes=64 * 1024 * 1024):
+        """
+        Args:
+            model_name: Name of the encoder, part of every key
+            dim: Embedding dimension
+            cache_dir: Root directory for the disk tier, None for memory only
+            max_memory_bytes: Byte budget of the in-memory LRU tier
+        """
+        self.model_name = model_name
+        self.dim = dim
+        self.max_memory_bytes = max_memory_bytes
+
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+
+        self.directory = None
+        self._index = {}
+        self._pending = {}
+        self._matrix = None
+        if cache_dir:
+            safe_name = "".join(c if c.isalnum() or c in '-_.' else '_' for c in model_name)
+            self.directory = os.path.abspath(os.path.join(cache_dir, f"{safe_name}_{dim}"))
+            os.makedirs(self.directory, exist_ok=True)
+            self._vectors_path = os.path.join(self.directory, "vectors.f32")
+            self._index_path = os.path.join(self.directory, "index.json")
+            self._index = self._load_index()
+
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+
+    def key(self, text):
+        return make_key(self.model_name, text)
+
+    def get(self, key):
+        """Return the cached vector for key (read-only, copy it to modify), or None"""
+        vector = self._memory.get(key)
+        if vector is not None:
+            self._memory.move_to_end(key)
+            self.stats['memory_hits'] += 1
+            return vector
+
+        # Not flushed yet, but maybe already dropped from the LRU
+        vector = self._pending.get(key)
+        if vector is not None:
+            self._remember(key, vector)
+            self.stats['memory_hits'] += 1
+            return vector
+
+        row = self._index.get(key)
+        if row is not None:
+            vector = self._read_row(row)
+            if vector is not None:
+                self._remember(key, vector)
+                self.stats['disk_hits'] += 1
+                return vector
+
+        self.stats['misses'] += 1
+        return None
+
+    def put(self, key, vector):
+        """Store a vector in both tiers (disk writes are buffered until flush)"""
+        vector = np.asarray(vector, dtype=np.float32).reshape(self.dim).copy()
+        self._remember(key, vector)
+        if self.directory and key not in self._index:
+            self._pending[key] = vector
+
+    def flush(self):
+        """Append pending vectors to the disk tier and rewrite the index atomically"""
+        if not self.directory or not self._pending:
+            return
+
+        with _DirectoryLock(self.directory):
+            # Merge what other engines and processes may have written since we loaded
+            self._index.update(self._load_index())
+            new_items = [(k, v) for k, v in self._pending.items() if k not in self._index]
+
+            if new_items:
+                block = np.stack([v for _, v in new_items]).astype(np.float32)
+                row_bytes = self.dim * 4
+                with open(self._vectors_path, 'ab') as f:
+                    end = f.seek(0, os.SEEK_END)
+                    if end % row_bytes:
+                        # A crash left a partial row that no index entry points at
+                        end -= end % row_bytes
+                        f.truncate(end)
+                    f.write(block.tobytes())
+                first_row = end // row_bytes
+                for offset, (key, _) in enumerate(new_items):
+                    self._index[key] = first_row + offset
+
+            self._write_index()
+            self._pending = {}
+            self._matrix = None  # File grew; reopen the memmap lazily
+
+    def __len__(self):
+        return len(set(self._index) | set(self._memory))
+
+    def _remember(self, key, vector):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        # Handed out by get(); callers must not be able to change the cache
+        vector.flags.writeable = False
+        self._memory[key] = vector
+        self._memory_bytes += vector.nbytes
+        while self._memory_bytes > self.max_memory_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+
+    def _read_row(self, row):
+        if self._matrix is None or row >= self._matrix.shape[0]:
+            if not os.path.exists(self._vectors_path):
+                return None
+            rows = os.path.getsize(self._vectors_path) // (self.dim * 4)
+            if row >= rows:
+                return None
+            self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode='r', shape=(rows, self.dim))
+        return np.array(self._matrix[row])
+
+    def _load_index(self):
+        try:
+            with open(self._index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('model') == self.model_name and data.get('dim') == self.dim:
+                return data.get('rows', {})
+        except (OSError, ValueError):
+            pass
+        return {}
+
+    def _write_index(self):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'model': self.model_name, 'dim': self.dim, 'rows': self._index}, f)
+        os.replace(tmp_path, self._index_path)
@@ -0,0 +1,150 @@
+import numpy as np
+
+from .leader_clustering import normalize_rows
+
+DTYPES = ('float32', 'float16', 'int8')
+
+
+class EmbeddingStore:
+    """
+    Contiguous, growable matrix of unit-normalized embeddings
+
+    - float32: exact
+    - float16: half the memory
+    - int8: a quarter of the memory, scalar-quantized with one scale per vector
+
+    Similarity kernels work block by block on the stored codes, so a
+    float32 copy of the whole store is never materialized.
+    """
+
+    def __init__(self, dim, dtype='float32', capacity=1024, block_size=8192):
+        """
+        Args:
+            dim: Embedding dimension
+            dtype: 'float32', 'float16' or 'int8'
+            capacity: Initial number of rows to allocate
+            block_size: Rows decoded at a time by the similarity kernels
+        """
+        if dtype not in DTYPES:
+            raise ValueError(f"dtype must be one of {DTYPES}")
+        self.dim = dim
+        self.dtype = dtype
+        self.block_size = block_size
+        self._codes = np.zeros((capacity, dim), dtype=np.int8 if dtype == 'int8' else dtype)
+        self._scales = np.ones(capacity, dtype=np.float32) if dtype == 'int8' else None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self):
+        used = self._codes[:self._size].nbytes
+        if self._scales is not None:
+            used += self._scales[:self._size].nbytes
+        return used
+
+    def add(self, vectors):
+        """
+        Append embeddings (normalized on the way in)
+        Returns: np.ndarray of the new row ids
+        """
+        vectors = normalize_rows(np.atleast_2d(vectors))
+        start, end = self._size, self._size + len(vectors)
+        self._reserve(end)
+
+        if self.dtype == 'int8':
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            self._codes[start:end] = np.round(vectors / scales[:, None]).astype(np.int8)
+            self._scales[start:end] = scales
+        else:
+            self._codes[start:end] = vectors
+
+        self._size = end
+        return np.arange(start, end)
+
+    def get(self, rows=None):
+        """Decoded float32 embeddings for rows (all rows when None)"""
+        if rows is None:
+            rows = slice(0, self._size)
+        return self._decode(self._codes[rows], None if self._scales is None else self._scales[rows])
+
+    def similarity(self, queries):
+        """
+        Cosine similarity of every query to every stored embedding
+        Returns: float32 array of shape (n_queries, len(self))
+        """
+        queries = normalize_rows(np.atleast_2d(queries))
+        out = np.empty((len(queries), self._size), dtype=np.float32)
+        for start in range(0, self._size, self.block_size):
+            end = min(start + self.block_size, self._size)
+            block = self._codes[start:end].astype(np.float32)
+            out[:, start:end] = queries @ block.T
+            if self._scales is not None:
+                out[:, start:end] *= self._scales[start:end]
+        return out
+
+    def top_k(self, queries, k=10):
+        """Row ids of the k most similar embeddings per query, best first"""
+        similarities = self.similarity(queries)
+        k = min(k, self._size)
+        if k == 0:
+            return np.zeros((len(similarities), 0), dtype=np.int64)
+        top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(similarities, top, axis=1), axis=1)
+        return np.take_along_axis(top, order, axis=1)
+
+    def _decode(self, codes, scales):
+        decoded = codes.astype(np.float32)
+        if scales is not None:
+            decoded *= scales[:, None]
+        return decoded
+
+    def _reserve(self, rows):
+        if rows <= len(self._codes):
+            return
+        capacity = max(rows, 2 * len(self._codes))
+        codes = np.zeros((capacity, self.dim), dtype=self._codes.dtype)
+        codes[:self._size] = self._codes[:self._size]
+        self._codes = codes
+        if self._scales is not None:
+            scales = np.ones(capacity, dtype=np.float32)
+            scales[:self._size] = self._scales[:self._size]
+            self._scales = scales
+
+
+def evaluate_modes(embeddings, queries, k=10):
+    """
+    Accuracy of each storage mode against float32
+
+    Args:
+        embeddings: Corpus embeddings, shape (n, dim)
+        queries: Query embeddings, shape (q, dim)
+        k: Neighbourhood size for recall@k
+
+    Returns:
+        dict: {dtype: {'bytes', 'bytes_per_vector', 'recall_at_k', 'mean_abs_error', 'max_abs_error'}}
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    reference = EmbeddingStore(embeddings.shape[1], 'float32', capacity=len(embeddings))
+    reference.add(embeddings)
+    exact_scores = reference.similarity(queries)
+    exact_top = reference.top_k(queries, k)
+
+    report = {}
+    for dtype in DTYPES:
+        store = EmbeddingStore(embeddings.shape[1], dtype, capacity=len(embeddings))
+        store.add(embeddings)
+        scores = store.similarity(queries)
+        top = store.top_k(queries, k)
+        hits = sum(len(set(a) & set(b)) for a, b in zip(exact_top, top))
+        error = np.abs(scores - exact_scores)
+        report[dtype] = {
+            'bytes': int(store.nbytes),
+            'bytes_per_vector': store.nbytes / max(len(store), 1),
+            'recall_at_k': hits / max(exact_top.size, 1),
+            'mean_abs_error': float(error.mean()) if error.size else 0.0,
+            'max_abs_error': float(error.max()) if error.size else 0.0,
+        }
+    return report
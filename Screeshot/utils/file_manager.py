@@ -1,28 +1,80 @@
 import os
-import shutil
-import zipfile
+import tempfile
+from collections import Counter
 from pathlib import Path
 from datetime import datetime
 
+from .blob_store import BlobStore, LINK_MODES, remove_tree
+from .retention import RetentionManager, ORGANIZED_BUDGET, TEMP_ZIP_BUDGET
+from .zip_stream import write_zip
+
 class FileManager:
-    def __init__(self):
+    def __init__(self, link_modes=LINK_MODES, organized_budget=None, zip_budget=None):
+        """
+        Args:
+            link_modes: How organized folders point at the stored screenshots,
+                tried in order: 'reflink', 'hardlink', 'symlink', 'copy'
+            organized_budget: max_bytes, max_entries and ttl_seconds of the
+                organized runs (defaults to retention.ORGANIZED_BUDGET)
+            zip_budget: Same for the ZIPs (defaults to retention.TEMP_ZIP_BUDGET)
+        """
         self.base_output_dir = "organized"
         self.temp_zip_dir = "temp_zip"
         
         # Create directories if they don't exist
         os.makedirs(self.base_output_dir, exist_ok=True)
         os.makedirs(self.temp_zip_dir, exist_ok=True)
+        
+        # Every screenshot is stored once here; organized folders link to it
+        self.blob_store = BlobStore(os.path.join(self.base_output_dir, "blobs"), link_modes)
+        self.last_run = None
+        self.last_export = None
+        
+        # Old runs and ZIPs are evicted in the background as new ones are saved
+        self.organized_retention = RetentionManager(
+            self.base_output_dir, "organized_", blob_store=self.blob_store,
+            **(ORGANIZED_BUDGET if organized_budget is None else organized_budget)
+        )
+        self.zip_retention = RetentionManager(
+            self.temp_zip_dir, "organized_screenshots_",
+            **(TEMP_ZIP_BUDGET if zip_budget is None else zip_budget)
+        )
     
     def clean_directory(self, directory):
         """Remove all files in a directory"""
         if os.path.exists(directory):
-            shutil.rmtree(directory)
+            remove_tree(directory)
         os.makedirs(directory, exist_ok=True)
     
+    def plan(self, extracted_data, organized_results):
+        """
+        Where every file goes, without touching the disk
+        
+        Args:
+            extracted_data: Dict of {filename: {'text': str, 'file': file}}
+            organized_results: Results from clustering engine
+            
+        Returns:
+            list: (folder, filename, file object) tuples, matched tags first
+        """
+        placements = []
+        for tag, filenames in organized_results['matched'].items():
+            for filename in filenames:
+                placements.append((tag, filename, extracted_data[filename]['file']))
+        for cluster_name, filenames in organized_results['clustered'].items():
+            for filename in filenames:
+                placements.append((cluster_name, filename, extracted_data[filename]['file']))
+        return placements
+    
     def organize_files(self, extracted_data, organized_results):
         """
         Organize files into folders based on clustering results
         
+        Files are deduplicated into the blob store and the folders are made
+        of links to it, so a run only writes screenshots not seen before.
+        What happened is kept in self.last_run: files placed, blobs and
+        bytes newly written, and how many files each link mode placed.
+        
         Args:
             extracted_data: Dict of {filename: {'text': str, 'file': file}}
             organized_results: Results from clustering engine
@@ -36,41 +88,32 @@ class FileManager:
         
         # Clean and create output directory
         self.clean_directory(output_dir)
+        self.last_run = {'files': 0, 'new_blobs': 0, 'bytes_written': 0, 'modes': Counter()}
+        blobs = {}  # filename -> blob path, so a file listed twice is hashed once
         
-        # Organize matched files
-        for tag, filenames in organized_results['matched'].items():
-            if filenames:
-                tag_dir = os.path.join(output_dir, tag)
-                os.makedirs(tag_dir, exist_ok=True)
-                
-                for filename in filenames:
-                    self._save_file(
-                        extracted_data[filename]['file'],
-                        tag_dir,
-                        filename
-                    )
-        
-        # Organize clustered files
-        for cluster_name, filenames in organized_results['clustered'].items():
-            cluster_dir = os.path.join(output_dir, cluster_name)
-            os.makedirs(cluster_dir, exist_ok=True)
-            
-            for filename in filenames:
-                self._save_file(
-                    extracted_data[filename]['file'],
-                    cluster_dir,
-                    filename
-                )
+        for folder, filename, file_obj in self.plan(extracted_data, organized_results):
+            folder_dir = os.path.join(output_dir, folder)
+            os.makedirs(folder_dir, exist_ok=True)
+            self._save_file(file_obj, folder_dir, filename, blobs)
         
+        self.organized_retention.register(output_dir)
         return output_dir
     
-    def _save_file(self, file_obj, directory, filename):
-        """Save uploaded file to directory"""
-        file_obj.seek(0)
-        filepath = os.path.join(directory, filename)
+    def _save_file(self, file_obj, directory, filename, blobs=None):
+        """Store uploaded file in the blob store and link it into directory"""
+        blobs = {} if blobs is None else blobs
+        blob_path = blobs.get(filename)
+        if blob_path is None:
+            blob_path, written = self.blob_store.put(file_obj, os.path.splitext(filename)[1])
+            blobs[filename] = blob_path
+            if written and self.last_run is not None:
+                self.last_run['new_blobs'] += 1
+                self.last_run['bytes_written'] += os.path.getsize(blob_path)
         
-        with open(filepath, 'wb') as f:
-            f.write(file_obj.read())
+        mode = self.blob_store.materialize(blob_path, os.path.join(directory, filename))
+        if self.last_run is not None:
+            self.last_run['files'] += 1
+            self.last_run['modes'][mode] += 1
     
     def create_zip(self, organized_dir):
         """
@@ -82,20 +125,58 @@ class FileManager:
         Returns:
             str: Path to created ZIP file
         """
-        # Create ZIP filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        zip_filename = f"organized_screenshots_{timestamp}.zip"
-        zip_path = os.path.join(self.temp_zip_dir, zip_filename)
-        
-        # Create ZIP file
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(organized_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    # Get relative path for ZIP
-                    arcname = os.path.relpath(file_path, organized_dir)
-                    zipf.write(file_path, arcname)
+        self.organized_retention.touch(organized_dir)
+        members = []
+        for root, dirs, files in os.walk(organized_dir):
+            for file in files:
+                file_path = os.path.join(root, file)
+                # Get relative path for ZIP
+                members.append((os.path.relpath(file_path, organized_dir), file_path))
+        
+        zip_path = self._new_zip_path()
+        self.last_export = write_zip(members, zip_path)
+        self.zip_retention.register(zip_path)
+        return zip_path
+    
+    def export_zip(self, extracted_data, organized_results, output=None, **options):
+        """
+        Write the organized folders straight into a ZIP
         
+        Members come from the uploads following plan(), so no organized
+        directory is written first. PNG and JPEG are stored as they are and
+        other files are deflated on a thread pool; the archive is written
+        front to back, so output can be a pipe or a response stream.
+        Counts and sizes of the last export are kept in self.last_export.
+        
+        Args:
+            extracted_data: Dict of {filename: {'text': str, 'file': file}}
+            organized_results: Results from clustering engine
+            output: Path or writable file object (defaults to a new file in temp_zip)
+            options: workers, level, max_pending; see zip_stream.zip_chunks
+            
+        Returns:
+            Path of the ZIP file, or output when it is a file object
+        """
+        members = [
+            (f"{folder}/{filename}", file_obj)
+            for folder, filename, file_obj in self.plan(extracted_data, organized_results)
+        ]
+        output = output if output is not None else self._new_zip_path()
+        self.last_export = write_zip(members, output, **options)
+        # Only ZIPs written into temp_zip are subject to its budget
+        in_temp_zip = isinstance(output, (str, os.PathLike)) and \
+            os.path.dirname(os.path.abspath(output)) == os.path.abspath(self.temp_zip_dir)
+        if in_temp_zip:
+            self.zip_retention.register(output)
+        return output
+    
+    def _new_zip_path(self):
+        # Create ZIP filename with timestamp; the random suffix keeps two
+        # exports in the same second from overwriting each other
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        fd, zip_path = tempfile.mkstemp(suffix=".zip", prefix=f"organized_screenshots_{timestamp}_",
+                                        dir=self.temp_zip_dir)
+        os.close(fd)
         return zip_path
     
     def get_statistics(self, organized_results):
@@ -0,0 +1,169 @@
+import numpy as np
+from PIL import Image, ImageChops
+
+# Named settings compared by benchmarks/bench_preprocessing.py
+PRESETS = {
+    'raw': dict(target_text_height=None, max_side=None, grayscale=False, crop_borders=False),
+    'grayscale': dict(target_text_height=None, max_side=None, grayscale=True, crop_borders=False),
+    'balanced': dict(target_text_height=24, max_side=2560, grayscale=True, crop_borders=True),
+    'fast': dict(target_text_height=16, max_side=1600, grayscale=True, crop_borders=True),
+}
+
+
+def flatten_alpha(image, background=(255, 255, 255)):
+    """Composite transparent images onto a solid background; other images are returned as RGB or L"""
+    if image.mode == 'P':
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+    if image.mode in ('RGBA', 'LA', 'PA'):
+        rgba = image.convert('RGBA')
+        flat = Image.new('RGB', rgba.size, background)
+        flat.paste(rgba, mask=rgba.getchannel('A'))
+        return flat
+    if image.mode not in ('RGB', 'L'):
+        return image.convert('RGB')
+    return image
+
+
+def uniform_border_box(image, tolerance=8):
+    """
+    Bounding box of the content inside a uniform border
+
+    The border colour is taken from the top-left pixel; pixels within
+    tolerance of it count as border.
+
+    Returns:
+        tuple: (left, top, right, bottom), the whole image when there is no border
+    """
+    gray = image.convert('L') if image.mode != 'L' else image
+    background = Image.new('L', gray.size, gray.getpixel((0, 0)))
+    diff = ImageChops.difference(gray, background).point(lambda v: 255 if v > tolerance else 0)
+    return diff.getbbox() or (0, 0) + image.size
+
+
+def estimate_text_height(gray, sample_width=800):
+    """
+    Median height in pixels of text lines in a grayscale image
+
+    Rows crossed by many sharp light/dark transitions are text rows
+    (solid panels and borders have only a few); consecutive text rows are
+    grouped into runs, each roughly one line of text. Only every few
+    columns are read, since only row profiles matter.
+
+    Returns:
+        float or None: None when no text-like rows are found
+    """
+    pixels = np.asarray(gray, dtype=np.int16)
+    if gray.width > sample_width:
+        pixels = pixels[:, ::gray.width // sample_width]
+    transitions = (np.abs(np.diff(pixels, axis=1)) > 48).sum(axis=1)
+    ink_rows = transitions >= max(6, pixels.shape[1] // 200)
+
+    # Lengths of consecutive runs of ink rows
+    edges = np.diff(np.concatenate([[0], ink_rows.astype(np.int8), [0]]))
+    runs = np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+    runs = runs[(runs >= 4) & (runs <= gray.height // 4)]
+    if len(runs) == 0:
+        return None
+    return float(np.median(runs))
+
+
+class ImagePreprocessor:
+    """
+    Prepares screenshots for OCR
+
+    - alpha removal (transparent PNGs are flattened onto white)
+    - optional grayscale conversion
+    - optional cropping of uniform borders
+    - downscaling so text lines are about target_text_height pixels tall,
+      using JPEG draft decoding and Image.reduce before the final resize
+
+    Images are never upscaled. process() also returns the transform that
+    maps coordinates on the prepared image back to the original.
+    """
+
+    def __init__(self, target_text_height=24, max_side=2560, grayscale=True, crop_borders=False,
+                 border_tolerance=8):
+        """
+        Args:
+            target_text_height: Typical text line height to scale down to (None to skip)
+            max_side: Upper bound on the longer side after preprocessing (None for no bound)
+            grayscale: Convert to single-channel grayscale
+            crop_borders: Crop away a uniform border around the content
+            border_tolerance: Gray-level difference still counted as border
+        """
+        self.target_text_height = target_text_height
+        self.max_side = max_side
+        self.grayscale = grayscale
+        self.crop_borders = crop_borders
+        self.border_tolerance = border_tolerance
+
+    @classmethod
+    def from_preset(cls, name):
+        return cls(**PRESETS[name])
+
+    def open(self, image_file):
+        """
+        Open an image, letting JPEG decode at reduced size when max_side allows it
+
+        draft() changes image.size right away, so the size on file is kept
+        in image.info['original_size'] for process() to scale against.
+        """
+        image = Image.open(image_file)
+        image.info['original_size'] = image.size
+        if self.max_side and max(image.size) > self.max_side and image.format == 'JPEG':
+            ratio = self.max_side / max(image.size)
+            # draft() picks the smallest DCT scale that is still at least this size
+            image.draft('L' if self.grayscale else 'RGB',
+                        (int(image.width * ratio) + 1, int(image.height * ratio) + 1))
+        return image
+
+    def process(self, image):
+        """
+        Args:
+            image: PIL Image, path or file object
+
+        Returns:
+            tuple: (prepared PIL Image, scale, (left, top)); a point (x, y) on the
+            prepared image is (x / scale + left, y / scale + top) on the original
+        """
+        if not isinstance(image, Image.Image):
+            image = self.open(image)
+
+        # Draft decoding may already have shrunk the image; scale is against the file's size
+        original_size = image.info.get('original_size', image.size)
+        image.load()
+        scale = image.width / original_size[0] if original_size[0] else 1.0
+
+        image = flatten_alpha(image)
+        if self.grayscale and image.mode != 'L':
+            image = image.convert('L')
+
+        left = top = 0
+        if self.crop_borders:
+            box = uniform_border_box(image, self.border_tolerance)
+            if box != (0, 0) + image.size:
+                image = image.crop(box)
+                left, top = box[0] / scale, box[1] / scale
+
+        factor = 1.0
+        if self.max_side and max(image.size) > self.max_side:
+            factor = self.max_side / max(image.size)
+        if self.target_text_height:
+            gray = image if image.mode == 'L' else image.convert('L')
+            height = estimate_text_height(gray)
+            if height:
+                factor = min(factor, self.target_text_height / height)
+
+        if factor < 1.0:
+            size = (max(1, round(image.width * factor)), max(1, round(image.height * factor)))
+            reduce_by = int(1 / factor)
+            if reduce_by >= 2:
+                image = image.reduce(reduce_by)
+            image = image.resize(size, Image.LANCZOS)
+            scale *= factor
+
+        return image, scale, (left, top)
+
+    def to_array(self, image):
+        """Prepared image as the numpy array EasyOCR expects"""
+        return np.array(self.process(image)[0])
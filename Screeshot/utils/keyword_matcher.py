@@ -0,0 +1,75 @@
+import re
+
+_END = ''
+
+
+def _trie_regex(node):
+    """Turn a character trie into a regex that prefers the longest pattern"""
+    alternatives = [re.escape(ch) + _trie_regex(child) for ch, child in sorted(node.items()) if ch != _END]
+    if not alternatives:
+        return ''
+
+    body = alternatives[0] if len(alternatives) == 1 else '(?:' + '|'.join(alternatives) + ')'
+    if _END in node:
+        # Greedy optional group: try the longer continuation first
+        body = '(?:' + body + ')?'
+    return body
+
+
+class KeywordMatcher:
+    """
+    Multi-pattern substring matcher
+
+    All patterns are compiled into one trie-shaped regex, so the regex
+    engine walks each text once like an Aho-Corasick automaton instead of
+    running one substring search per pattern. Every hit reports the same
+    matches as `pattern in text`, including overlapping ones.
+    """
+
+    def __init__(self, groups):
+        """
+        Args:
+            groups: Dict of {label: [pattern, ...]}; a pattern may belong to several labels
+        """
+        self.labels = {}  # pattern -> [label, ...] (one entry per occurrence in groups)
+        for label, patterns in groups.items():
+            for pattern in patterns:
+                if pattern:
+                    self.labels.setdefault(pattern, []).append(label)
+
+        trie = {}
+        for pattern in self.labels:
+            node = trie
+            for ch in pattern:
+                node = node.setdefault(ch, {})
+            node[_END] = True
+
+        # At a given start the regex reports the longest pattern; every
+        # other pattern starting there is one of its prefixes
+        self._prefixes = {
+            pattern: [pattern[:k] for k in range(1, len(pattern) + 1) if pattern[:k] in self.labels]
+            for pattern in self.labels
+        }
+        body = _trie_regex(trie)
+        self._regex = re.compile(f'(?=({body}))', re.DOTALL) if body else None
+
+    def finditer(self, text):
+        """Yield (start, pattern) for every occurrence of every pattern in text"""
+        if self._regex is None:
+            return
+        for match in self._regex.finditer(text):
+            start = match.start()
+            for pattern in self._prefixes[match.group(1)]:
+                yield start, pattern
+
+    def matched_patterns(self, text):
+        """Set of patterns that occur anywhere in text"""
+        return {pattern for _, pattern in self.finditer(text)}
+
+    def count_labels(self, text):
+        """Dict of {label: number of its patterns found in text}"""
+        counts = {}
+        for pattern in self.matched_patterns(text):
+            for label in self.labels[pattern]:
+                counts[label] = counts.get(label, 0) + 1
+        return counts
@@ -0,0 +1,99 @@
+import numpy as np
+
+try:
+    import faiss
+except ImportError:  # Optional: only needed for the approximate mode
+    faiss = None
+
+
+def normalize_rows(matrix):
+    """L2-normalize each row as float32, leaving all-zero rows as zeros"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def leader_cluster(embeddings, threshold, block_size=256, max_block_bytes=256 * 1024 * 1024):
+    """
+    Exact leader clustering with blocked matrix products
+
+    Same result as the sequential loop: walking images in order, every
+    still-unassigned image starts a new group and claims all later
+    unassigned images whose cosine similarity to it is >= threshold.
+
+    Instead of one cosine call per pair, the next block of unassigned
+    images is compared against all remaining unassigned images with one
+    matrix product, so the work is (groups x n) and memory is bounded by
+    max_block_bytes.
+
+    Args:
+        embeddings: Array of shape (n, dim)
+        threshold: Cosine similarity needed to join a group
+        block_size: Maximum candidate leaders per matrix product
+        max_block_bytes: Upper bound for the similarity block
+
+    Returns:
+        np.ndarray: Group label per row, numbered 0.. in order of creation
+    """
+    vectors = normalize_rows(embeddings)
+    n = len(vectors)
+    labels = np.full(n, -1, dtype=np.int64)
+    next_label = 0
+
+    while True:
+        remaining = np.flatnonzero(labels < 0)
+        if len(remaining) == 0:
+            break
+
+        rows = max(1, min(block_size, max_block_bytes // (4 * len(remaining))))
+        candidates = remaining[:rows]
+        similarities = vectors[candidates] @ vectors[remaining].T
+        free = np.ones(len(remaining), dtype=bool)
+
+        # remaining is sorted and starts with the candidates, so candidate r sits in column r
+        for r, leader in enumerate(candidates):
+            if not free[r]:
+                continue
+            members = free & (similarities[r] >= threshold)
+            members[:r + 1] = False
+            labels[leader] = next_label
+            labels[remaining[members]] = next_label
+            free[r] = False
+            free &= ~members
+            next_label += 1
+
+    return labels
+
+
+def leader_cluster_ann(embeddings, threshold, n_neighbors=64):
+    """
+    Approximate leader clustering over a nearest-neighbour graph
+
+    Each image only considers its n_neighbors nearest neighbours (HNSW
+    index from faiss), so time and memory grow linearly with n. Groups
+    match leader_cluster except where a member lies outside its leader's
+    neighbour list. Falls back to leader_cluster when faiss is missing.
+    """
+    vectors = normalize_rows(embeddings)
+    n = len(vectors)
+    if faiss is None or n <= n_neighbors:
+        return leader_cluster(vectors, threshold)
+
+    index = faiss.IndexHNSWFlat(vectors.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+    index.hnsw.efSearch = max(64, 2 * n_neighbors)
+    index.add(vectors)
+    similarities, neighbors = index.search(vectors, n_neighbors + 1)
+
+    labels = np.full(n, -1, dtype=np.int64)
+    next_label = 0
+    for i in range(n):
+        if labels[i] >= 0:
+            continue
+        labels[i] = next_label
+        candidates = neighbors[i][(similarities[i] >= threshold) & (neighbors[i] > i)]
+        candidates = candidates[labels[candidates] < 0]
+        labels[candidates] = next_label
+        next_label += 1
+
+    return labels
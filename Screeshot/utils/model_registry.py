@@ -0,0 +1,179 @@
+import os
+import sys
+import threading
+import time
+
+# Output sizes of models we use, so callers can size caches without loading them
+KNOWN_DIMENSIONS = {
+    'all-MiniLM-L6-v2': 384,
+    'clip-ViT-B-32': 512,
+}
+
+
+def _load_sentence_transformer(name, **options):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(name, **options)
+
+
+_FACTORIES = {
+    'sentence-transformer': _load_sentence_transformer,
+}
+
+
+def register_factory(kind, factory):
+    """Teach the registry how to build a new kind of model: factory(name, **options)"""
+    _FACTORIES[kind] = factory
+
+
+def _current_rss_mb():
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        return None
+
+
+def _torch_modules(model):
+    if hasattr(model, 'parameters'):
+        return [model]
+    # EasyOCR keeps its networks as attributes of the Reader
+    return [m for m in (getattr(model, 'detector', None), getattr(model, 'recognizer', None)) if hasattr(m, 'parameters')]
+
+
+def _parameter_mb(model):
+    total = 0
+    for module in _torch_modules(model):
+        for tensor in list(module.parameters()) + list(module.buffers()):
+            total += tensor.numel() * tensor.element_size()
+    return total / (1024 * 1024) if total else None
+
+
+class _Entry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.model = None
+        self.error = None
+        self.stats = {'loaded': False}
+
+
+class ModelRegistry:
+    """
+    Process-wide, lazily-loaded models
+
+    Every (kind, name, options) combination is loaded once and shared by
+    all callers; concurrent requests for a model that is still loading
+    wait for that load instead of starting another one. warmup() loads
+    models on a background thread so the first user request does not pay
+    for them, and stats() reports load time and memory per model.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._guard = threading.Lock()
+
+    @staticmethod
+    def key(kind, name=None, **options):
+        return (kind, name, tuple(sorted(options.items())))
+
+    def get(self, kind, name=None, **options):
+        """Return the shared model, loading it on first use"""
+        key = self.key(kind, name, **options)
+        with self._guard:
+            entry = self._entries.setdefault(key, _Entry())
+
+        if entry.model is not None:
+            return entry.model
+
+        with entry.lock:
+            if entry.model is None:
+                self._load(key, entry, kind, name, options)
+            if entry.model is None:
+                raise entry.error
+            return entry.model
+
+    def is_loaded(self, kind, name=None, **options):
+        entry = self._entries.get(self.key(kind, name, **options))
+        return entry is not None and entry.model is not None
+
+    def warmup(self, specs, background=True):
+        """
+        Load models ahead of the first request
+
+        Args:
+            specs: List of (kind, name) or (kind, name, options) tuples
+            background: Load on a daemon thread and return it, instead of blocking
+
+        Returns:
+            threading.Thread or None
+        """
+        def load_all():
+            for spec in specs:
+                kind, name, options = (tuple(spec) + ({},))[:3]
+                try:
+                    self.get(kind, name, **options)
+                except Exception:
+                    pass  # Recorded in stats(); the real request will raise it
+
+        pending = [s for s in specs if not self.is_loaded(s[0], s[1], **(s[2] if len(s) > 2 else {}))]
+        if not pending:
+            return None
+        if not background:
+            load_all()
+            return None
+
+        thread = threading.Thread(target=load_all, name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self):
+        """Dict of {'kind:name': {'loaded', 'load_seconds', 'parameter_mb', 'rss_delta_mb', 'error'}}"""
+        with self._guard:
+            items = list(self._entries.items())
+        report = {}
+        for (kind, name, options), entry in items:
+            label = f"{kind}:{name}" if name else kind
+            if options:
+                label += str(dict(options))
+            report[label] = dict(entry.stats)
+        return report
+
+    def _load(self, key, entry, kind, name, options):
+        factory = _FACTORIES.get(kind)
+        if factory is None:
+            entry.error = KeyError(f"No model factory registered for '{kind}'")
+            return
+
+        rss_before = _current_rss_mb()
+        start = time.perf_counter()
+        try:
+            model = factory(name, **options) if name is not None else factory(**options)
+        except Exception as e:
+            entry.error = e
+            entry.stats = {'loaded': False, 'error': str(e)}
+            return
+
+        rss_after = _current_rss_mb()
+        entry.stats = {
+            'loaded': True,
+            'load_seconds': round(time.perf_counter() - start, 3),
+            'parameter_mb': _parameter_mb(model),
+            'rss_delta_mb': round(rss_after - rss_before, 1) if rss_before is not None and rss_after is not None else None,
+        }
+        entry.error = None
+        entry.model = model
+
+
+registry = ModelRegistry()
+
+
+def embedding_dimension(model_name):
+    """Embedding size of a sentence-transformer, without loading it when it is a known model"""
+    if model_name in KNOWN_DIMENSIONS:
+        return KNOWN_DIMENSIONS[model_name]
+    return registry.get('sentence-transformer', model_name).get_sentence_embedding_dimension()
@@ -0,0 +1,146 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+# 16x16 dHash: 256 bits, fine enough to tell apart screens that share a layout
+HASH_SIZE = 16
+MAX_DISTANCE = 8
+# Brightness steps smaller than this count as flat, so re-encoding noise on
+# plain backgrounds does not flip bits
+FLAT_TOLERANCE = 4
+
+
+def dhash(image, hash_size=HASH_SIZE):
+    """
+    Difference hash: one bit per horizontally adjacent pixel pair of a
+    (hash_size + 1) x hash_size grayscale thumbnail, set where brightness
+    rises by more than FLAT_TOLERANCE
+
+    Args:
+        image: PIL Image, path, file object or encoded bytes
+        hash_size: Thumbnail rows; the hash has hash_size ** 2 bits
+
+    Returns:
+        int: The hash as an unsigned integer
+    """
+    if isinstance(image, (bytes, bytearray)):
+        image = io.BytesIO(image)
+    if not isinstance(image, Image.Image):
+        # No draft() decoding here: DCT-scaled JPEG decodes shift the hash by several bits
+        image = Image.open(image)
+
+    thumbnail = image.convert('L').resize((hash_size + 1, hash_size), Image.BOX, reducing_gap=2.0)
+    pixels = np.asarray(thumbnail, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1] + FLAT_TOLERANCE).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over hashes under Hamming distance
+
+    Children are keyed by their distance to the parent, so a search within
+    radius r only descends into children whose key is within r of the
+    query's distance to the parent (triangle inequality).
+    """
+
+    def __init__(self):
+        self.root = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, hash_value, item):
+        self._size += 1
+        if self.root is None:
+            self.root = [hash_value, [item], {}]
+            return
+
+        node = self.root
+        while True:
+            distance = hamming(hash_value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [hash_value, [item], {}]
+                return
+            node = child
+
+    def search(self, hash_value, max_distance):
+        """List of (distance, item) within max_distance, closest first"""
+        found = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(hash_value, node[0])
+            if distance <= max_distance:
+                found.extend((distance, item) for item in node[1])
+            for edge, child in node[2].items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        found.sort(key=lambda pair: pair[0])
+        return found
+
+
+class DuplicateIndex:
+    """
+    Groups near-duplicate screenshots by perceptual hash
+
+    Every image that has no near-duplicate in the index becomes a
+    representative and is added to it; later images within max_distance
+    bits of a representative are mapped to that representative instead.
+    Representatives from earlier batches (the archive) stay in the index,
+    so repeats across uploads are found as well.
+    """
+
+    def __init__(self, max_distance=MAX_DISTANCE):
+        """
+        Args:
+            max_distance: Largest Hamming distance still counted as a duplicate
+        """
+        self.max_distance = max_distance
+        self.tree = BKTree()
+
+    def __len__(self):
+        return len(self.tree)
+
+    def add(self, hash_value, item):
+        self.tree.add(hash_value, item)
+
+    def find(self, hash_value, accept=None):
+        """Closest representative within max_distance that accept() allows, or None"""
+        for _, item in self.tree.search(hash_value, self.max_distance):
+            if accept is None or accept(item):
+                return item
+        return None
+
+    def group(self, hashes, accept=None):
+        """
+        Assign each image of a batch to a representative
+
+        Args:
+            hashes: Dict of {key: hash}, in processing order
+            accept: Optional predicate on candidate representatives; an image
+                whose near-duplicates are all rejected becomes a
+                representative itself, next to them
+
+        Returns:
+            dict: {key: representative}; the representative is the key itself,
+            an earlier key of the batch, or an item added from the archive
+        """
+        representative_of = {}
+        for key, hash_value in hashes.items():
+            representative = self.find(hash_value, accept)
+            if representative is None:
+                self.add(hash_value, key)
+                representative = key
+            representative_of[key] = representative
+        return representative_of
@@ -0,0 +1,187 @@
+import io
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+import numpy as np
+from PIL import Image
+
+DEFAULT_PATH = os.environ.get("OCR_CACHE_PATH", os.path.join("ocr_cache", "ocr.sqlite3"))
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Part of every key; bumped when stored results of the same input change,
+# e.g. 2: boxes of large JPEGs were off by the draft decoding factor
+RESULT_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS aliases (
+    file_hash TEXT PRIMARY KEY,
+    pixel_hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    engine TEXT NOT NULL,
+    text TEXT NOT NULL,
+    texts TEXT NOT NULL,
+    boxes BLOB NOT NULL,
+    confidences BLOB NOT NULL,
+    nbytes INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+"""
+
+
+def file_hash(data):
+    """Hash of the encoded file bytes"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def pixel_hash(data):
+    """Hash of the decoded pixels, so re-encoded copies of one screenshot share a key"""
+    image = Image.open(io.BytesIO(data))
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{image.mode}:{image.width}x{image.height}\0".encode('ascii'))
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def result_key(content_hash, engine, params):
+    """Cache key for one image read by one engine with one set of parameters"""
+    payload = f"{RESULT_VERSION}\0{content_hash}\0{engine}\0{json.dumps(params, sort_keys=True, default=str)}"
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class OCRCache:
+    """
+    Persistent OCR results keyed by image content
+
+    Results live in a SQLite file: the joined text plus per-detection texts,
+    boxes (float32, n x 4 x 2) and confidences. Images are identified by a
+    hash of their decoded pixels; the hash of the encoded file is remembered
+    as an alias, so a repeat upload is found without decoding it again.
+    When the stored results exceed max_bytes the least recently used ones
+    are evicted.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            path: SQLite file, created with its directory when missing
+            max_bytes: Budget for stored results (text and arrays)
+        """
+        self.path = os.path.abspath(path)
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._total = self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM results").fetchone()[0]
+
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def content_hash(self, data):
+        """Pixel hash of encoded image bytes, decoding only the first time a file is seen"""
+        encoded = file_hash(data)
+        with self._lock:
+            row = self._conn.execute("SELECT pixel_hash FROM aliases WHERE file_hash = ?", (encoded,)).fetchone()
+        if row:
+            return row[0]
+
+        decoded = pixel_hash(data)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO aliases (file_hash, pixel_hash) VALUES (?, ?)", (encoded, decoded))
+        return decoded
+
+    def get(self, content_hash, engine, params):
+        """
+        Returns:
+            dict or None: {'text', 'texts', 'boxes', 'confidences'}
+        """
+        key = result_key(content_hash, engine, params)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text, texts, boxes, confidences FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+            self._conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.stats['hits'] += 1
+
+        text, texts, boxes, confidences = row
+        return {
+            'text': text,
+            'texts': json.loads(texts),
+            'boxes': np.frombuffer(boxes, dtype=np.float32).reshape(-1, 4, 2),
+            'confidences': np.frombuffer(confidences, dtype=np.float32),
+        }
+
+    def put(self, content_hash, engine, params, text, texts=(), boxes=None, confidences=None):
+        """Store one OCR result, evicting old ones if the cache is over budget"""
+        key = result_key(content_hash, engine, params)
+        texts_json = json.dumps(list(texts))
+        boxes = np.asarray(boxes if boxes is not None else np.zeros((0, 4, 2)), dtype=np.float32).tobytes()
+        confidences = np.asarray(confidences if confidences is not None else [], dtype=np.float32).tobytes()
+        nbytes = len(text.encode('utf-8')) + len(texts_json) + len(boxes) + len(confidences)
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, engine, text, texts, boxes, confidences, nbytes, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, engine, text, texts_json, boxes, confidences, nbytes, time.time()))
+            self._total += nbytes
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def total_bytes(self):
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM results").fetchone()[0]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+            self._conn.execute("DELETE FROM aliases")
+            self._total = 0
+
+    def _evict(self):
+        # The running total is approximate (replaced rows, other processes); recount first
+        total = self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM results").fetchone()[0]
+        self._total = total
+        if total <= self.max_bytes:
+            return
+
+        # Drop least recently used results until the cache is back under 90% of its budget
+        excess = total - int(self.max_bytes * 0.9)
+        doomed = []
+        for key, nbytes in self._conn.execute("SELECT key, nbytes FROM results ORDER BY last_used"):
+            doomed.append((key,))
+            excess -= nbytes
+            if excess <= 0:
+                break
+        self._conn.executemany("DELETE FROM results WHERE key = ?", doomed)
+        self._total = self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM results").fetchone()[0]
+        self.stats['evictions'] += len(doomed)
+
+
+_shared = {}
+_shared_guard = threading.Lock()
+
+
+def shared_cache(path=DEFAULT_PATH, max_bytes=DEFAULT_MAX_BYTES):
+    """One OCRCache per file for the whole process"""
+    path = os.path.abspath(path)
+    with _shared_guard:
+        if path not in _shared:
+            _shared[path] = OCRCache(path, max_bytes)
+        return _shared[path]
@@ -0,0 +1,362 @@
+import io
+import os
+import time
+import importlib.util
+
+import numpy as np
+from PIL import ImageOps, ImageFilter
+
+from .image_preprocessing import ImagePreprocessor
+from .ocr_result import OCRResult
+from .reader_pool import reader_pool
+from .script_detection import HEADLINE_SCRIPTS, group_languages, detect_script
+
+POLICIES = ('easyocr', 'tesseract', 'fastest', 'most_accurate', 'cascade')
+DEFAULT_POLICY = os.environ.get('OCR_POLICY', 'easyocr')
+
+# Used by 'fastest' / 'most_accurate' when no profile is available, best first
+SPEED_RANK = ('tesseract', 'easyocr')
+QUALITY_RANK = ('easyocr', 'tesseract')
+
+# Below this length-weighted confidence, a multi-script EasyOCR engine also
+# tries the scripts it cannot tell apart visually
+SCRIPT_RETRY_CONFIDENCE = 0.4
+
+# EasyOCR language codes -> Tesseract traineddata names
+TESSERACT_LANGUAGES = {
+    'en': 'eng', 'hi': 'hin', 'fr': 'fra', 'de': 'deu', 'es': 'spa', 'it': 'ita',
+    'pt': 'por', 'ru': 'rus', 'ja': 'jpn', 'ko': 'kor', 'ch_sim': 'chi_sim', 'ar': 'ara',
+}
+
+
+def _image_bytes(image_file):
+    if isinstance(image_file, (bytes, bytearray)):
+        return bytes(image_file)
+    if hasattr(image_file, 'getvalue'):
+        return image_file.getvalue()
+    if hasattr(image_file, 'read'):
+        image_file.seek(0)
+        return image_file.read()
+    with open(image_file, 'rb') as f:
+        return f.read()
+
+
+class OCREngine:
+    """
+    Common interface of the OCR backends
+
+    recognize() takes an image (file object, path or PIL Image) and returns
+    an OCRResult with boxes in original image coordinates; it raises when
+    OCR fails. Engines are plain picklable objects that load their models
+    lazily, so they can be shipped to worker processes.
+    """
+    name = None
+
+    def available(self):
+        """Whether the engine's dependencies are installed"""
+        return True
+
+    def load(self):
+        """Load models ahead of the first recognize() call"""
+
+    @property
+    def params(self):
+        """Settings that change the output; part of the OCR cache key"""
+        return {}
+
+    def recognize(self, image_file):
+        raise NotImplementedError
+
+
+class EasyOCREngine(OCREngine):
+    """
+    Deep-learning detector + recognizer; slower, robust on stylized UI text
+
+    Readers come from the shared ReaderPool. When the languages span several
+    scripts (say English, German and Hindi), EasyOCR cannot load them as one
+    reader: the image goes through the shared detector once, a cheap script
+    check on the detected lines picks the script, and only that script's
+    recognizer runs.
+    """
+    name = 'easyocr'
+
+    def __init__(self, languages=('en',), gpu=False, preprocessor=None):
+        self.languages = tuple(languages)
+        self.gpu = gpu
+        self.preprocessor = preprocessor or ImagePreprocessor()
+        self.groups = group_languages(self.languages)
+
+    def available(self):
+        return importlib.util.find_spec('easyocr') is not None
+
+    @property
+    def reader(self):
+        """Reader of the first script's languages"""
+        return reader_pool.get(next(iter(self.groups.values())), self.gpu)
+
+    def load(self):
+        self.reader
+
+    @property
+    def params(self):
+        return {'languages': list(self.languages), 'preprocessor': vars(self.preprocessor)}
+
+    def recognize(self, image_file):
+        image, scale, offset = self.preprocessor.process(image_file)
+        pixels = np.array(image)
+        if len(self.groups) == 1:
+            # results format: [(bbox, text, confidence), ...]
+            return OCRResult.from_readtext(self.reader.readtext(pixels), scale, offset)
+
+        horizontal, free = reader_pool.detector_reader(self.gpu, next(iter(self.groups.values()))).detect(pixels)
+        horizontal, free = horizontal[0], free[0]
+        gray = pixels if pixels.ndim == 2 else np.array(image.convert('L'))
+        script = detect_script(gray, horizontal, self.groups)
+
+        def read(script):
+            reader = reader_pool.get(self.groups[script], self.gpu)
+            return OCRResult.from_readtext(reader.recognize(gray, horizontal, free), scale, offset)
+
+        result = read(script)
+        if script in HEADLINE_SCRIPTS:
+            return result
+        # Other scripts look alike at this cost; try them only when the guess reads poorly
+        for other in self.groups:
+            if mean_confidence(result) >= SCRIPT_RETRY_CONFIDENCE:
+                break
+            if other == script or other in HEADLINE_SCRIPTS:
+                continue
+            candidate = read(other)
+            if mean_confidence(candidate) > mean_confidence(result):
+                result = candidate
+        return result
+
+
+class TesseractEngine(OCREngine):
+    """Classic Tesseract through pytesseract; fast on clean, high-contrast text"""
+    name = 'tesseract'
+
+    def __init__(self, languages=('en',), preprocessor=None, enhance=True, config=''):
+        """
+        Args:
+            languages: EasyOCR-style codes, mapped to Tesseract names
+            preprocessor: Defaults to ~32px text, which Tesseract reads best
+            enhance: Autocontrast and sharpen after preprocessing
+            config: Extra command-line options for tesseract
+        """
+        self.lang = '+'.join(TESSERACT_LANGUAGES.get(code, code) for code in languages)
+        self.preprocessor = preprocessor or ImagePreprocessor(target_text_height=32, max_side=4096)
+        self.enhance = enhance
+        self.config = config
+        self._available = None
+
+    def available(self):
+        # Checking the binary starts a subprocess; the answer is kept per engine
+        if self._available is None:
+            try:
+                import pytesseract
+                pytesseract.get_tesseract_version()
+                self._available = True
+            except Exception:
+                self._available = False
+        return self._available
+
+    @property
+    def params(self):
+        return {'lang': self.lang, 'preprocessor': vars(self.preprocessor),
+                'enhance': self.enhance, 'config': self.config}
+
+    def prepare(self, image_file):
+        """Preprocessed grayscale image plus the (scale, offset) back to the original"""
+        image, scale, offset = self.preprocessor.process(image_file)
+        if self.enhance:
+            image = ImageOps.autocontrast(image.convert('L'), cutoff=2).filter(ImageFilter.SHARPEN)
+        return image, scale, offset
+
+    def recognize(self, image_file):
+        import pytesseract
+
+        image, scale, offset = self.prepare(image_file)
+        data = pytesseract.image_to_data(image, lang=self.lang, config=self.config,
+                                         output_type=pytesseract.Output.DICT)
+
+        # Words -> lines; conf is -1 on non-word rows and 0-100 otherwise
+        lines = {}
+        for i, word in enumerate(data['text']):
+            conf = float(data['conf'][i])
+            if conf < 0 or not word.strip():
+                continue
+            key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            left, top = data['left'][i], data['top'][i]
+            right, bottom = left + data['width'][i], top + data['height'][i]
+            line = lines.setdefault(key, {'words': [], 'confs': [], 'box': [left, top, right, bottom]})
+            line['words'].append(word.strip())
+            line['confs'].append(conf / 100.0)
+            box = line['box']
+            line['box'] = [min(box[0], left), min(box[1], top), max(box[2], right), max(box[3], bottom)]
+
+        texts, boxes, confidences = [], [], []
+        for line in lines.values():
+            left, top, right, bottom = line['box']
+            texts.append(' '.join(line['words']))
+            boxes.append([[left, top], [right, top], [right, bottom], [left, bottom]])
+            confidences.append(float(np.mean(line['confs'])))
+
+        boxes = np.array(boxes, dtype=np.float32).reshape(-1, 4, 2) / scale + np.asarray(offset, dtype=np.float32)
+        return OCRResult(boxes, texts, confidences)
+
+
+def mean_confidence(result):
+    """Confidence of a result, weighting each span by its length; 0 when empty"""
+    if len(result) == 0:
+        return 0.0
+    lengths = np.array([len(text) for text in result.texts], dtype=np.float32)
+    if lengths.sum() == 0:
+        return 0.0
+    return float((result.confidences * lengths).sum() / lengths.sum())
+
+
+class CascadeEngine(OCREngine):
+    """
+    Cheap engine first, expensive one only when needed
+
+    The fallback runs when the first engine finds nothing or its
+    length-weighted confidence is below min_confidence.
+    """
+    name = 'cascade'
+
+    def __init__(self, first, fallback, min_confidence=0.6):
+        self.first = first
+        self.fallback = fallback
+        self.min_confidence = min_confidence
+        self.stats = {'first': 0, 'fallback': 0}
+
+    def available(self):
+        return self.first.available() or self.fallback.available()
+
+    def load(self):
+        for engine in (self.first, self.fallback):
+            if engine.available():
+                engine.load()
+
+    @property
+    def params(self):
+        return {'first': [self.first.name, self.first.params],
+                'fallback': [self.fallback.name, self.fallback.params],
+                'min_confidence': self.min_confidence}
+
+    def recognize(self, image_file):
+        data = _image_bytes(image_file)
+        if self.first.available():
+            result = self.first.recognize(io.BytesIO(data))
+            if mean_confidence(result) >= self.min_confidence or not self.fallback.available():
+                self.stats['first'] += 1
+                return result
+        self.stats['fallback'] += 1
+        return self.fallback.recognize(io.BytesIO(data))
+
+
+def edit_distance(a, b):
+    """Levenshtein distance, one row of the DP table at a time"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = np.arange(len(b) + 1)
+    b_codes = np.frombuffer(b.encode('utf-32-le'), dtype=np.uint32)
+    for i, char in enumerate(a, 1):
+        substitute = previous[:-1] + (b_codes != ord(char))
+        current = np.empty_like(previous)
+        current[0] = i
+        current[1:] = np.minimum(previous[1:] + 1, substitute)
+        # Insertions chain left to right
+        current = np.minimum.accumulate(current - np.arange(len(current))) + np.arange(len(current))
+        previous = current
+    return int(previous[-1])
+
+
+def character_accuracy(predicted, truth):
+    """1 - edit_distance / len(truth) on whitespace-normalized, lowercased text, floored at 0"""
+    predicted = ' '.join(predicted.lower().split())
+    truth = ' '.join(truth.lower().split())
+    if not truth:
+        return 1.0 if not predicted else 0.0
+    return max(0.0, 1.0 - edit_distance(predicted, truth) / len(truth))
+
+
+def profile_engines(engines, samples, truth=None):
+    """
+    Micro-benchmark engines on a few of the user's screenshots
+
+    Model loading is excluded from the timings.
+
+    Args:
+        engines: List of OCREngine
+        samples: List of encoded images (bytes)
+        truth: Optional list of expected texts, one per sample, for char accuracy
+
+    Returns:
+        dict: {engine name: {'available', 'ms_per_image', 'mean_confidence',
+        'char_accuracy', 'error'}}
+    """
+    profile = {}
+    for engine in engines:
+        if not engine.available():
+            profile[engine.name] = {'available': False}
+            continue
+        try:
+            engine.load()
+            start = time.perf_counter()
+            results = [engine.recognize(io.BytesIO(data)) for data in samples]
+            seconds = time.perf_counter() - start
+        except Exception as e:
+            profile[engine.name] = {'available': False, 'error': str(e)}
+            continue
+
+        profile[engine.name] = {
+            'available': True,
+            'ms_per_image': round(1000 * seconds / max(len(samples), 1), 1),
+            'mean_confidence': round(float(np.mean([mean_confidence(r) for r in results])), 3) if results else None,
+            'char_accuracy': round(float(np.mean([character_accuracy(' '.join(r.texts), t)
+                                                  for r, t in zip(results, truth)])), 3) if truth else None,
+        }
+    return profile
+
+
+def _pick(candidates, profile, rank, measure, lowest):
+    usable = [engine for engine in candidates if engine.available()]
+    if not usable:
+        raise RuntimeError("No OCR engine is available; install easyocr or tesseract + pytesseract")
+    measured = [e for e in usable if (profile or {}).get(e.name, {}).get(measure) is not None]
+    if measured:
+        return sorted(measured, key=lambda e: profile[e.name][measure], reverse=not lowest)[0]
+    return sorted(usable, key=lambda e: rank.index(e.name) if e.name in rank else len(rank))[0]
+
+
+def make_engine(policy=DEFAULT_POLICY, languages=('en',), gpu=False, profile=None, min_confidence=0.6):
+    """
+    Build the OCR engine for a deployment policy
+
+    Args:
+        policy: 'easyocr', 'tesseract', 'fastest', 'most_accurate' or 'cascade'
+            (Tesseract first, EasyOCR when Tesseract is unsure)
+        languages: EasyOCR language codes
+        gpu: Run EasyOCR on the GPU
+        profile: Output of profile_engines; 'fastest' picks the lowest
+            ms_per_image and 'most_accurate' the highest char_accuracy, falling
+            back to a fixed ranking for what was not measured (char_accuracy
+            needs profile_engines(..., truth=...))
+        min_confidence: Cascade threshold
+    """
+    easyocr_engine = EasyOCREngine(languages, gpu)
+    tesseract_engine = TesseractEngine(languages)
+
+    if policy == 'easyocr':
+        return easyocr_engine
+    if policy == 'tesseract':
+        return tesseract_engine
+    if policy == 'cascade':
+        return CascadeEngine(tesseract_engine, easyocr_engine, min_confidence)
+    if policy == 'fastest':
+        return _pick([easyocr_engine, tesseract_engine], profile, SPEED_RANK, 'ms_per_image', lowest=True)
+    if policy == 'most_accurate':
+        return _pick([easyocr_engine, tesseract_engine], profile, QUALITY_RANK, 'char_accuracy', lowest=False)
+    raise ValueError(f"Unknown OCR policy: {policy}")
@@ -1,63 +1,269 @@
-import easyocr
-import numpy as np
-from PIL import Image
 import io
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+from .ocr_cache import shared_cache
+from .ocr_result import OCRResult
+from .ocr_engines import EasyOCREngine, _image_bytes
+from .reader_pool import reader_pool, DEFAULT_BUDGET_MB
+from .text_presence import TextPresenceDetector
+
+# Processor owned by each batch_extract worker process
+_worker_processor = None
+
+
+def _init_worker(engine, text_filter, workers):
+    global _worker_processor
+    try:
+        # One intra-op thread per worker; the pool itself provides the parallelism
+        import torch
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+    # Workers share one reader budget instead of each taking all of it
+    reader_pool.max_mb = DEFAULT_BUDGET_MB / workers
+    engine.load()
+    # The parent owns the cache; workers only filter and recognize
+    _worker_processor = OCRProcessor(engine=engine, cache=False, text_filter=text_filter or False)
+
+
+def _ocr_worker(name, data):
+    return name, _worker_processor._recognize_uncached(data)
 
 class OCRProcessor:
-    def __init__(self):
-        """Initialize EasyOCR reader"""
-        # Using English language, you can add more languages like ['en', 'hi']
-        self.reader = easyocr.Reader(['en'], gpu=False)
+    # Batches up to this size run in this process on its already loaded
+    # models; starting workers and loading a model in each costs more
+    in_process_max = 4
+    
+    def __init__(self, languages=('en',), gpu=False, preprocessor=None, cache=None, engine=None,
+                 text_filter=None):
+        """
+        Set up the OCR processor; models are loaded on first use
+        
+        Args:
+            languages: EasyOCR language codes, e.g. ('en', 'hi')
+            gpu: Run EasyOCR on the GPU
+            preprocessor: ImagePreprocessor applied before readtext (defaults to
+                alpha removal, grayscale and downscaling to ~24px text)
+            cache: OCRCache for results (defaults to the shared on-disk cache,
+                False disables caching)
+            engine: OCREngine to use instead of EasyOCR with the settings above,
+                e.g. ocr_engines.make_engine('cascade')
+            text_filter: TextPresenceDetector run before the engine; images it
+                judges textless skip OCR (defaults to TextPresenceDetector(),
+                False disables the pre-filter)
+        """
+        self.engine = engine or EasyOCREngine(languages, gpu, preprocessor)
+        self.cache = shared_cache() if cache is None else (None if cache is False else cache)
+        self.text_filter = TextPresenceDetector() if text_filter is None else (text_filter or None)
+        
+        # Worker pool of batch_recognize, kept so workers load their models once
+        self._pool = None
+        self._pool_workers = 0
+    
+    def _get_pool(self, workers):
+        if self._pool is not None and self._pool_workers != workers:
+            self.close()
+        if self._pool is None:
+            # spawn: forking a process that already runs torch threads can deadlock.
+            # Workers start on demand, so a pool larger than a batch costs nothing
+            context = multiprocessing.get_context('spawn')
+            self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                             initializer=_init_worker,
+                                             initargs=(self.engine, self.text_filter, workers))
+            self._pool_workers = workers
+        return self._pool
+    
+    def close(self):
+        """Shut down the worker processes of batch_recognize, if any"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self._pool_workers = 0
+    
+    @property
+    def cache_params(self):
+        """Everything besides the image that changes the OCR output"""
+        return self.engine.params
+    
+    def _lookup(self, data):
+        """(content hash, cached OCRResult or None) for encoded image bytes"""
+        if self.cache is None:
+            return None, None
+        content = self.cache.content_hash(data)
+        cached = self.cache.get(content, self.engine.name, self.cache_params)
+        if cached is None:
+            return content, None
+        return content, OCRResult(cached['boxes'], cached['texts'], cached['confidences'])
+    
+    def _remember(self, content, result):
+        # Skipped images are not cached: the pre-filter is cheaper than a lookup
+        # is worth, and a later run without it must still OCR them
+        if (self.cache is not None and content is not None and result.error is None
+                and result.text_presence is None):
+            self.cache.put(content, self.engine.name, self.cache_params, result.text(),
+                           result.texts, result.boxes, result.confidences)
+    
+    def _recognize_uncached(self, data):
+        """Pre-filter, then OCR the encoded image unless it was judged textless"""
+        try:
+            if self.text_filter is not None:
+                has_text, confidence = self.text_filter.detect(io.BytesIO(data))
+                if not has_text:
+                    return OCRResult.skipped(confidence)
+            return self.engine.recognize(io.BytesIO(data))
+        except Exception as e:
+            return OCRResult.failed(e)
+    
+    def recognize(self, image_file):
+        """
+        Run OCR once and keep everything it found
+        
+        Args:
+            image_file: Uploaded file object, path or raw bytes
+        
+        Returns:
+            OCRResult: Boxes, text spans and confidences; failed OCR gives an
+            empty result with .error set, and an image the pre-filter judged
+            textless an empty result with .text_presence set
+        """
+        try:
+            data = _image_bytes(image_file)
+            content, result = self._lookup(data)
+            if result is None:
+                result = self._recognize_uncached(data)
+                self._remember(content, result)
+            return result
+        except Exception as e:
+            return OCRResult.failed(e)
     
-    def extract_text(self, image_file):
+    def extract_text(self, image_file, min_confidence=0.0):
         """
         Extract text from an image file
         
         Args:
             image_file: Uploaded file object from Streamlit
-            
+            min_confidence: Drop detections scored below this
+        
         Returns:
             str: Extracted text from the image
         """
+        return self.recognize(image_file).text(min_confidence)
+    
+    def batch_extract(self, images, min_confidence=0.0, **options):
+        """
+        Text of many images, see batch_recognize for the options
+        
+        Yields:
+            tuple: (name, extracted_text) in completion order
+        """
+        for name, result in self.batch_recognize(images, **options):
+            yield name, result.text(min_confidence)
+    
+    def batch_recognize(self, images, workers=None, max_pending=None, progress_callback=None, total=None):
+        """
+        Run OCR on many images on a pool of worker processes
+        
+        Each worker loads its own copy of the engine once and runs the
+        text-presence pre-filter before it, and at most
+        max_pending images are in flight at a time, so memory stays bounded
+        however many images are passed. The pool stays up between calls
+        until close(); batches of at most in_process_max images run in this
+        process instead. Results come back as soon as they are ready, not in
+        input order; cached images come back without being sent to a worker.
+        
+        Args:
+            images: Iterable of (name, image) pairs; image is an uploaded file,
+                a path or raw bytes
+            workers: Number of worker processes (defaults to the CPU count)
+            max_pending: Images queued or running at once (defaults to 2 per worker)
+            progress_callback: Called as progress_callback(done, total, name) after
+                each image; total is None when it is not known
+            total: Number of images, for a generator; defaults to len(images).
+                Unknown totals always use the pool
+        
+        Yields:
+            tuple: (name, OCRResult) in completion order
+        """
+        if total is None and hasattr(images, '__len__'):
+            total = len(images)
+        workers = workers or os.cpu_count() or 1
+        max_pending = max(max_pending or 2 * workers, workers)
+        done = 0
+        
+        if workers == 1 or (total is not None and total <= self.in_process_max):
+            # Not worth starting a pool; use this process's shared models
+            for name, image_file in images:
+                result = self.recognize(image_file)
+                done += 1
+                if progress_callback:
+                    progress_callback(done, total, name)
+                yield name, result
+            return
+        
+        pool = self._get_pool(workers)
+        pending = {}
         try:
-            # Convert uploaded file to PIL Image
-            image = Image.open(image_file)
-            
-            # Convert PIL Image to numpy array for EasyOCR
-            image_np = np.array(image)
-            
-            # Perform OCR
-            results = self.reader.readtext(image_np)
-            
-            # Extract just the text from results
-            # results format: [(bbox, text, confidence), ...]
-            extracted_text = ' '.join([text for (bbox, text, conf) in results])
-            
-            # Clean up the text
-            extracted_text = extracted_text.strip()
-            
-            return extracted_text if extracted_text else "[No text detected]"
+            source = iter(images)
+            exhausted = False
             
-        except Exception as e:
-            return f"[Error: {str(e)}]"
+            while pending or not exhausted:
+                while not exhausted and len(pending) < max_pending:
+                    try:
+                        name, image_file = next(source)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    
+                    data = _image_bytes(image_file)
+                    try:
+                        content, cached = self._lookup(data)
+                    except Exception:
+                        content, cached = None, None  # Undecodable; the worker reports the error
+                    if cached is not None:
+                        done += 1
+                        if progress_callback:
+                            progress_callback(done, total, name)
+                        yield name, cached
+                        continue
+                    pending[pool.submit(_ocr_worker, name, data)] = (name, content)
+                
+                if not pending:
+                    break
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name, content = pending.pop(future)
+                    try:
+                        _, result = future.result()
+                        self._remember(content, result)
+                    except Exception as e:
+                        if isinstance(e, BrokenProcessPool):
+                            self.close()  # Unusable from now on
+                        result = OCRResult.failed(e)
+                    done += 1
+                    if progress_callback:
+                        progress_callback(done, total, name)
+                    yield name, result
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); the next call starts a fresh pool
+            self.close()
+            raise
+        finally:
+            # Cancelled or abandoned midway: drop what is still queued
+            for future in pending:
+                future.cancel()
     
-    def extract_text_with_confidence(self, image_file):
+    def extract_text_with_confidence(self, image_file, min_confidence=0.0):
         """
         Extract text with confidence scores
         
         Args:
             image_file: Uploaded file object from Streamlit
-            
+            min_confidence: Drop detections scored below this
+        
         Returns:
             list: List of tuples (text, confidence)
         """
-        try:
-            image = Image.open(image_file)
-            image_np = np.array(image)
-            results = self.reader.readtext(image_np)
-            
-            # Return text with confidence scores
-            return [(text, conf) for (bbox, text, conf) in results]
-            
-        except Exception as e:
-            return [(f"Error: {str(e)}", 0.0)]
\ No newline at end of file
+        return self.recognize(image_file).with_confidence(min_confidence)
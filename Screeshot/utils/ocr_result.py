@@ -0,0 +1,112 @@
+import numpy as np
+
+NO_TEXT = "[No text detected]"
+
+
+class OCRResult:
+    """
+    Everything one OCR pass found in an image, stored as arrays
+
+    - boxes: float32 (n, 4, 2) corner points of each detection, in original
+      image coordinates
+    - confidences: float32 (n,)
+    - spans: the detected strings, kept as one buffer plus int32 offsets
+
+    text() and with_confidence() are views over the same arrays, so callers
+    that need the joined text, the confidences or the layout share a single
+    readtext call.
+
+    text_presence is set when the text-presence pre-filter judged the image
+    textless and OCR was skipped; it holds the filter's confidence.
+    """
+    __slots__ = ('boxes', 'confidences', '_buffer', '_offsets', 'error', 'text_presence')
+
+    def __init__(self, boxes=None, texts=(), confidences=None, error=None, text_presence=None):
+        """
+        Args:
+            boxes: (n, 4, 2) corner points, or None when the engine reports no layout
+            texts: n detected strings
+            confidences: n scores in [0, 1], or None for "unknown" (stored as 1.0)
+            error: Message when OCR failed; the result is then empty
+            text_presence: Confidence that the image is textless, when OCR was skipped
+        """
+        texts = list(texts)
+        n = len(texts)
+        self.boxes = np.zeros((n, 4, 2), dtype=np.float32) if boxes is None \
+            else np.asarray(boxes, dtype=np.float32).reshape(n, 4, 2)
+        self.confidences = np.ones(n, dtype=np.float32) if confidences is None \
+            else np.asarray(confidences, dtype=np.float32).reshape(n)
+        self._buffer = ''.join(texts)
+        self._offsets = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum([len(t) for t in texts], out=self._offsets[1:])
+        self.error = error
+        self.text_presence = text_presence
+
+    @classmethod
+    def from_readtext(cls, results, scale=1.0, offset=(0, 0)):
+        """
+        Build from EasyOCR readtext output, [(bbox, text, confidence), ...]
+
+        Args:
+            scale, offset: Transform of the preprocessed image, mapped back with
+                point / scale + offset
+        """
+        texts = [text for (bbox, text, conf) in results]
+        boxes = np.array([bbox for (bbox, text, conf) in results], dtype=np.float32).reshape(-1, 4, 2)
+        boxes = boxes / scale + np.asarray(offset, dtype=np.float32)
+        confidences = [conf for (bbox, text, conf) in results]
+        return cls(boxes, texts, confidences)
+
+    @classmethod
+    def failed(cls, error):
+        return cls(error=str(error))
+
+    @classmethod
+    def skipped(cls, confidence):
+        """Empty result for an image the pre-filter judged textless"""
+        return cls(text_presence=float(confidence))
+
+    def __len__(self):
+        return len(self.confidences)
+
+    def span(self, i):
+        return self._buffer[self._offsets[i]:self._offsets[i + 1]]
+
+    @property
+    def texts(self):
+        return [self.span(i) for i in range(len(self))]
+
+    @property
+    def bounds(self):
+        """Axis-aligned (n, 4) boxes as [left, top, right, bottom], e.g. for cropping"""
+        if len(self) == 0:
+            return np.zeros((0, 4), dtype=np.float32)
+        return np.concatenate([self.boxes.min(axis=1), self.boxes.max(axis=1)], axis=1)
+
+    def keep(self, min_confidence=0.0):
+        """Indices of detections with confidence >= min_confidence"""
+        return np.flatnonzero(self.confidences >= min_confidence)
+
+    def filter(self, min_confidence=0.0):
+        """New OCRResult holding only the detections that pass the threshold"""
+        keep = self.keep(min_confidence)
+        return OCRResult(self.boxes[keep], [self.span(i) for i in keep], self.confidences[keep],
+                         self.error, self.text_presence)
+
+    def text(self, min_confidence=0.0):
+        """
+        Detected text joined with spaces, in reading order of the engine
+
+        Returns:
+            str: "[No text detected]" when nothing passes, "[Error: ...]" when OCR failed
+        """
+        if self.error is not None:
+            return f"[Error: {self.error}]"
+        joined = ' '.join(self.span(i) for i in self.keep(min_confidence)).strip()
+        return joined if joined else NO_TEXT
+
+    def with_confidence(self, min_confidence=0.0):
+        """List of (text, confidence) tuples"""
+        if self.error is not None:
+            return [(f"Error: {self.error}", 0.0)]
+        return [(self.span(i), float(self.confidences[i])) for i in self.keep(min_confidence)]
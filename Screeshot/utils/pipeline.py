@@ -0,0 +1,236 @@
+import queue
+import threading
+import time
+
+from .near_duplicates import dhash
+
+STAGES = ('hash', 'ocr', 'embed')
+
+
+class ExtractionPipeline:
+    """
+    Background hash -> OCR -> embedding pipeline for one batch of uploads
+
+    The work runs on two daemon threads owned by this object, so it keeps
+    going across Streamlit reruns as long as the object stays in session
+    state. The OCR thread hashes the images, resolves near-duplicates and
+    runs batch_recognize; every result is handed to the embedding thread,
+    which warms the clustering engine's embedding cache while OCR of the
+    next images continues. Finished records can be read at any time with
+    results(), so a partial batch can be organized before the rest is done.
+    """
+
+    def __init__(self, ocr_processor, clustering_engine, duplicate_index, known_texts,
+                 embed_batch=16, flush_interval=30.0, **ocr_options):
+        """
+        Args:
+            ocr_processor: OCRProcessor used for the representatives
+            clustering_engine: EnhancedClusteringEngine whose embedding cache is warmed
+            duplicate_index: DuplicateIndex shared by the session's batches
+            known_texts: Dict of {name: text} of representatives from earlier
+                batches; updated as images are OCR'd
+            embed_batch: Most texts encoded per model call
+            flush_interval: Seconds between writes of the warmed embeddings to
+                the disk cache; they are also written when the pipeline ends
+            ocr_options: Passed on to OCRProcessor.batch_recognize
+        """
+        self.ocr_processor = ocr_processor
+        self.clustering_engine = clustering_engine
+        self.duplicate_index = duplicate_index
+        self.known_texts = known_texts
+        self.embed_batch = embed_batch
+        self.flush_interval = flush_interval
+        self.ocr_options = ocr_options
+
+        # Held around every use of the clustering engine, which is not thread-safe
+        self.engine_lock = threading.Lock()
+
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._queue = queue.Queue()
+        self._threads = []
+        self._order = []
+        self._records = {}
+        self._progress = {stage: {'done': 0, 'total': 0} for stage in STAGES}
+        self._last = None
+        self._error = None
+        self._started = None
+        self._finished = None
+
+    def start(self, files, user_tags=()):
+        """
+        Start processing in the background and return immediately
+
+        Args:
+            files: List of (name, encoded image bytes), in display order
+            user_tags: Tags whose focused texts are embedded ahead of organizing
+        """
+        if self._threads:
+            raise RuntimeError("Pipeline already started")
+        self._order = [name for name, _ in files]
+        for stage in STAGES:
+            self._progress[stage]['total'] = len(files)
+        self._started = time.perf_counter()
+
+        self._threads = [
+            threading.Thread(target=self._run_ocr, args=(list(files),), name="pipeline-ocr", daemon=True),
+            threading.Thread(target=self._run_embed, args=(list(user_tags),), name="pipeline-embed", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def cancel(self):
+        """Stop after the images already in flight"""
+        self._cancel.set()
+
+    @property
+    def running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def wait(self, timeout=None):
+        """Block until both stages are done; True when they are"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        return not self.running
+
+    def progress(self):
+        """
+        Snapshot of the pipeline's state
+
+        Returns:
+            dict: {'stages': {stage: {'done', 'total'}}, 'last': name of the
+            last finished image, 'running', 'cancelled', 'error', 'seconds'}
+        """
+        with self._lock:
+            stages = {stage: dict(counts) for stage, counts in self._progress.items()}
+            end = self._finished if self._finished is not None else time.perf_counter()
+            return {
+                'stages': stages,
+                'last': self._last,
+                'running': self.running,
+                'cancelled': self._cancel.is_set(),
+                'error': self._error,
+                'seconds': round(end - self._started, 2) if self._started is not None else 0.0,
+            }
+
+    def results(self):
+        """
+        Records of the images finished so far, in upload order
+
+        Returns:
+            dict: {name: {'text', optional 'duplicate_of', optional 'text_presence'}}
+        """
+        with self._lock:
+            return {name: dict(self._records[name]) for name in self._order if name in self._records}
+
+    def organize(self, user_tags, previous=None, names=None):
+        """
+        organize_screenshots over the finished records, safe to call while the pipeline runs
+
+        names: Only organize the records of these images, e.g. those still uploaded
+        """
+        records = self.results()
+        if names is not None:
+            records = {name: record for name, record in records.items() if name in names}
+        with self.engine_lock:
+            return self.clustering_engine.organize_screenshots(records, user_tags, previous=previous)
+
+    def _advance(self, stage, count=1):
+        with self._lock:
+            self._progress[stage]['done'] += count
+
+    def _finish(self, name, record):
+        with self._lock:
+            self._records[name] = record
+            self._last = name
+        self._advance('ocr')
+        self._queue.put(record['text'])
+
+    def _run_ocr(self, files):
+        try:
+            # Near-duplicates of an image in this batch or an earlier one reuse its text
+            hashes = {}
+            for name, data in files:
+                try:
+                    hashes[name] = dhash(data)
+                except Exception:
+                    pass  # Unreadable image; OCR reports the error
+                self._advance('hash')
+
+            names = set(self._order)
+            duplicate_of = {
+                name: representative
+                for name, representative in self.duplicate_index.group(hashes).items()
+                if representative != name and (representative in names or representative in self.known_texts)
+            }
+            waiting = {}
+            for name, representative in duplicate_of.items():
+                if representative in self.known_texts and representative not in names:
+                    self._finish(name, {'text': self.known_texts[representative], 'duplicate_of': representative})
+                else:
+                    waiting.setdefault(representative, []).append(name)
+
+            def images():
+                for name, data in files:
+                    if self._cancel.is_set():
+                        return
+                    if name not in duplicate_of:
+                        yield name, data
+
+            # The count lets small batches run on the processor's loaded models
+            options = dict(self.ocr_options)
+            options.setdefault('total', len(files) - len(duplicate_of))
+            for name, result in self.ocr_processor.batch_recognize(images(), **options):
+                text = result.text()
+                self.known_texts[name] = text
+                record = {'text': text}
+                if result.text_presence is not None:
+                    # Judged textless by the pre-filter; OCR was skipped
+                    record['text_presence'] = result.text_presence
+                self._finish(name, record)
+                for duplicate in waiting.pop(name, ()):
+                    self._finish(duplicate, {'text': text, 'duplicate_of': name})
+        except Exception as e:
+            with self._lock:
+                self._error = str(e)
+        finally:
+            self._queue.put(None)
+
+    def _run_embed(self, user_tags):
+        # Each flush rewrites the cache index, so batches are only kept in memory
+        last_flush = time.monotonic()
+        done = False
+        while not done:
+            batch = [self._queue.get()]
+            while len(batch) < self.embed_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                done = True
+                batch = [text for text in batch if text is not None]
+            if not batch:
+                continue
+
+            try:
+                with self.engine_lock:
+                    self.clustering_engine.warm_embeddings(batch, user_tags)
+                    if time.monotonic() - last_flush >= self.flush_interval:
+                        self.clustering_engine.embedding_cache.flush()
+                        last_flush = time.monotonic()
+            except Exception as e:
+                # Organizing still works, it just encodes these texts itself
+                with self._lock:
+                    self._error = self._error or f"Embedding failed: {e}"
+            self._advance('embed', len(batch))
+
+        try:
+            with self.engine_lock:
+                self.clustering_engine.embedding_cache.flush()
+        except Exception as e:
+            with self._lock:
+                self._error = self._error or f"Embedding failed: {e}"
+        with self._lock:
+            self._finished = time.perf_counter()
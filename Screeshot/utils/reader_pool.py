@@ -0,0 +1,172 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from .model_registry import _current_rss_mb
+
+# Memory budget for the recognition models of all resident readers of one
+# process. batch_recognize workers each have their own pool and split it
+# between them, so OCR uses up to twice this: the app's share plus the workers'
+DEFAULT_BUDGET_MB = float(os.environ.get('OCR_READER_BUDGET_MB', 1024))
+# Assumed size of a reader whose weights cannot be measured (no torch)
+DEFAULT_READER_MB = 100.0
+
+# Reader attributes that make up the text detector
+_DETECTOR_ATTRIBUTES = ('detector', 'get_textbox', 'get_detector', 'detect_network')
+
+
+def _module_mb(module):
+    total = 0
+    if hasattr(module, 'parameters'):
+        for tensor in list(module.parameters()) + list(module.buffers()):
+            total += tensor.numel() * tensor.element_size()
+    return total / (1024 * 1024) if total else None
+
+
+def _load_reader(languages, gpu, detector):
+    import easyocr
+    return easyocr.Reader(list(languages), gpu=gpu, detector=detector)
+
+
+class ReaderPool:
+    """
+    EasyOCR readers keyed by language set, created on first use
+
+    All readers of a device share one text detector: the first reader
+    loads it, later ones are built without it and borrow it, so only the
+    per-script recognition models are duplicated. Readers are kept in LRU
+    order and the least recently used ones are dropped once their
+    recognizers exceed max_mb; the detector stays resident.
+    """
+
+    def __init__(self, max_mb=DEFAULT_BUDGET_MB, loader=_load_reader):
+        """
+        Args:
+            max_mb: Budget for the recognizers of resident readers, in MB
+            loader: loader(languages, gpu, detector) building a reader,
+                replaceable in benchmarks
+        """
+        self.max_mb = max_mb
+        self.loader = loader
+        self._readers = OrderedDict()  # (languages, gpu) -> (reader, mb)
+        self._detectors = {}           # gpu -> {attribute: value} of the shared detector
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(languages, gpu=False):
+        # EasyOCR loads the same models whatever the order of the languages
+        return tuple(sorted(dict.fromkeys(languages))), bool(gpu)
+
+    @staticmethod
+    def _label(key):
+        languages, gpu = key
+        return f"easyocr:{'+'.join(languages)}" + (" (gpu)" if gpu else "")
+
+    def get(self, languages, gpu=False):
+        """Reader for exactly these languages, loading it on first use"""
+        key = self.key(languages, gpu)
+        with self._lock:
+            entry = self._readers.get(key)
+            if entry is not None:
+                self._readers.move_to_end(key)
+                return entry[0]
+
+            reader = self._load(key)
+            self._evict(keep=key)
+            return reader
+
+    def detector_reader(self, gpu=False, languages=('en',)):
+        """
+        A resident reader of the device, for detect()-only calls
+
+        Every reader of a device holds the shared detector, so the most
+        recently used one is returned; languages are loaded if none is.
+        """
+        with self._lock:
+            for key in reversed(self._readers):
+                if key[1] == bool(gpu):
+                    return self._readers[key][0]
+        return self.get(languages, gpu)
+
+    def resident_mb(self):
+        with self._lock:
+            return sum(mb for _, mb in self._readers.values())
+
+    def __len__(self):
+        return len(self._readers)
+
+    def clear(self):
+        with self._lock:
+            self._readers.clear()
+            self._detectors.clear()
+
+    def warmup(self, languages=('en',), gpu=False, background=True):
+        """Load a reader ahead of the first image; returns the loading thread or None"""
+        def load():
+            try:
+                self.get(languages, gpu)
+            except Exception:
+                pass  # Recorded in stats(); the real request will raise it
+
+        if self.key(languages, gpu) in self._readers:
+            return None
+        if not background:
+            load()
+            return None
+        thread = threading.Thread(target=load, name="reader-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self):
+        """Dict of {'easyocr:languages': {...}} in the format of ModelRegistry.stats()"""
+        with self._lock:
+            return {label: dict(stats) for label, stats in self._stats.items()}
+
+    def _load(self, key):
+        languages, gpu = key
+        label = self._label(key)
+        shared = self._detectors.get(gpu)
+
+        rss_before = _current_rss_mb()
+        start = time.perf_counter()
+        try:
+            reader = self.loader(languages, gpu, shared is None)
+        except Exception as e:
+            self._stats[label] = {'loaded': False, 'error': str(e)}
+            raise
+
+        if shared is None:
+            # Keep only the detector, so evicting this reader frees its recognizer
+            self._detectors[gpu] = {attribute: getattr(reader, attribute)
+                                    for attribute in _DETECTOR_ATTRIBUTES if hasattr(reader, attribute)}
+        else:
+            for attribute, value in shared.items():
+                setattr(reader, attribute, value)
+
+        mb = _module_mb(getattr(reader, 'recognizer', None))
+        rss_after = _current_rss_mb()
+        self._readers[key] = (reader, mb if mb is not None else DEFAULT_READER_MB)
+        self._stats[label] = {
+            'loaded': True,
+            'load_seconds': round(time.perf_counter() - start, 3),
+            'parameter_mb': mb,
+            'rss_delta_mb': round(rss_after - rss_before, 1) if rss_before is not None and rss_after is not None else None,
+            'shares_detector': shared is not None,
+        }
+        return reader
+
+    def _evict(self, keep):
+        resident = sum(mb for _, mb in self._readers.values())
+        for key in list(self._readers):
+            if resident <= self.max_mb:
+                break
+            if key == keep:
+                continue
+            _, mb = self._readers.pop(key)
+            resident -= mb
+            self._stats[self._label(key)] = {'loaded': False, 'evicted': True}
+
+
+reader_pool = ReaderPool()
@@ -0,0 +1,249 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+from .blob_store import remove_file, remove_tree
+
+MANIFEST_NAME = ".retention.json"
+
+# Budgets of FileManager's output directories; None disables a limit
+ORGANIZED_BUDGET = {
+    'max_bytes': int(float(os.environ.get('ORGANIZED_MAX_MB', 2048)) * 1024 * 1024),
+    'max_entries': int(os.environ.get('ORGANIZED_MAX_RUNS', 20)),
+    'ttl_seconds': float(os.environ.get('ORGANIZED_TTL_HOURS', 7 * 24)) * 3600,
+}
+TEMP_ZIP_BUDGET = {
+    'max_bytes': int(float(os.environ.get('TEMP_ZIP_MAX_MB', 1024)) * 1024 * 1024),
+    'max_entries': int(os.environ.get('TEMP_ZIP_MAX_FILES', 10)),
+    'ttl_seconds': float(os.environ.get('TEMP_ZIP_TTL_HOURS', 24)) * 3600,
+}
+
+
+def _own_bytes(path):
+    st = os.lstat(path)
+    if os.path.islink(path) or st.st_nlink > 1:
+        return 0
+    return st.st_size
+
+
+def _disk_bytes(path):
+    """
+    Bytes a run occupies on its own
+
+    Symlinks and files hardlinked to a blob are not counted: their bytes
+    belong to the blob store and are freed by its collect().
+    """
+    if os.path.islink(path) or not os.path.isdir(path):
+        return _own_bytes(path)
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for file in files:
+            total += _own_bytes(os.path.join(root, file))
+    return total
+
+
+def _remove(path):
+    # Runs hold hardlinks to read-only blobs, which plain deletes fail on under Windows
+    if os.path.isdir(path) and not os.path.islink(path):
+        remove_tree(path)
+    else:
+        remove_file(path)
+
+
+class RetentionManager:
+    """
+    Keeps the runs saved in one directory within a byte and count budget
+
+    A run is a direct child of the directory whose name starts with prefix
+    (an organized_<timestamp> folder, a ZIP) and that was passed to
+    register(). The runs are listed in a manifest with their size and last
+    access, rewritten atomically on every change. Anything else in the
+    directory, such as sample folders checked into the repository, is
+    never evicted, even when its name matches. Eviction drops runs not
+    accessed within ttl_seconds, then least recently accessed ones until
+    both budgets hold, always keeping the keep_latest most recent. It runs
+    on a background thread, so saving a run never waits for it.
+    """
+
+    def __init__(self, directory, prefix, max_bytes=None, max_entries=None, ttl_seconds=None,
+                 keep_latest=1, blob_store=None):
+        """
+        Args:
+            directory: Directory holding the runs
+            prefix: Name prefix of the runs; other entries are never touched
+            max_bytes: Budget for the runs, plus the blob store when given
+            max_entries: Most runs kept
+            ttl_seconds: Runs not accessed for this long are evicted
+            keep_latest: Most recently accessed runs that are never evicted
+            blob_store: BlobStore the runs link to; unreferenced blobs are
+                collected on every eviction pass
+        """
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.keep_latest = keep_latest
+        self.blob_store = blob_store
+        self.manifest_path = os.path.join(directory, MANIFEST_NAME)
+        self.last_eviction = None
+        self.last_error = None
+
+        self._lock = threading.Lock()        # the manifest
+        self._evict_lock = threading.Lock()  # one eviction pass at a time
+        self._thread = None
+        self._again = False
+        os.makedirs(directory, exist_ok=True)
+
+    def register(self, path):
+        """Record a new or rewritten run and schedule an eviction pass"""
+        name = os.path.basename(os.path.normpath(path))
+        now = time.time()
+        with self._lock:
+            entries = self._load()
+            created = entries.get(name, {}).get('created', now)
+            entries[name] = {'created': created, 'last_access': now, 'bytes': _disk_bytes(path)}
+            self._save(entries)
+        self.schedule()
+
+    def touch(self, path):
+        """Mark a run as used now, moving it to the back of the eviction order"""
+        name = os.path.basename(os.path.normpath(path))
+        with self._lock:
+            entries = self._load()
+            if name in entries:
+                entries[name]['last_access'] = time.time()
+                self._save(entries)
+
+    def entries(self):
+        """Dict of {run name: {'created', 'last_access', 'bytes'}}"""
+        with self._lock:
+            return self._load()
+
+    def total_bytes(self):
+        total = sum(entry['bytes'] for entry in self.entries().values())
+        if self.blob_store is not None:
+            total += self.blob_store.total_bytes()
+        return total
+
+    def schedule(self):
+        """Run evict() on the background thread; calls made while it runs coalesce"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                self._again = True
+                return
+            self._again = False
+            self._thread = threading.Thread(target=self._run, name="retention", daemon=True)
+            self._thread.start()
+
+    def wait(self, timeout=None):
+        """Block until the background pass, if any, is done"""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def evict(self, now=None):
+        """
+        Delete runs until the directory is within its budgets
+
+        Returns:
+            dict: {'evicted': run names, 'bytes_freed': int}
+        """
+        now = time.time() if now is None else now
+        evicted, freed = [], 0
+        # The manifest lock is only held to read and write it, so runs can
+        # be registered while files are being deleted
+        with self._evict_lock:
+            with self._lock:
+                entries = self._load()
+            # Least recently accessed first; the newest ones are protected
+            order = sorted(entries, key=lambda name: entries[name]['last_access'])
+            candidates = order[:max(len(order) - self.keep_latest, 0)]
+
+            used = sum(entry['bytes'] for entry in entries.values())
+            if self.blob_store is not None:
+                used += self.blob_store.total_bytes()
+
+            for name in candidates:
+                entry = entries[name]
+                expired = self.ttl_seconds is not None and now - entry['last_access'] > self.ttl_seconds
+                too_many = self.max_entries is not None and len(entries) > self.max_entries
+                too_big = self.max_bytes is not None and used > self.max_bytes
+                if not (expired or too_many or too_big):
+                    continue
+
+                try:
+                    _remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+                del entries[name]
+                evicted.append(name)
+                freed += entry['bytes']
+                used -= entry['bytes']
+                if too_big and self.blob_store is not None:
+                    # Blobs only this run used are what actually frees the space
+                    blobs_freed = self.blob_store.collect(self._linked_blobs())
+                    freed += blobs_freed
+                    used -= blobs_freed
+
+            if evicted:
+                with self._lock:
+                    # Reloading drops the deleted runs and keeps any registered meanwhile
+                    self._save(self._load())
+            if self.blob_store is not None:
+                # Every pass, not only after an eviction: runs deleted by hand
+                # or rewritten by register() also leave blobs nobody links to
+                freed += self.blob_store.collect(self._linked_blobs())
+
+        self.last_eviction = {'evicted': evicted, 'bytes_freed': freed, 'at': now}
+        return {'evicted': evicted, 'bytes_freed': freed}
+
+    def _run(self):
+        while True:
+            try:
+                self.evict()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+            with self._lock:
+                if not self._again:
+                    return
+                self._again = False
+
+    def _linked_blobs(self):
+        """Symlinks of every run on disk, managed or not, which keep their blobs alive"""
+        links = []
+        for name in os.listdir(self.directory):
+            if not name.startswith(self.prefix):
+                continue
+            for root, dirs, files in os.walk(os.path.join(self.directory, name)):
+                for file in files:
+                    path = os.path.join(root, file)
+                    if os.path.islink(path):
+                        links.append(path)
+        return links
+
+    def _load(self):
+        """Manifest without the runs that are no longer on disk"""
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                entries = json.load(f)
+        except (FileNotFoundError, ValueError):
+            entries = {}
+
+        on_disk = {name for name in os.listdir(self.directory) if name.startswith(self.prefix)}
+        return {name: entry for name, entry in entries.items() if name in on_disk}
+
+    def _save(self, entries):
+        # Write then rename, so readers only ever see a whole manifest
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=MANIFEST_NAME, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.manifest_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
@@ -0,0 +1,122 @@
+import numpy as np
+
+# EasyOCR language codes by writing system. Each script has its own
+# recognition model; English can be added to any of them.
+SCRIPTS = {
+    'devanagari': ('hi', 'mr', 'ne', 'bh', 'mai', 'ang', 'bho', 'mah', 'sck', 'new', 'gom'),
+    'cyrillic': ('ru', 'rs_cyrillic', 'be', 'bg', 'uk', 'mn', 'abq', 'ady', 'kbd', 'ava', 'dar', 'inh', 'che', 'lbe', 'lez', 'tab', 'tjk'),
+    'arabic': ('ar', 'fa', 'ur', 'ug'),
+    'bengali': ('bn', 'as', 'mni'),
+    'thai': ('th',),
+    'ch_sim': ('ch_sim',),
+    'ch_tra': ('ch_tra',),
+    'ja': ('ja',),
+    'ko': ('ko',),
+    'ta': ('ta',),
+    'te': ('te',),
+    'kn': ('kn',),
+}
+
+# Scripts whose words hang from a continuous headline (shirorekha)
+HEADLINE_SCRIPTS = ('devanagari', 'bengali')
+
+
+def script_of(language):
+    """Script of an EasyOCR language code; anything not listed is Latin"""
+    for script, languages in SCRIPTS.items():
+        if language in languages:
+            return script
+    return 'latin'
+
+
+def group_languages(languages):
+    """
+    Split a language list into sets EasyOCR can load as one reader
+
+    Languages of different non-Latin scripts cannot share a reader, so each
+    script gets its own, with English added when it was requested.
+
+    Returns:
+        dict: {script: tuple of language codes}, in order of first appearance
+    """
+    groups = {}
+    for language in languages:
+        groups.setdefault(script_of(language), []).append(language)
+    if 'en' in languages:
+        for script, members in groups.items():
+            if 'en' not in members:
+                members.append('en')
+    return {script: tuple(members) for script, members in groups.items()}
+
+
+def _long_runs(row, min_run):
+    """Total length of the runs of True in row at least min_run long"""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], row.view(np.int8), [0]))))
+    lengths = edges[1::2] - edges[::2]
+    return int(lengths[lengths >= min_run].sum())
+
+
+def headline_fraction(gray, boxes, min_height=8):
+    """
+    Share of text-line width whose words hang from a headline
+
+    A word in Devanagari or Bengali has one row near its top that is ink
+    from the first letter to the last; in Latin text every row breaks
+    between letters, so no row has long unbroken runs. Cost is a few row
+    scans per detected line.
+
+    Args:
+        gray: 2-D uint8 array of the image
+        boxes: Line boxes as [x_min, x_max, y_min, y_max], e.g. EasyOCR's horizontal_list
+        min_height: Lines shorter than this are ignored
+
+    Returns:
+        float: Width-weighted fraction in [0, 1]; 0 when no line qualifies
+    """
+    total = headline = 0.0
+    for x_min, x_max, y_min, y_max in boxes:
+        x_min, y_min = max(int(x_min), 0), max(int(y_min), 0)
+        crop = gray[y_min:max(int(y_max), 0), x_min:max(int(x_max), 0)]
+        height, width = crop.shape[:2]
+        if height < min_height or width < 2 * height:
+            continue
+
+        # Ink is whatever differs clearly from the line's background
+        background = np.median(crop)
+        spread = int(crop.max()) - int(crop.min())
+        ink = np.abs(crop.astype(np.int16) - background) > max(24, 0.3 * spread)
+        # Pairs of rows, so a headline split by anti-aliasing still counts
+        ink = ink[:-1] | ink[1:]
+
+        # A headline run spans several letters: at least as long as the line is tall
+        best = max(_long_runs(row, height) for row in ink[:max(1, height // 2)])
+        total += width
+        if best >= 0.4 * width:
+            headline += width
+    return headline / total if total else 0.0
+
+
+def detect_script(gray, boxes, candidates, threshold=0.3):
+    """
+    Pick the most likely script among candidates for one image
+
+    Only headline scripts can be told apart visually this cheaply; the
+    first other candidate (Latin when requested) is returned otherwise.
+
+    Args:
+        gray: 2-D uint8 array of the image
+        boxes: Line boxes as [x_min, x_max, y_min, y_max]
+        candidates: Scripts to choose from, e.g. the keys of group_languages()
+        threshold: Headline fraction needed to call a headline script
+
+    Returns:
+        str: One of candidates
+    """
+    candidates = list(candidates)
+    others = [script for script in candidates if script not in HEADLINE_SCRIPTS]
+    headline = [script for script in candidates if script in HEADLINE_SCRIPTS]
+    if headline and (not others or headline_fraction(gray, boxes) >= threshold):
+        return headline[0]
+    if 'latin' in others:
+        return 'latin'
+    return others[0]
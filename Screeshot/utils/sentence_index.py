@@ -0,0 +1,87 @@
+import numpy as np
+
+from .embedding_store import EmbeddingStore
+
+
+class SentenceIndex:
+    """
+    Sentence embeddings of many images in one contiguous matrix
+
+    Rows of image i are vectors[offsets[i]:offsets[i + 1]] (CSR layout), so
+    scoring every image against every tag is one matrix product followed
+    by a per-image pooling step.
+    """
+
+    def __init__(self, vectors, offsets):
+        """
+        Args:
+            vectors: EmbeddingStore of sentence embeddings
+            offsets: Array of n_images + 1 row offsets into vectors
+        """
+        self.vectors = vectors
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+
+    @classmethod
+    def build(cls, sentence_lists, embed, dtype='float32'):
+        """
+        Args:
+            sentence_lists: One list of sentences per image
+            embed: Function mapping a list of texts to an (n, dim) array
+            dtype: Storage mode of the EmbeddingStore ('float32', 'float16' or 'int8')
+        """
+        unique = {}
+        rows = []
+        offsets = [0]
+        for sentences in sentence_lists:
+            for sentence in sentences:
+                rows.append(unique.setdefault(sentence, len(unique)))
+            offsets.append(len(rows))
+
+        vectors = None
+        if unique:
+            embeddings = np.asarray(embed(list(unique)))[np.array(rows, dtype=np.int64)]
+            vectors = EmbeddingStore(embeddings.shape[1], dtype, capacity=len(embeddings))
+            vectors.add(embeddings)
+        return cls(vectors, offsets)
+
+    @property
+    def n_images(self):
+        return len(self.offsets) - 1
+
+    def pool(self, tag_vectors, top_k=1):
+        """
+        Relevance of every image to every tag
+
+        Args:
+            tag_vectors: Tag embeddings, shape (n_tags, dim)
+            top_k: 1 for max pooling, otherwise the mean of the k best sentences
+
+        Returns:
+            np.ndarray: Shape (n_images, n_tags), zeros for images without sentences
+        """
+        n_tags = len(tag_vectors)
+        pooled = np.zeros((self.n_images, n_tags), dtype=np.float32)
+        counts = np.diff(self.offsets)
+        non_empty = np.flatnonzero(counts > 0)
+        if len(non_empty) == 0 or n_tags == 0:
+            return pooled
+
+        similarities = self.vectors.similarity(tag_vectors).T
+        starts = self.offsets[:-1][non_empty]
+
+        if top_k == 1:
+            pooled[non_empty] = np.maximum.reduceat(similarities, starts, axis=0)
+            return pooled
+
+        # Rank sentences inside each image per tag, then average the best k
+        segment = np.repeat(np.arange(self.n_images), counts)
+        rank_base = np.repeat(self.offsets[:-1], counts)
+        k = np.minimum(counts[non_empty], top_k)
+        for t in range(n_tags):
+            order = np.lexsort((-similarities[:, t], segment))
+            ranked = similarities[order, t]
+            keep = (np.arange(len(order)) - rank_base) < top_k
+            sums = np.add.reduceat(np.where(keep, ranked, 0.0), starts)
+            pooled[non_empty, t] = sums / k
+
+        return pooled
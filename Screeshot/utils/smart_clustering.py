@@ -1,14 +1,109 @@
-from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 import re
+import json
+from bisect import bisect_right
 from collections import Counter
 
+from .embedding_cache import EmbeddingCache
+from .keyword_matcher import KeywordMatcher
+from .leader_clustering import normalize_rows
+from .clustering_strategies import GreedyStrategy, make_strategy
+from .model_registry import registry as model_registry, embedding_dimension
+from .sentence_index import SentenceIndex
+
+STOPWORDS = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'from', 'is', 'are', 'was', 'were'}
+
+
+def _keywords_of_lower(text_lower):
+    """extract_keywords on already-lowercased text"""
+    words = re.sub(r'[^\w\s]', ' ', text_lower).split()
+    return [w for w in words if w not in STOPWORDS and len(w) > 2]
+
+
+class TextAnalysis:
+    """
+    Everything the engine needs from one OCR text, computed in a single pass
+    
+    - sentences / sentence_keywords: the text split on '.' and tokenized once
+    - type_counts: {screenshot_type: number of its patterns found}
+    - tag_sentences: per user tag, indices of sentences containing one of its keywords
+    """
+    __slots__ = ('text', 'sentences', 'sentence_keywords', 'type_counts', 'tag_sentences')
+    
+    def __init__(self, text, sentences, sentence_keywords, type_counts, tag_sentences):
+        self.text = text
+        self.sentences = sentences
+        self.sentence_keywords = sentence_keywords
+        self.type_counts = type_counts
+        self.tag_sentences = tag_sentences
+    
+    def focused(self, tag_index):
+        """Focused text and its keywords for a tag, as focused_text_extraction would build them"""
+        selected = sorted(self.tag_sentences[tag_index])
+        if not selected:
+            return self.text, [kw for kws in self.sentence_keywords for kw in kws]
+        
+        focused_text = '. '.join(self.sentences[k].strip() for k in selected)
+        return focused_text, [kw for k in selected for kw in self.sentence_keywords[k]]
+
+
+class OrganizeState:
+    """
+    Intermediate results of organize_screenshots, kept so a later call can
+    update them incrementally instead of starting over
+    """
+    
+    def __init__(self, signature, threshold, texts, tags, scores, types, untyped, labels, leaders):
+        self.signature = signature      # Model, scoring mode, clustering method and screenshot patterns
+        self.threshold = threshold
+        self.texts = texts              # filename -> text, in score-matrix row order
+        self.tags = tags                # score-matrix column order
+        self.scores = scores
+        self.types = types              # filename -> (type, confidence)
+        self.untyped = untyped          # Similarity-clustered filenames, in clustering order
+        self.labels = labels            # Group label per untyped filename
+        self.leaders = leaders          # Normalized greedy leader embeddings, None for other strategies
+
+
 class EnhancedClusteringEngine:
-    def __init__(self):
-        """Initialize with better models for screenshot clustering"""
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+    def __init__(self, model_name='all-MiniLM-L6-v2', cache_dir="embedding_cache", model=None):
+        """
+        Initialize with better models for screenshot clustering
+        
+        Args:
+            model_name: SentenceTransformer model used for text embeddings
+            cache_dir: Directory of the persistent embedding cache, None to keep it in memory only
+            model: Already-built encoder with a SentenceTransformer-style encode(), e.g. a benchmark stub
+        
+        The SentenceTransformer itself is loaded lazily from the shared model
+        registry on the first cache miss.
+        """
+        self.model_name = model_name
+        self._model = model
         self.similarity_threshold = 0.35
+        if model is not None:
+            self.embedding_dim = model.get_sentence_embedding_dimension() or 384
+        else:
+            self.embedding_dim = embedding_dimension(model_name)
+        self.batch_size = 64  # Texts per model.encode call in batched mode
+        self.embedding_cache = EmbeddingCache(model_name, self.embedding_dim, cache_dir=cache_dir)
+        
+        # Clustering of untyped images: 'greedy', 'greedy_ann', 'density',
+        # 'minibatch_kmeans', or 'auto' to pick one by number of images.
+        # Greedy gives the same Group_N leaders at any size; 'auto' trades
+        # that for speed on large archives, so it has to be asked for
+        self.cluster_method = 'greedy'
+        self.cluster_chunk_size = 10000  # Embeddings per partial_fit call
+        
+        # Semantic part of batched tag scores: 'focused' embeds the focused text
+        # of every (image, tag) pair, 'sentence' embeds each sentence once and
+        # pools its similarity to the tags (max for top_k=1, else mean of top k)
+        self.tag_scoring = 'focused'
+        self.sentence_top_k = 1
+        self.embedding_dtype = 'float32'  # Sentence index storage: 'float32', 'float16' or 'int8'
+        
+        self._matchers = {}  # (patterns, tags) -> KeywordMatcher
         
         # Keywords for different screenshot types
         self.screenshot_patterns = {
@@ -22,42 +117,106 @@ class EnhancedClusteringEngine:
             'design': ['figma', 'design', 'prototype', 'mockup', 'ui', 'ux']
         }
     
+    @property
+    def model(self):
+        """Text encoder, shared with every other user of the same model in this process"""
+        if self._model is None:
+            self._model = model_registry.get('sentence-transformer', self.model_name)
+        return self._model
+    
     def extract_keywords(self, text):
         """Extract important keywords from text"""
         if not text or text == "[No text detected]":
             return []
         
-        # Convert to lowercase
-        text_lower = text.lower()
-        
-        # Remove special characters but keep spaces
-        text_clean = re.sub(r'[^\w\s]', ' ', text_lower)
+        # Lowercase, drop special characters and stopwords
+        return _keywords_of_lower(text.lower())
+    
+    def load_screenshot_patterns(self, patterns, replace=False):
+        """
+        Add user-defined screenshot types
         
-        # Split into words
-        words = text_clean.split()
+        Args:
+            patterns: Dict of {type: [pattern, ...]} or path to a JSON file with one
+            replace: Drop the built-in types instead of extending them
+        """
+        if isinstance(patterns, str):
+            with open(patterns, 'r', encoding='utf-8') as f:
+                patterns = json.load(f)
+        
+        if replace:
+            self.screenshot_patterns = {}
+        for screenshot_type, type_patterns in patterns.items():
+            self.screenshot_patterns[screenshot_type] = [p.lower() for p in type_patterns if p]
+    
+    def _matcher_for(self, user_tags):
+        """Compiled matcher over the screenshot patterns plus the keywords of user_tags"""
+        signature = (
+            tuple((t, tuple(p)) for t, p in self.screenshot_patterns.items()),
+            tuple(user_tags)
+        )
+        matcher = self._matchers.get(signature)
+        if matcher is None:
+            groups = {('type', t): p for t, p in self.screenshot_patterns.items()}
+            for j, tag in enumerate(user_tags):
+                groups[('tag', j)] = self.extract_keywords(tag)
+            matcher = KeywordMatcher(groups)
+            
+            if len(self._matchers) >= 8:
+                self._matchers.pop(next(iter(self._matchers)))
+            self._matchers[signature] = matcher
+        return matcher
+    
+    def analyze_text(self, text, user_tags=()):
+        """
+        Tokenize text once and find all type-pattern and tag-keyword hits in one scan
+        Returns: TextAnalysis, or None for images without text
+        """
+        if not text or text == "[No text detected]":
+            return None
         
-        # Remove common stopwords
-        stopwords = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'from', 'is', 'are', 'was', 'were'}
-        keywords = [w for w in words if w not in stopwords and len(w) > 2]
+        text_lower = text.lower()
+        matcher = self._matcher_for(user_tags)
         
-        return keywords
+        sentences = text.split('.')
+        sentences_lower = text_lower.split('.')
+        sentence_starts = []
+        position = 0
+        for sentence in sentences_lower:
+            sentence_starts.append(position)
+            position += len(sentence) + 1
+        
+        found = set()
+        tag_sentences = [set() for _ in user_tags]
+        for start, pattern in matcher.finditer(text_lower):
+            found.add(pattern)
+            for kind, key in matcher.labels[pattern]:
+                if kind == 'tag':
+                    tag_sentences[key].add(bisect_right(sentence_starts, start) - 1)
+        
+        type_counts = {}
+        for pattern in found:
+            for kind, key in matcher.labels[pattern]:
+                if kind == 'type':
+                    type_counts[key] = type_counts.get(key, 0) + 1
+        
+        sentence_keywords = [_keywords_of_lower(sentence) for sentence in sentences_lower]
+        return TextAnalysis(text, sentences, sentence_keywords, type_counts, tag_sentences)
     
-    def detect_screenshot_type(self, text):
+    def detect_screenshot_type(self, text, analysis=None):
         """
         Detect what type of screenshot this is based on keywords
         Returns: (type, confidence)
         """
-        if not text or text == "[No text detected]":
+        if analysis is None:
+            analysis = self.analyze_text(text)
+        if analysis is None:
             return None, 0.0
         
-        text_lower = text.lower()
         scores = {}
         
         for screenshot_type, patterns in self.screenshot_patterns.items():
-            score = 0
-            for pattern in patterns:
-                if pattern in text_lower:
-                    score += 1
+            score = analysis.type_counts.get(screenshot_type, 0)
             
             if score > 0:
                 # Normalize by number of patterns
@@ -101,9 +260,10 @@ class EnhancedClusteringEngine:
         # Cosine similarity
         semantic_sim = self.calculate_similarity(emb1, emb2)
         
-        # Keyword overlap bonus
+        # Keyword overlap bonus (each text is tokenized once)
+        other_keywords = self.extract_keywords(text2)
         keywords1 = set(self.extract_keywords(text1))
-        keywords2 = set(self.extract_keywords(text2))
+        keywords2 = set(other_keywords)
         
         if keywords1 and keywords2:
             keyword_overlap = len(keywords1.intersection(keywords2)) / len(keywords1.union(keywords2))
@@ -113,11 +273,10 @@ class EnhancedClusteringEngine:
         # If tag provided, check for tag keywords in text
         tag_boost = 0
         if tag:
-            tag_keywords = self.extract_keywords(tag)
-            text_keywords = self.extract_keywords(text1)
+            tag_keywords = other_keywords if tag == text2 else self.extract_keywords(tag)
             
             for tk in tag_keywords:
-                if tk in text_keywords:
+                if tk in keywords1:
                     tag_boost += 0.1
             
             tag_boost = min(tag_boost, 0.3)  # Cap the boost
@@ -130,8 +289,74 @@ class EnhancedClusteringEngine:
     def generate_embedding(self, text):
         """Generate embedding for text"""
         if not text or text == "[No text detected]":
-            return np.zeros(384)
-        return self.model.encode(text)
+            return np.zeros(self.embedding_dim)
+        
+        key = self.embedding_cache.key(text)
+        embedding = self.embedding_cache.get(key)
+        if embedding is None:
+            embedding = self.model.encode(text)
+            self.embedding_cache.put(key, embedding)
+        return embedding
+    
+    def generate_embeddings(self, texts, flush=True):
+        """
+        Generate embeddings for many texts with batched model calls
+        
+        flush=False leaves new vectors buffered in the cache until the next
+        embedding_cache.flush(), for callers that encode in many small batches.
+        Returns: float32 array of shape (len(texts), embedding_dim)
+        """
+        embeddings = np.zeros((len(texts), self.embedding_dim), dtype=np.float32)
+        
+        # Serve what we can from the cache, encode only the misses
+        to_encode = {}
+        for i, text in enumerate(texts):
+            if not text or text == "[No text detected]":
+                continue
+            key = self.embedding_cache.key(text)
+            cached = self.embedding_cache.get(key)
+            if cached is not None:
+                embeddings[i] = cached
+            else:
+                to_encode.setdefault(key, []).append(i)
+        
+        if to_encode:
+            keys = list(to_encode)
+            encoded = self.model.encode(
+                [texts[to_encode[key][0]] for key in keys],
+                batch_size=self.batch_size,
+                convert_to_numpy=True
+            )
+            for key, embedding in zip(keys, encoded):
+                embeddings[to_encode[key]] = embedding
+                self.embedding_cache.put(key, embedding)
+            if flush:
+                self.embedding_cache.flush()
+        
+        return embeddings
+    
+    def warm_embeddings(self, texts, user_tags=()):
+        """
+        Encode ahead of time what organize_screenshots will need for these texts
+        
+        Fills the embedding cache with the texts themselves (used to group
+        untyped images) and, per tag, the focused texts or sentences that tag
+        scoring encodes, so a later organize run is mostly cache hits.
+        New vectors are not written to disk; call embedding_cache.flush()
+        once the warming is done.
+        """
+        texts = [text for text in texts if text and text != "[No text detected]"]
+        wanted = list(texts)
+        if user_tags:
+            for text in texts:
+                analysis = self.analyze_text(text, user_tags)
+                if self.tag_scoring == 'sentence':
+                    wanted.extend(s.strip() for s in analysis.sentences if s.strip())
+                else:
+                    wanted.extend(analysis.focused(j)[0] for j in range(len(user_tags)))
+            wanted.extend(user_tags)
+        if wanted:
+            self.generate_embeddings(list(dict.fromkeys(wanted)), flush=False)
     
     def calculate_similarity(self, embedding1, embedding2):
         """Calculate cosine similarity"""
@@ -172,17 +397,147 @@ class EnhancedClusteringEngine:
         else:
             return None, best_score
     
-    def smart_cluster_unmatched(self, unmatched_images):
+    def score_tags_batch(self, texts, user_tags, analyses=None):
+        """
+        Score every (text, tag) pair in one go
+        
+        Gives the same scores as enhanced_similarity on the focused text, but
+        each distinct focused text and each tag is encoded only once and the
+        semantic part comes from a single normalized matrix product. Focused
+        texts and keywords come from analyze_text, so each text is scanned once.
+        
+        With tag_scoring='sentence' the semantic part is pooled from a
+        SentenceIndex instead, so no per-tag focused text is ever encoded.
+        
+        Returns: array of shape (len(texts), len(user_tags)), zeros for images without text
+        """
+        scores = np.zeros((len(texts), len(user_tags)))
+        if not texts or not user_tags:
+            return scores
+        
+        tag_keywords = [self.extract_keywords(tag) for tag in user_tags]
+        tag_keyword_sets = [set(keywords) for keywords in tag_keywords]
+        
+        # Focused texts are shared between tags whenever no sentence matches
+        focused_rows = {}
+        focused_keywords = []
+        pair_rows = np.zeros((len(texts), len(user_tags)), dtype=np.int64)
+        keyword_part = np.zeros((len(texts), len(user_tags)))
+        has_text = np.zeros(len(texts), dtype=bool)
+        
+        if analyses is None:
+            analyses = [self.analyze_text(text, user_tags) for text in texts]
+        
+        for i, analysis in enumerate(analyses):
+            if analysis is None:
+                continue
+            has_text[i] = True
+            
+            for j, keywords in enumerate(tag_keywords):
+                focused_text, text_keywords = analysis.focused(j)
+                
+                row = focused_rows.get(focused_text)
+                if row is None:
+                    row = len(focused_keywords)
+                    focused_rows[focused_text] = row
+                    focused_keywords.append(set(text_keywords))
+                pair_rows[i, j] = row
+                
+                # Keyword overlap and tag boost, same arithmetic as enhanced_similarity
+                text_keyword_set = focused_keywords[row]
+                if text_keyword_set and tag_keyword_sets[j]:
+                    keyword_overlap = len(text_keyword_set & tag_keyword_sets[j]) / len(text_keyword_set | tag_keyword_sets[j])
+                else:
+                    keyword_overlap = 0
+                
+                tag_boost = 0
+                for tk in keywords:
+                    if tk in text_keyword_set:
+                        tag_boost += 0.1
+                tag_boost = min(tag_boost, 0.3)
+                
+                keyword_part[i, j] = (keyword_overlap * 0.3) + tag_boost
+        
+        if not focused_rows:
+            return scores
+        
+        if self.tag_scoring == 'sentence':
+            index = SentenceIndex.build(
+                [[s.strip() for s in a.sentences if s.strip()] if a else [] for a in analyses],
+                self.generate_embeddings,
+                dtype=self.embedding_dtype
+            )
+            semantic = index.pool(self.generate_embeddings(list(user_tags)), self.sentence_top_k)
+            scores = np.minimum((semantic.astype(np.float64) * 0.6) + keyword_part, 1.0)
+            scores[~has_text] = 0.0
+            return scores
+        
+        focused_embeddings = normalize_rows(self.generate_embeddings(list(focused_rows)))
+        tag_embeddings = normalize_rows(self.generate_embeddings(list(user_tags)))
+        semantic = (focused_embeddings @ tag_embeddings.T).astype(np.float64)
+        
+        tag_columns = np.broadcast_to(np.arange(len(user_tags)), pair_rows.shape)
+        scores = (semantic[pair_rows, tag_columns] * 0.6) + keyword_part
+        scores = np.minimum(scores, 1.0)
+        scores[~has_text] = 0.0
+        
+        return scores
+    
+    def match_to_tags_batch(self, texts, user_tags, analyses=None):
+        """
+        Batched version of match_to_tags
+        Returns: list of (best_tag, score) tuples, one per text
+        """
+        scores = self.score_tags_batch(texts, user_tags, analyses)
+        return self._matches_from_scores(texts, user_tags, scores)
+    
+    def _matches_from_scores(self, texts, user_tags, scores):
+        """Pick the best tag per row of a score matrix, like match_to_tags does"""
+        matches = []
+        
+        for i, text in enumerate(texts):
+            if not text or text == "[No text detected]" or not user_tags:
+                matches.append((None, 0.0))
+                continue
+            
+            best_idx = int(np.argmax(scores[i]))
+            best_score = max(float(scores[i, best_idx]), 0.0)
+            best_match = user_tags[best_idx] if best_score > 0 else None
+            
+            if best_score >= self.similarity_threshold:
+                matches.append((best_match, best_score))
+            else:
+                matches.append((None, best_score))
+        
+        return matches
+    
+    def smart_cluster_unmatched(self, unmatched_images, detected_types=None):
         """
         Intelligent clustering based on screenshot types and content
+        
+        detected_types optionally maps filename -> (type, confidence) already
+        computed by the caller, so texts are not scanned a second time.
+        """
+        clusters, _, _, _ = self._smart_cluster(unmatched_images, detected_types)
+        return clusters
+    
+    def _smart_cluster(self, unmatched_images, detected_types=None, state=None):
+        """
+        smart_cluster_unmatched that also returns the similarity grouping
+        Returns: (clusters, untyped filenames, group labels, leader vectors)
         """
         if not unmatched_images:
-            return {}
+            return {}, [], np.zeros(0, dtype=np.int64), np.zeros((0, self.embedding_dim), dtype=np.float32)
+        
+        detected_types = detected_types or {}
         
         # First, detect types
         typed_images = {}
         for filename, text in unmatched_images.items():
-            screenshot_type, confidence = self.detect_screenshot_type(text)
+            if filename in detected_types:
+                screenshot_type, confidence = detected_types[filename]
+            else:
+                screenshot_type, confidence = self.detect_screenshot_type(text)
             if screenshot_type and confidence > 0.2:
                 if screenshot_type not in typed_images:
                     typed_images[screenshot_type] = []
@@ -196,52 +551,127 @@ class EnhancedClusteringEngine:
                 clusters[fn] = cluster_name
         
         # For remaining untyped images, use similarity clustering
-        untyped = {fn: text for fn, text in unmatched_images.items() if fn not in clusters}
-        
-        if untyped:
-            embeddings = []
-            filenames = []
-            
-            for filename, text in untyped.items():
-                if text and text != "[No text detected]":
-                    embeddings.append(self.generate_embedding(text))
-                    filenames.append(filename)
-            
-            if embeddings:
-                embeddings_array = np.array(embeddings)
-                cluster_counter = 1
-                
-                for i, filename in enumerate(filenames):
-                    if filename in clusters:
-                        continue
-                    
-                    cluster_name = f"Group_{cluster_counter}"
-                    clusters[filename] = cluster_name
-                    
-                    for j in range(i + 1, len(filenames)):
-                        if filenames[j] in clusters:
-                            continue
-                        
-                        similarity = self.calculate_similarity(
-                            embeddings_array[i],
-                            embeddings_array[j]
-                        )
-                        
-                        if similarity >= self.similarity_threshold:
-                            clusters[filenames[j]] = cluster_name
-                    
-                    cluster_counter += 1
-        
-        # Handle images with no text
+        filenames = [
+            fn for fn, text in unmatched_images.items()
+            if fn not in clusters and text and text != "[No text detected]"
+        ]
+        labels, leaders = self._group_untyped(filenames, unmatched_images, state)
+        for filename, label in zip(filenames, labels):
+            if label >= 0:
+                clusters[filename] = f"Group_{label + 1}"
+        
+        # Handle images with no text (and density-clustering noise)
         for filename in unmatched_images.keys():
             if filename not in clusters:
                 clusters[filename] = "Uncategorized"
         
-        return clusters
+        return clusters, filenames, labels, leaders
+    
+    def _group_untyped(self, filenames, texts, state=None):
+        """
+        Cluster the untyped images with the configured strategy
+        
+        When the previous run used the greedy strategy, a full run would use
+        exact greedy too, and the previous untyped images are an unchanged
+        prefix of filenames, only the new images are embedded and streamed
+        into the previous groups. This gives the same groups as a full run.
+        
+        Returns: (labels with -1 for unclustered images, greedy leader vectors or None)
+        """
+        if not filenames:
+            return np.zeros(0, dtype=np.int64), np.zeros((0, self.embedding_dim), dtype=np.float32)
+        
+        strategy = make_strategy(self.cluster_method, len(filenames), self.similarity_threshold)
+        exact_greedy = isinstance(strategy, GreedyStrategy) and not strategy.approximate
+        
+        previous = state.untyped if state is not None and state.leaders is not None else None
+        if (previous is not None
+                and exact_greedy
+                and state.threshold == self.similarity_threshold
+                and filenames[:len(previous)] == previous
+                and all(state.texts.get(fn) == texts[fn] for fn in previous)):
+            new = filenames[len(previous):]
+            if not new:
+                return state.labels, state.leaders
+            
+            strategy = GreedyStrategy(self.similarity_threshold, leaders=state.leaders)
+            new_labels = strategy.partial_fit(self.generate_embeddings([texts[fn] for fn in new]))
+            return np.concatenate([state.labels, new_labels]), strategy.leaders
+        
+        embeddings = self.generate_embeddings([texts[fn] for fn in filenames])
+        labels = strategy.fit_predict(embeddings, chunk_size=self.cluster_chunk_size)
+        return labels, strategy.leaders if exact_greedy else None
+    
+    def _scoring_signature(self):
+        """Settings the score matrix, detected types and untyped groups depend on"""
+        return (
+            self.model_name,
+            self.cluster_method,
+            self.tag_scoring,
+            self.sentence_top_k,
+            self.embedding_dtype,
+            tuple((t, tuple(p)) for t, p in self.screenshot_patterns.items())
+        )
     
-    def organize_screenshots(self, extracted_data, user_tags):
+    def _score_incremental(self, texts, user_tags, state):
+        """
+        Tag score matrix and detected types for all files
+        
+        With a previous state, only rows of new or changed files and columns
+        of new tags are computed; everything else is copied over.
+        Returns: (scores, {filename: (type, confidence)})
+        """
+        filenames = list(texts)
+        if state is None:
+            analyses = [self.analyze_text(texts[fn], user_tags) for fn in filenames]
+            scores = self.score_tags_batch([texts[fn] for fn in filenames], user_tags, analyses)
+            types = {fn: self.detect_screenshot_type(texts[fn], a) for fn, a in zip(filenames, analyses)}
+            return scores, types
+        
+        scores = np.zeros((len(filenames), len(user_tags)))
+        types = {}
+        
+        previous_rows = {fn: i for i, fn in enumerate(state.texts)}
+        previous_cols = {tag: j for j, tag in enumerate(state.tags)}
+        kept = [i for i, fn in enumerate(filenames) if state.texts.get(fn) == texts[fn]]
+        added = [i for i, fn in enumerate(filenames) if state.texts.get(fn) != texts[fn]]
+        kept_cols = [j for j, tag in enumerate(user_tags) if tag in previous_cols]
+        new_cols = [j for j, tag in enumerate(user_tags) if tag not in previous_cols]
+        
+        if kept:
+            kept_names = [filenames[i] for i in kept]
+            types.update((fn, state.types[fn]) for fn in kept_names)
+            
+            if kept_cols:
+                rows = [previous_rows[fn] for fn in kept_names]
+                cols = [previous_cols[user_tags[j]] for j in kept_cols]
+                scores[np.ix_(kept, kept_cols)] = state.scores[np.ix_(rows, cols)]
+            
+            if new_cols:
+                scores[np.ix_(kept, new_cols)] = self.score_tags_batch(
+                    [texts[fn] for fn in kept_names],
+                    [user_tags[j] for j in new_cols]
+                )
+        
+        if added:
+            added_names = [filenames[i] for i in added]
+            analyses = [self.analyze_text(texts[fn], user_tags) for fn in added_names]
+            scores[added] = self.score_tags_batch([texts[fn] for fn in added_names], user_tags, analyses)
+            types.update((fn, self.detect_screenshot_type(texts[fn], a)) for fn, a in zip(added_names, analyses))
+        
+        return scores, types
+    
+    def organize_screenshots(self, extracted_data, user_tags, batched=True, previous=None):
         """
         Enhanced organization with better matching
+        
+        With batched=True all tag scores are computed up front by
+        match_to_tags_batch instead of one match_to_tags call per image.
+        
+        previous: results of an earlier batched call. Only new or changed
+        files and new tags are scored, and the untyped groups are extended
+        rather than rebuilt when possible. The results are the same as a
+        full run.
         """
         results = {
             'matched': {tag: [] for tag in user_tags},
@@ -251,17 +681,24 @@ class EnhancedClusteringEngine:
         }
         
         unmatched = {}
+        texts = {filename: data['text'] for filename, data in extracted_data.items()}
+        
+        state = previous.get('state') if previous and batched else None
+        if state is not None and state.signature != self._scoring_signature():
+            state = None
+        
+        if batched:
+            # One scan per new text feeds type detection and tag matching
+            scores, detected_types = self._score_incremental(texts, user_tags, state)
+            matches = self._matches_from_scores(list(texts.values()), user_tags, scores)
+        else:
+            detected_types = {fn: self.detect_screenshot_type(text) for fn, text in texts.items()}
+            matches = [self.match_to_tags(text, user_tags) for text in texts.values()]
         
         # Match to user tags
-        for filename, data in extracted_data.items():
-            text = data['text']
-            
-            # Detect screenshot type
-            screenshot_type, type_confidence = self.detect_screenshot_type(text)
+        for (filename, text), (best_tag, score) in zip(texts.items(), matches):
+            screenshot_type, _ = detected_types[filename]
             results['types'][filename] = screenshot_type or "unknown"
-            
-            # Match to tags
-            best_tag, score = self.match_to_tags(text, user_tags)
             results['scores'][filename] = score
             
             if best_tag:
@@ -270,12 +707,20 @@ class EnhancedClusteringEngine:
                 unmatched[filename] = text
         
         # Cluster unmatched with smart logic
-        if unmatched:
-            clusters = self.smart_cluster_unmatched(unmatched)
-            
-            for filename, cluster_name in clusters.items():
-                if cluster_name not in results['clustered']:
-                    results['clustered'][cluster_name] = []
-                results['clustered'][cluster_name].append(filename)
+        clusters, untyped, labels, leaders = self._smart_cluster(unmatched, detected_types, state)
+        
+        for filename, cluster_name in clusters.items():
+            if cluster_name not in results['clustered']:
+                results['clustered'][cluster_name] = []
+            results['clustered'][cluster_name].append(filename)
+        
+        if batched:
+            results['state'] = OrganizeState(
+                self._scoring_signature(), self.similarity_threshold, texts, list(user_tags),
+                scores, detected_types, untyped, labels, leaders
+            )
+        
+        # Persist embeddings computed on the per-pair path
+        self.embedding_cache.flush()
         
-        return results
\ No newline at end of file
+        return results
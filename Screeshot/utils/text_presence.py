@@ -0,0 +1,122 @@
+import numpy as np
+from PIL import Image, ImageFilter
+
+from .image_preprocessing import flatten_alpha
+
+try:
+    from scipy import ndimage
+except ImportError:
+    ndimage = None
+
+
+class TextPresenceDetector:
+    """
+    Cheap check for whether an image contains any text, run before OCR
+
+    The image is downscaled and binarized against its local background;
+    connected components the size of glyphs are kept, and a component
+    counts as text when another glyph-sized component of similar height
+    sits next to it on the same line. Photos and plain graphics produce
+    few such aligned pairs. Without scipy, the density of strong
+    horizontal edges is used instead.
+
+    The detector is tuned to miss as little text as possible: an image is
+    only called textless when the evidence is clearly below min_glyphs.
+    """
+
+    def __init__(self, max_side=1024, min_glyphs=10, contrast=24, min_edge_density=0.002):
+        """
+        Args:
+            max_side: Longer side of the analysed copy
+            min_glyphs: Aligned glyph-like components needed to call the image text
+            contrast: Gray-level difference from the local background counted as ink
+            min_edge_density: Fallback threshold on the fraction of strong-edge pixels
+        """
+        self.max_side = max_side
+        self.min_glyphs = min_glyphs
+        self.contrast = contrast
+        self.min_edge_density = min_edge_density
+
+    def _prepare(self, image):
+        if not isinstance(image, Image.Image):
+            image = Image.open(image)
+            image.draft('L', (self.max_side, self.max_side))
+        gray = flatten_alpha(image).convert('L')
+        if max(gray.size) > self.max_side:
+            ratio = self.max_side / max(gray.size)
+            gray = gray.resize((max(1, round(gray.width * ratio)), max(1, round(gray.height * ratio))),
+                               Image.BOX, reducing_gap=2.0)
+        return gray
+
+    def score(self, image):
+        """
+        Evidence of text in an image
+
+        Returns:
+            float: Number of aligned glyph-like components, or the strong-edge
+            density scaled so that min_edge_density maps to min_glyphs
+        """
+        gray = self._prepare(image)
+        pixels = np.asarray(gray, dtype=np.int16)
+        if pixels.size == 0 or min(pixels.shape) < 4:
+            return 0.0
+
+        if ndimage is None:
+            edges = np.abs(np.diff(pixels, axis=1)) > 2 * self.contrast
+            return float(edges.mean() / self.min_edge_density * self.min_glyphs)
+
+        # Dark-on-light and light-on-dark ink are labelled separately, so the
+        # background between strokes never glues glyphs together
+        background = np.asarray(gray.filter(ImageFilter.BoxBlur(8)), dtype=np.int16)
+        return (self._aligned_glyphs(pixels < background - self.contrast)
+                + self._aligned_glyphs(pixels > background + self.contrast))
+
+    def _aligned_glyphs(self, ink):
+        labels, count = ndimage.label(ink)
+        if count == 0:
+            return 0.0
+
+        slices = ndimage.find_objects(labels)
+        tops = np.array([s[0].start for s in slices])
+        bottoms = np.array([s[0].stop for s in slices])
+        lefts = np.array([s[1].start for s in slices])
+        rights = np.array([s[1].stop for s in slices])
+        heights = bottoms - tops
+        widths = rights - lefts
+
+        # Glyph-sized: a few pixels to most of the image tall, not long lines or blobs
+        glyph = (heights >= 4) & (heights <= min(120, 0.9 * ink.shape[0])) & (widths <= 3 * heights)
+        index = np.flatnonzero(glyph)
+        if len(index) < 2:
+            return 0.0
+        if len(index) > 20000:
+            return float(self.min_glyphs)  # Dense fine detail; let OCR decide
+
+        # Compare each glyph with the next one to its right in the same band of
+        # rows; two band offsets so a line straddling a band edge is still seen
+        centers = (tops[index] + bottoms[index]) / 2.0
+        paired = np.zeros(len(index), dtype=bool)
+        for shift in (0, 4):
+            band = np.floor((centers + shift) / 8)
+            order = np.lexsort((lefts[index], band))
+            g = index[order]
+            h = heights[g]
+            taller = np.maximum(h[1:], h[:-1])
+            gap = lefts[g][1:] - rights[g][:-1]
+            pair = ((band[order][1:] == band[order][:-1])
+                    & (np.abs(h[1:] - h[:-1]) <= 0.6 * taller)
+                    & (gap >= -1) & (gap <= 1.5 * taller))
+            paired[order[1:][pair]] = True
+            paired[order[:-1][pair]] = True
+        return float(paired.sum())
+
+    def detect(self, image):
+        """
+        Returns:
+            tuple: (has_text, confidence) where confidence is how sure the
+            detector is of that answer, in [0, 1]
+        """
+        score = self.score(image)
+        if score >= self.min_glyphs:
+            return True, float(min(1.0, score / (4 * self.min_glyphs)))
+        return False, float(1.0 - score / self.min_glyphs)
@@ -0,0 +1,179 @@
+import os
+import struct
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .blob_store import _read
+
+# Already-compressed formats: deflate costs CPU and saves ~nothing
+STORED_EXTENSIONS = frozenset({
+    '.png', '.jpg', '.jpeg', '.webp', '.gif', '.heic', '.heif', '.avif',
+    '.zip', '.gz', '.bz2', '.xz', '.7z', '.mp4', '.mov', '.mp3',
+})
+
+# Fields at or above the limit move to ZIP64 records and hold the marker instead
+_ZIP32_LIMIT = 0xFFFFFFFF
+_ZIP64_MARKER = 0xFFFFFFFF
+_UTF8_NAMES = 0x800
+_STORED, _DEFLATED = 0, 8
+
+
+def should_compress(arcname):
+    return os.path.splitext(arcname)[1].lower() not in STORED_EXTENSIONS
+
+
+def _dos_datetime(moment):
+    year, month, day, hour, minute, second = moment[:6]
+    year = min(max(year, 1980), 2107)
+    return (hour << 11) | (minute << 5) | (second // 2), ((year - 1980) << 9) | (month << 5) | day
+
+
+def _encode(source, compress, level):
+    """(crc, size, payload, deflated) of one member; runs on a worker thread"""
+    data = _read(source)
+    crc = zlib.crc32(data)
+    if compress:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        payload = compressor.compress(data) + compressor.flush()
+        if len(payload) < len(data):
+            return crc, len(data), payload, True
+    return crc, len(data), data, False
+
+
+def _zip64_extra(*values):
+    return struct.pack('<HH', 0x0001, 8 * len(values)) + struct.pack(f'<{len(values)}Q', *values)
+
+
+def zip_chunks(members, workers=None, level=6, max_pending=None, stats=None):
+    """
+    A ZIP archive of members, generated piece by piece
+
+    Members are read and compressed on a thread pool (zlib and crc32
+    release the GIL) while earlier ones are being written, with at most
+    max_pending members in memory. Compressed formats are stored as is.
+    Only a forward-only writer is needed, so the archive can go straight
+    to a socket or an HTTP response. ZIP64 records are added when the
+    archive outgrows the classic format.
+
+    Args:
+        members: Iterable of (arcname, source); source is bytes, a path or a file object
+        workers: Threads reading and compressing (defaults to the CPU count)
+        level: zlib level for compressible members
+        max_pending: Members read ahead (defaults to 2 per worker)
+        stats: Optional dict updated with 'members', 'stored', 'deflated',
+            'bytes_in' and 'bytes_out'
+
+    Yields:
+        bytes: Consecutive pieces of the archive
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max(max_pending or 2 * workers, 1)
+    stats = {} if stats is None else stats
+    stats.update({'members': 0, 'stored': 0, 'deflated': 0, 'bytes_in': 0, 'bytes_out': 0})
+    dos_time, dos_date = _dos_datetime(time.localtime())
+
+    central = []
+    offset = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        source = iter(members)
+        exhausted = False
+
+        while pending or not exhausted:
+            while not exhausted and len(pending) < max_pending:
+                try:
+                    arcname, member = next(source)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.append((arcname, pool.submit(_encode, member, should_compress(arcname), level)))
+            if not pending:
+                break
+
+            # Written in input order; later members keep compressing meanwhile
+            arcname, future = pending.popleft()
+            crc, size, payload, deflated = future.result()
+            name = arcname.replace(os.sep, '/').encode('utf-8')
+
+            large = size >= _ZIP32_LIMIT or len(payload) >= _ZIP32_LIMIT
+            extra = _zip64_extra(size, len(payload)) if large else b''
+            header = struct.pack(
+                '<IHHHHHIIIHH', 0x04034b50, 45 if large else 20, _UTF8_NAMES,
+                _DEFLATED if deflated else _STORED, dos_time, dos_date, crc,
+                _ZIP64_MARKER if large else len(payload), _ZIP64_MARKER if large else size,
+                len(name), len(extra)
+            ) + name + extra
+            yield header
+            yield payload
+
+            central.append((name, crc, size, len(payload), deflated, offset))
+            offset += len(header) + len(payload)
+            stats['members'] += 1
+            stats['deflated' if deflated else 'stored'] += 1
+            stats['bytes_in'] += size
+
+    directory_offset = offset
+    for name, crc, size, compressed, deflated, local_offset in central:
+        # Zip64 extra holds, in order, whichever of the three fields overflowed
+        overflow = [v for v in (size, compressed, local_offset) if v >= _ZIP32_LIMIT]
+        extra = _zip64_extra(*overflow) if overflow else b''
+        record = struct.pack(
+            '<IHHHHHHIIIHHHHHII', 0x02014b50, (3 << 8) | 45, 45 if overflow else 20, _UTF8_NAMES,
+            _DEFLATED if deflated else _STORED, dos_time, dos_date, crc,
+            _ZIP64_MARKER if compressed >= _ZIP32_LIMIT else compressed,
+            _ZIP64_MARKER if size >= _ZIP32_LIMIT else size,
+            len(name), len(extra), 0, 0, 0, (0o100644 << 16),
+            _ZIP64_MARKER if local_offset >= _ZIP32_LIMIT else local_offset
+        ) + name + extra
+        yield record
+        offset += len(record)
+
+    directory_size = offset - directory_offset
+    count = len(central)
+    zip64 = count >= 0xFFFF or directory_size >= _ZIP32_LIMIT or directory_offset >= _ZIP32_LIMIT
+    if zip64:
+        yield struct.pack('<IQHHIIQQQQ', 0x06064b50, 44, 45, 45, 0, 0,
+                          count, count, directory_size, directory_offset)
+        yield struct.pack('<IIQI', 0x07064b50, 0, offset, 1)
+        offset += 56 + 20
+    yield struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, 0xFFFF if zip64 else count, 0xFFFF if zip64 else count,
+                      _ZIP64_MARKER if zip64 else directory_size, _ZIP64_MARKER if zip64 else directory_offset, 0)
+    stats['bytes_out'] = offset + 22
+
+
+def write_zip(members, output, **options):
+    """
+    Stream an archive of members into output
+
+    Args:
+        output: Path, or a writable binary file object (need not be seekable)
+        options: See zip_chunks
+
+    Returns:
+        dict: The stats of zip_chunks
+    """
+    stats = {}
+    if isinstance(output, (str, os.PathLike)):
+        with open(output, 'wb') as f:
+            for chunk in zip_chunks(members, stats=stats, **options):
+                f.write(chunk)
+    else:
+        for chunk in zip_chunks(members, stats=stats, **options):
+            output.write(chunk)
+    return stats
+
+
+def iter_zip(members, chunk_size=1 << 20, **options):
+    """zip_chunks regrouped into pieces of about chunk_size bytes, e.g. for an HTTP response"""
+    buffer = []
+    buffered = 0
+    for chunk in zip_chunks(members, **options):
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= chunk_size:
+            yield b''.join(buffer)
+            buffer, buffered = [], 0
+    if buffer:
+        yield b''.join(buffer)